@@ -9,11 +9,89 @@
 
 from pyb import I2C
 import struct
+import array
+import time
+import os
+import binascii
 from task_share import Share
 from task_share import Queue
-'''!@package              Import I2C from pyb, struct, share, and queue
+'''!@package              Import I2C from pyb, struct, array, time, os, binascii, share, and queue
 '''
 
+## Axis remap written to AXIS_MAP_CONFIG (0x41) for the way the IMU is mounted
+AXIS_MAP_CONFIG = 0x21
+## Axis signs written to AXIS_MAP_SIGN (0x42) for the way the IMU is mounted
+AXIS_MAP_SIGN = 0x04
+
+## Name of the binary calibration file
+CAL_FILE = "IMU_cal.bin"
+## First bytes of every calibration file
+CAL_MAGIC = b'BNOC'
+## Version of the calibration file layout, increase it when the layout changes
+CAL_VERSION = 1
+## Calibration file layout: magic, version, axis map config, axis map sign, pad, offsets, CRC32
+CAL_FMT = '<4sBBBx22sI'
+## Number of bytes in a calibration file
+CAL_SIZE = struct.calcsize(CAL_FMT)
+## Position of the offsets in a calibration file
+CAL_OFFSETS = struct.calcsize('<4sBBBx')
+## load_calibration() result: offsets were loaded
+CAL_OK = 0
+## load_calibration() result: there is no calibration file
+CAL_MISSING = 1
+## load_calibration() result: the file is the wrong size or its CRC does not match
+CAL_INVALID = 2
+## load_calibration() result: the file is from another layout version or axis mounting
+CAL_STALE = 3
+
+## OPR_MODE register value of each operating mode
+MODES = {"CONFIG": 0,
+         "IMU": 8,
+         "COMPASS": 9,
+         "M4G": 10,
+         "NDOF_FMC_OFF": 11,
+         "NDOF": 12}
+## ms for the sensor to settle after switching from an operating mode to CONFIG
+CONFIG_SETTLE_MS = 19
+## ms for the sensor to settle after switching from CONFIG to an operating mode
+OPR_SETTLE_MS = 7
+
+# Index of each quantity in the snapshot read by read_snapshot(), in register order
+## Acceleration along x in m/s^2
+ACC_X = 0
+## Acceleration along y in m/s^2
+ACC_Y = 1
+## Acceleration along z in m/s^2
+ACC_Z = 2
+## Magnetic field along x in uT
+MAG_X = 3
+## Magnetic field along y in uT
+MAG_Y = 4
+## Magnetic field along z in uT
+MAG_Z = 5
+## Angular velocity about x in deg/s
+GYR_X = 6
+## Angular velocity about y in deg/s
+GYR_Y = 7
+## Angular velocity about z in deg/s
+GYR_Z = 8
+## Euler heading in degrees
+HEADING = 9
+## Euler roll in degrees
+ROLL = 10
+## Euler pitch in degrees
+PITCH = 11
+## Quaternion w component, unitless
+QUA_W = 12
+## Quaternion x component, unitless
+QUA_X = 13
+## Quaternion y component, unitless
+QUA_Y = 14
+## Quaternion z component, unitless
+QUA_Z = 15
+## Number of quantities in a snapshot
+NUM_FIELDS = 16
+
 class BNO055:
     
     def __init__(self, i2c):
@@ -41,62 +119,122 @@ class BNO055:
         self.GYR = 0
         self.SYS = 0
         self.calibrated = 0
+        self.status = 0
         
-        self.mode = 0
+        self.mode = "CONFIG" # written below, as a soft reboot leaves the sensor in its last mode
+        self.target_mode = "CONFIG"
+        self._settle_ms = 0
+        self._settle_start = time.ticks_ms()
         self.cc = 0
         self.EA = 0
         self.i2c = i2c
         self.addr = 0x28
         self.OPR_MODE = 0x3D
         self.CALIB_STAT = 0x35
+        self.MAG_DATA = 0x0E # X LSB, the 6 bytes up to Z MSB follow
+        self.GYR_DATA = 0x14
+        self.EUL_DATA = 0x1A
+        self.ACC_OFFSET = 0x55 # first of the 22 calibration registers, up to 0x6A
+        self.ACC_DATA = 0x08 # acc, mag, gyro, euler and quaternion data run to 0x27
+        
+        # Every register block is read in one transaction into its own buffer,
+        # so reading the IMU allocates nothing
+        self._stat_buf = bytearray(1)
+        self._cc_buf = bytearray(22)
+        self._eul_buf = bytearray(6)
+        self._gyr_buf = bytearray(6)
+        self._mag_buf = bytearray(6)
+        self._snap_buf = bytearray(2*NUM_FIELDS)
+        self._cal_file_buf = bytearray(CAL_SIZE)
+        
+        # LSB per unit of each snapshot quantity, from the BNO055 datasheet
+        self._snap_scale = array.array('f', [1/100]*3 + [1/16]*3 + [1/16]*3 + [1/16]*3 + [1/16384]*4)
+        
+        ## Every quantity from the last read_snapshot(), in engineering units
+        self.snapshot = array.array('f', [0.0]*NUM_FIELDS)
         
         
         self.i2c.init(I2C.CONTROLLER, baudrate = 400_000, gencall=False, dma=False)
         
         self.i2c.is_ready(self.addr)
         
+        # The sensor keeps its operating mode through a soft reboot of the
+        # board, and the axis map can only be written in CONFIG
+        self.i2c.mem_write(MODES["CONFIG"], self.addr, self.OPR_MODE)
+        time.sleep_ms(CONFIG_SETTLE_MS)
+        
         # self.i2c.mem_write(1, self.addr, 0x3F) #reset that jawn
-        self.i2c.mem_write(0x21, self.addr, 0x41) #p0 axis remap config
-        self.i2c.mem_write(0x04, self.addr, 0x42) #p0 axis sign config
+        self.i2c.mem_write(AXIS_MAP_CONFIG, self.addr, 0x41) #p0 axis remap config
+        self.i2c.mem_write(AXIS_MAP_SIGN, self.addr, 0x42) #p0 axis sign config
         
     
     def change_mode(self, mode):
-        '''!@brief              Updates and changes the mode
+        '''!@brief              Updates and changes the mode, waiting for the sensor to settle
+            @details            Does nothing if the sensor is already in the mode. Changes between two
+                                operating modes go through CONFIG, as the datasheet requires. For use
+                                outside of the scheduler loop; tasks should use request_mode() and
+                                service() so they never wait.
+            @param              mode Name of the mode, one of the keys of MODES
         '''
-        if str(mode) == "IMU":
-            self.mode = mode
-            self.i2c.mem_write(8, self.addr, self.OPR_MODE)
-        elif str(mode) == "COMPASS":
-            self.mode = mode    
-            self.i2c.mem_write(9, self.addr, self.OPR_MODE)
-        elif str(mode) == "M4G":
-            self.mode = mode    
-            self.i2c.mem_write(10, self.addr, self.OPR_MODE)
-        elif str(mode) == "NDOF_FMC_OFF":
-            self.mode = mode    
-            self.i2c.mem_write(11, self.addr, self.OPR_MODE)
-        elif str(mode) == "NDOF":
-            self.mode = mode
-            self.i2c.mem_write(12, self.addr, self.OPR_MODE)
-        elif str(mode) == "CONFIG":
-            self.mode = mode
-            self.i2c.mem_write(0, self.addr, self.OPR_MODE)
-            
+        self.request_mode(mode)
+        while not self.service():
+            time.sleep_ms(1)
+    
+    def request_mode(self, mode):
+        '''!@brief              Asks for a mode change which service() carries out
+            @details            Requesting the mode the sensor is in, or is already changing to, costs nothing
+            @param              mode Name of the mode, one of the keys of MODES
+        '''
+        mode = str(mode)
+        if mode in MODES:
+            self.target_mode = mode
+    
+    def service(self):
+        '''!@brief              Takes the next step towards the requested mode without waiting
+            @details            Call this once per task run. A change from one operating mode to
+                                another writes CONFIG on one call and the new mode on a later call,
+                                after each write's settle time has passed.
+            @returns            True if the sensor has settled in the requested mode
+        '''
+        if time.ticks_diff(time.ticks_ms(), self._settle_start) < self._settle_ms:
+            return False
+        if self.mode == self.target_mode:
+            return True
+        
+        if self.mode != "CONFIG" and self.target_mode != "CONFIG":
+            new_mode = "CONFIG"
+        else:
+            new_mode = self.target_mode
+        self.i2c.mem_write(MODES[new_mode], self.addr, self.OPR_MODE)
+        self._settle_ms = CONFIG_SETTLE_MS if new_mode == "CONFIG" else OPR_SETTLE_MS
+        self._settle_start = time.ticks_ms()
+        self.mode = new_mode
+        return False
+    
+    def ready(self):
+        '''!@brief              Checks whether the sensor has settled in the requested mode, without changing it
+            @returns            True if the sensor has settled in the requested mode
+        '''
+        return (self.mode == self.target_mode
+                and time.ticks_diff(time.ticks_ms(), self._settle_start) >= self._settle_ms)
             
     
     def get_status(self):
         '''!@brief              Check the calibration status of the IMU
-            @details            If a 3 is present in all 4 parts of the register, the system is calibrated
+            @details            If a 3 is present in all 4 parts of the register, the system is calibrated.
+                                The status is only kept up in NDOF, so this asks for NDOF and, until the
+                                sensor has settled in it, returns 0 without reading the status.
             @returns            1 upon sucessful calibration, 0 if otherwise
         '''
-        self.change_mode("NDOF")
-        status_byte = self.i2c.mem_read(1, self.addr, self.CALIB_STAT) #read 1 byte
-        self.MAG = (status_byte[0] & 0b00000011) >> 0 #parse, chunk, 3 = calib
-        self.ACC = (status_byte[0] & 0b00001100) >> 2 
-        self.GYR = (status_byte[0] & 0b00110000) >> 4
-        self.SYS = (status_byte[0] & 0b11000000) >> 6
-        
-        print("MAG: "+ str(self.MAG) + " ACC: " + str(self.ACC) + " GYR: " + str(self.GYR) + " SYS: " + str(self.SYS))
+        self.request_mode("NDOF")
+        if not self.service():
+            return 0
+        self.i2c.mem_read(self._stat_buf, self.addr, self.CALIB_STAT) #read 1 byte
+        self.status = self._stat_buf[0]
+        self.MAG = (self.status & 0b00000011) >> 0 #parse, chunk, 3 = calib
+        self.ACC = (self.status & 0b00001100) >> 2 
+        self.GYR = (self.status & 0b00110000) >> 4
+        self.SYS = (self.status & 0b11000000) >> 6
         
         if ((self.MAG == 3) and (self.ACC == 3) and (self.GYR == 3) and (self.SYS == 3)):
             self.calibrated = 1
@@ -109,48 +247,18 @@ class BNO055:
     
     
     def get_coeffs(self):
-        '''!@brief              Using structs, data is read from the ACC, MAG, GYR, and radius registers
+        '''!@brief              Reads the ACC, MAG, GYR, and radius offset registers in one transaction
             @details            Upon calibration, device is placed in config mode and registers are read
-            @returns            All offsets from each axis for ACC, MAG, GYR, and radius
+            @returns            All offsets from each axis for ACC, MAG, GYR, and radius, as 22 bytes in
+                                a buffer which is overwritten by the next call
         '''
         if (self.calibrated == 1):
-            self.i2c.mem_write(0, self.addr, self.OPR_MODE) # set to config
-            self.mode = "CONFIG"
+            self.change_mode("CONFIG") # set to config
             
-            ACC_OFFSET_X_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x55))[0]
-            ACC_OFFSET_X_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x56))[0]
-            ACC_OFFSET_Y_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x57))[0]
-            ACC_OFFSET_Y_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x58))[0]
-            ACC_OFFSET_Z_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x59))[0]
-            ACC_OFFSET_Z_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5A))[0]
+            # 0x55 ACC_OFFSET_X_LSB through 0x6A MAG_RADIUS_MSB
+            self.i2c.mem_read(self._cc_buf, self.addr, self.ACC_OFFSET)
+            self.cc = self._cc_buf
             
-            MAG_OFFSET_X_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5B))[0]
-            MAG_OFFSET_X_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5C))[0]
-            MAG_OFFSET_Y_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5D))[0]
-            MAG_OFFSET_Y_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5E))[0]
-            MAG_OFFSET_Z_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x5F))[0]
-            MAG_OFFSET_Z_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x60))[0]
-            
-            GYR_OFFSET_X_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x61))[0]
-            GYR_OFFSET_X_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x62))[0]
-            GYR_OFFSET_Y_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x63))[0]
-            GYR_OFFSET_Y_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x64))[0]
-            GYR_OFFSET_Z_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x65))[0]
-            GYR_OFFSET_Z_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x66))[0]
-            
-            ACC_RADIUS_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x67))[0]
-            ACC_RADIUS_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x68))[0]
-            MAG_RADIUS_LSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x69))[0]
-            MAG_RADIUS_MSB = struct.unpack('b', self.i2c.mem_read(1, self.addr, 0x6A))[0]
-            
-            self.cc = struct.pack("22b", ACC_OFFSET_X_LSB, ACC_OFFSET_X_MSB, ACC_OFFSET_Y_LSB,
-                                       ACC_OFFSET_Y_MSB, ACC_OFFSET_Z_LSB, ACC_OFFSET_Z_MSB,
-                                       MAG_OFFSET_X_LSB, MAG_OFFSET_X_MSB, MAG_OFFSET_Y_LSB,
-                                       MAG_OFFSET_Y_MSB, MAG_OFFSET_Z_LSB, MAG_OFFSET_Z_MSB,
-                                       GYR_OFFSET_X_LSB, GYR_OFFSET_X_MSB, GYR_OFFSET_Y_LSB, 
-                                       GYR_OFFSET_Y_MSB, GYR_OFFSET_Z_LSB, GYR_OFFSET_Z_MSB,
-                                       ACC_RADIUS_LSB, ACC_RADIUS_MSB, MAG_RADIUS_LSB, 
-                                       MAG_RADIUS_MSB)
             self.change_mode("NDOF")
             return self.cc
             
@@ -159,95 +267,140 @@ class BNO055:
     
     def set_coeffs(self, cc_struct): #cc is a struct
             '''!@brief              Writes given offsets to the IMU offset registers
-                @details            In config mode, a struct contain ing all the numbers is unpacked
+                @details            In config mode, all 22 bytes are written in one transaction
                 @param              cc_struct A struct containing 22 bytes of given offsets
             '''
-        
-            
-            self.i2c.mem_write(0, self.addr, self.OPR_MODE) # set to config
-            self.change_mode("CONFIG")
+            self.change_mode("CONFIG") # set to config
             
-            #unpack to tuple
-            cc_tup = struct.unpack("22b", cc_struct)
+            # 0x55 ACC_OFFSET_X_LSB through 0x6A MAG_RADIUS_MSB
+            self.i2c.mem_write(cc_struct, self.addr, self.ACC_OFFSET)
             
-            self.i2c.mem_write(cc_tup[0], self.addr, 0x55)
-            self.i2c.mem_write(cc_tup[1], self.addr, 0x56)
-            self.i2c.mem_write(cc_tup[2], self.addr, 0x57)
-            self.i2c.mem_write(cc_tup[3], self.addr, 0x58)
-            self.i2c.mem_write(cc_tup[4], self.addr, 0x59)
-            self.i2c.mem_write(cc_tup[5], self.addr, 0x5A)
-            
-            self.i2c.mem_write(cc_tup[6], self.addr, 0x5B)
-            self.i2c.mem_write(cc_tup[7], self.addr, 0x5C)
-            self.i2c.mem_write(cc_tup[8], self.addr, 0x5D)
-            self.i2c.mem_write(cc_tup[9], self.addr, 0x5E)
-            self.i2c.mem_write(cc_tup[10], self.addr, 0x5F)
-            self.i2c.mem_write(cc_tup[11], self.addr, 0x60)
-            
-            self.i2c.mem_write(cc_tup[12], self.addr, 0x61)
-            self.i2c.mem_write(cc_tup[13], self.addr, 0x62)
-            self.i2c.mem_write(cc_tup[14], self.addr, 0x63)
-            self.i2c.mem_write(cc_tup[15], self.addr, 0x64)
-            self.i2c.mem_write(cc_tup[16], self.addr, 0x65)
-            self.i2c.mem_write(cc_tup[17], self.addr, 0x66)
-            
-            self.i2c.mem_write(cc_tup[18], self.addr, 0x67)
-            self.i2c.mem_write(cc_tup[19], self.addr, 0x68)
-            self.i2c.mem_write(cc_tup[20], self.addr, 0x69)
-            self.i2c.mem_write(cc_tup[21], self.addr, 0x6A)
-            
-            self.i2c.mem_write(12, self.addr, self.OPR_MODE) #to fusion mode
-            self.change_mode("NDOF")
+            self.change_mode("NDOF") #to fusion mode
             
     
-    def read_euler(self): #may need a mode change, handled in task maybe
-        '''!@brief              Reads and returns the Euler angle data
-            @returns            A struct containing 6 btyes of euler angle data
+    def save_calibration(self, path = CAL_FILE):
+        '''!@brief              Saves the calibration offsets to a binary file
+            @details            The file holds a magic number, the layout version, the axis mounting,
+                                the 22 offset bytes, and a CRC32 of all of them. It is written to a
+                                temporary file and read back, and only once it checks out is the old
+                                file renamed to a backup and the new one renamed into its place. At
+                                every step either the file or its backup holds a good calibration,
+                                which load_calibration() falls back to, so a reset part way through
+                                never leaves only a half written file.
+            @param              path Name of the calibration file
+            @returns            True if the offsets were saved, False if the IMU is not calibrated
+                                or the written file did not read back correctly
         '''
+        cc = self.get_coeffs()
+        if cc is None:
+            return False
         
-        EUL_DATA_X_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1A), "big")
-        EUL_DATA_X_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1B), "big")
-        EUL_DATA_Y_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1C), "big")
-        EUL_DATA_Y_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1D), "big")
-        EUL_DATA_Z_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1E), "big")
-        EUL_DATA_Z_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x1F), "big")
+        buf = self._cal_file_buf
+        struct.pack_into(CAL_FMT, buf, 0, CAL_MAGIC, CAL_VERSION, AXIS_MAP_CONFIG, AXIS_MAP_SIGN, cc, 0)
+        struct.pack_into('<I', buf, CAL_SIZE - 4, binascii.crc32(memoryview(buf)[:CAL_SIZE - 4]))
         
-        EA = struct.pack('6b', EUL_DATA_X_LSB, EUL_DATA_X_MSB, EUL_DATA_Y_LSB,
-                               EUL_DATA_Y_MSB, EUL_DATA_Z_LSB, EUL_DATA_Z_MSB)
-        return EA
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as file:
+            file.write(buf)
+        with open(tmp, 'rb') as file:
+            written = file.read()
+        if written != buf:
+            return False
         
+        # rename will not replace an existing file on every filesystem
+        bak = path + ".bak"
+        try:
+            os.remove(bak)
+        except OSError:
+            pass
+        try:
+            os.rename(path, bak)
+        except OSError:
+            pass # no calibration saved before
+        os.rename(tmp, path)
+        return True
+    
+    def load_calibration(self, path = CAL_FILE):
+        '''!@brief              Loads the calibration offsets from a binary file into the IMU
+            @details            The file is read in one go and checked before anything is written to the
+                                IMU. If it is missing or damaged, the backup save_calibration() keeps is
+                                tried instead.
+            @param              path Name of the calibration file
+            @returns            CAL_OK, CAL_MISSING, CAL_INVALID, or CAL_STALE
+        '''
+        status = self._read_calibration(path)
+        if status == CAL_MISSING or status == CAL_INVALID:
+            backup = self._read_calibration(path + ".bak")
+            if backup != CAL_MISSING:
+                status = backup
+        if status != CAL_OK:
+            return status
         
+        self.set_coeffs(memoryview(self._cal_file_buf)[CAL_OFFSETS:CAL_OFFSETS + 22])
+        return CAL_OK
+    
+    def _read_calibration(self, path):
+        '''!@brief              Reads a calibration file into the file buffer and checks it
+            @param              path Name of the calibration file
+            @returns            CAL_OK, CAL_MISSING, CAL_INVALID, or CAL_STALE
+        '''
+        buf = self._cal_file_buf
+        try:
+            with open(path, 'rb') as file:
+                num = file.readinto(buf)
+                extra = file.read(1)
+        except OSError:
+            return CAL_MISSING
         
+        if num != CAL_SIZE or extra:
+            return CAL_INVALID
+        magic, version, config, sign, cc, crc = struct.unpack_from(CAL_FMT, buf, 0)
+        if magic != CAL_MAGIC or binascii.crc32(memoryview(buf)[:CAL_SIZE - 4]) != crc:
+            return CAL_INVALID
+        if version != CAL_VERSION or config != AXIS_MAP_CONFIG or sign != AXIS_MAP_SIGN:
+            return CAL_STALE
+        return CAL_OK
+    
+    
+    def read_euler(self): #may need a mode change, handled in task maybe
+        '''!@brief              Reads and returns the Euler angle data
+            @details            The 6 data registers are read in one transaction
+            @returns            A buffer of 6 bytes of euler angle data, overwritten by the next call
+        '''
+        self.i2c.mem_read(self._eul_buf, self.addr, self.EUL_DATA)
+        return self._eul_buf
+    
     
     def read_ang_vel(self):
         '''!@brief              Reads and returns the anglular velocity data
-            @returns            A struct containing 6 btyes of angular velocity data
+            @details            The 6 data registers are read in one transaction
+            @returns            A buffer of 6 bytes of angular velocity data, overwritten by the next call
         '''
-        GYR_DATA_X_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x14), "big")
-        GYR_DATA_X_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x15), "big")
-        GYR_DATA_Y_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x16), "big")
-        GYR_DATA_Y_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x17), "big")
-        GYR_DATA_Z_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x18), "big")
-        GYR_DATA_Z_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x19), "big")
-        
-        AV = struct.pack('6b', GYR_DATA_X_LSB, GYR_DATA_X_MSB, GYR_DATA_Y_LSB,
-                               GYR_DATA_Y_MSB, GYR_DATA_Z_LSB, GYR_DATA_Z_MSB)
-        return AV
+        self.i2c.mem_read(self._gyr_buf, self.addr, self.GYR_DATA)
+        return self._gyr_buf
     
     
     def read_mag(self):
         '''!@brief              Reads and returns the magnetometer data
-            @returns            A struct containing 6 btyes of magnetometer data
+            @details            The 6 data registers are read in one transaction
+            @returns            A buffer of 6 bytes of magnetometer data, overwritten by the next call
         '''
-        MAG_DATA_X_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x0E), "big")
-        MAG_DATA_X_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x0F), "big")
-        MAG_DATA_Y_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x10), "big")
-        MAG_DATA_Y_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x11), "big")
-        MAG_DATA_Z_LSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x12), "big")
-        MAG_DATA_Z_MSB = int.from_bytes(self.i2c.mem_read(1, self.addr, 0x13), "big")
-        
-        MG = struct.pack('6b', MAG_DATA_X_LSB, MAG_DATA_X_MSB, MAG_DATA_Y_LSB,
-                               MAG_DATA_Y_MSB, MAG_DATA_Z_LSB, MAG_DATA_Z_MSB)
-        return MG
-
-        
\ No newline at end of file
+        self.i2c.mem_read(self._mag_buf, self.addr, self.MAG_DATA)
+        return self._mag_buf
+    
+    
+    def read_snapshot(self):
+        '''!@brief              Reads the acceleration, magnetometer, gyro, euler and quaternion data together
+            @details            The 32 data registers from 0x08 to 0x27 are read in one transaction, so
+                                every quantity comes from the same instant, and each 16 bit value is
+                                decoded in place and scaled to engineering units
+            @returns            The snapshot array, indexed by ACC_X to QUA_Z, overwritten by the next call
+        '''
+        buf = self._snap_buf
+        self.i2c.mem_read(buf, self.addr, self.ACC_DATA)
+        for idx in range(NUM_FIELDS):
+            raw = buf[2*idx] | (buf[2*idx + 1] << 8) # LSB first
+            if raw & 0x8000:
+                raw -= 0x10000
+            self.snapshot[idx] = raw * self._snap_scale[idx]
+        return self.snapshot
@@ -1,55 +1,130 @@
-'''!@file                       IMU_Task.py
-    @brief                      A class for driving the IMU in main
-    @details
+'''!@file                       ClosedLoop.py
+    @brief                      A PID controller used by the wheel speed loops and the line follower
+    @details                    The controller keeps its state between updates and scales the integral and
+                                derivative terms by the time step, either the measured time since the last
+                                update or a fixed default. The integral is kept in output units and is
+                                clamped, and it stops growing while the output is saturated in the same
+                                direction (anti-windup). The derivative is taken on the measurement, so
+                                setpoint steps do not kick the output, and can be low-pass filtered. A
+                                feedforward term proportional to the setpoint can be added. Updates only
+                                use numbers and attributes which already exist, so nothing new is
+                                allocated apart from the float results themselves.
     @author                     Andrew Whitacre
                                 Drake Small
-    @date                       October 22, 2023
+    @date                       October 18, 2026
 '''
 
-from task_share import Queue
-from task_share import Share
-'''!@package                    import Queue, Share
-'''
 class ClosedLoop:
-    
-    def __init__(self, kP, setPoint):
-        '''!@brief              Constructs an IMU Task object
-            @details            Sets flags, objects, motors, initializes data, mode, and state
-            @param              kP Share proportional gain
-            @param              setPoint Share for setPoint
+
+    def __init__(self, kP, setPoint, kI = 0.0, kD = 0.0, kF = 0.0, dt = 0.1,
+                 out_min = None, out_max = None, i_min = None, i_max = None, d_alpha = 1.0):
+        '''!@brief              Constructs a PID controller
+            @details            Sets gains, limits, and the default time step, and clears the controller state
+            @param              kP Proportional gain
+            @param              setPoint Initial setpoint
+            @param              kI Integral gain, per second
+            @param              kD Derivative gain, in seconds
+            @param              kF Feedforward gain applied to the setpoint
+            @param              dt Time step in seconds used when update() is not given one
+            @param              out_min Lowest output, or None for no limit
+            @param              out_max Highest output, or None for no limit
+            @param              i_min Lowest integral term, default out_min
+            @param              i_max Highest integral term, default out_max
+            @param              d_alpha Derivative filter coefficient from 0 to 1, 1 for no filtering
         '''
         self.kP = kP
-        self.setPoint = setPoint
-        self.integral = 0
-        
-    def set_gain(self, kP):
+        self.kI = kI
+        self.kD = kD
+        self.kF = kF
+        self.sp = setPoint
+        self.dt = dt
+        self.d_alpha = d_alpha
+        self.set_limits(out_min, out_max, i_min, i_max)
+        self.reset()
+
+    def set_gain(self, kP, kI = None, kD = None, kF = None):
+        '''!@brief              Changes the gains
+            @details            The integral is stored in output units, so changing kI does not bump the output
+            @param              kP Proportional gain
+            @param              kI Integral gain, or None to keep the present one
+            @param              kD Derivative gain, or None to keep the present one
+            @param              kF Feedforward gain, or None to keep the present one
+        '''
         self.kP = kP
-        
+        if kI is not None:
+            self.kI = kI
+        if kD is not None:
+            self.kD = kD
+        if kF is not None:
+            self.kF = kF
+
     def set_sp(self, sp):
+        '''!@brief              Changes the setpoint
+            @param              sp New setpoint
+        '''
         self.sp = sp
 
-        
-    def update(self, speedMeasured, kp, sp):
-        #amount of error between setPoint and measured speed
-        error = sp - speedMeasured
-        
-        #set the prop
-        proportional = kp * error
-        
-        # Adds the current error times the kI term to the integral
-        self.integral += (.5 * error)
-        
-        # Derivate takes the change of error times the kD term
-        #derivative = self.kD * (error-self.prev_error)
-        
-        # Update the prev_error for the next loop
-        #self.prev_error = error
-        
-        # Output of the controller
-        output = proportional + self.integral
-        #output = proportional
+    def set_limits(self, out_min, out_max, i_min = None, i_max = None):
+        '''!@brief              Changes the output and integral limits
+            @param              out_min Lowest output, or None for no limit
+            @param              out_max Highest output, or None for no limit
+            @param              i_min Lowest integral term, default out_min
+            @param              i_max Highest integral term, default out_max
+        '''
+        self.out_min = out_min
+        self.out_max = out_max
+        self.i_min = out_min if i_min is None else i_min
+        self.i_max = out_max if i_max is None else i_max
+
+    def reset(self):
+        '''!@brief              Clears the integral, the derivative filter, and the last measurement
+        '''
+        self.integral = 0.0
+        self.deriv = 0.0
+        self.prev_measured = 0.0
+        self.first = True
+        self.output = 0.0
+
+    def update(self, measured, dt = None):
+        '''!@brief              Runs the controller for one time step
+            @param              measured The measured value of the controlled quantity
+            @param              dt Seconds since the last update, or None to use the default time step
+            @returns            The controller output, within the output limits
+        '''
+        if dt is None or dt <= 0:
+            dt = self.dt
+
+        #amount of error between setPoint and measured value
+        error = self.sp - measured
+
+        # Derivative of the measurement, low-pass filtered; none on the first update
+        if self.first:
+            self.first = False
+        else:
+            d_raw = (self.prev_measured - measured) / dt
+            self.deriv += self.d_alpha * (d_raw - self.deriv)
+        self.prev_measured = measured
+
+        base = self.kF * self.sp + self.kP * error + self.kD * self.deriv
+
+        # Integrate unless the output is already saturated in the same direction
+        integral = self.integral + self.kI * error * dt
+        if self.i_max is not None and integral > self.i_max:
+            integral = self.i_max
+        elif self.i_min is not None and integral < self.i_min:
+            integral = self.i_min
+
+        output = base + integral
+        if self.out_max is not None and output > self.out_max:
+            if error < 0:
+                self.integral = integral
+            output = self.out_max
+        elif self.out_min is not None and output < self.out_min:
+            if error > 0:
+                self.integral = integral
+            output = self.out_min
+        else:
+            self.integral = integral
+
+        self.output = output
         return output
-    
-   
-        
-    
\ No newline at end of file
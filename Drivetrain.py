@@ -0,0 +1,117 @@
+'''!@file                       Drivetrain.py
+    @brief                      A class for driving Romi's two wheels together
+    @details                    Tasks command the robot's forward velocity and yaw rate, or each wheel's
+                                angular velocity, instead of setting motor duty cycles themselves. The
+                                wheel geometry is kept here once, and every duty cycle passes through
+                                the same steps for each wheel: a per-wheel offset which makes up for
+                                the motors' deadband and mismatch, an optional slew limit, and
+                                saturation at +/-100 %. A motor is only written when its duty cycle
+                                changes; L6206.set_duty() also skips unchanged writes and only writes
+                                the direction pin when the direction changes.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+## Wheel radius in m
+R_WHEEL = .035
+## Track width, the distance between the wheels, in m
+TRACK = .14
+
+
+def wheel_speeds(v, omega, r = R_WHEEL, L = TRACK):
+    '''!@brief              Turns a body velocity and yaw rate into wheel speeds
+        @param              v Forward velocity in m/s
+        @param              omega Yaw rate, counterclockwise positive, in rad/s
+        @param              r Wheel radius in m
+        @param              L Track width in m
+        @returns            Tuple of the left and right wheel angular velocities in rad/s
+    '''
+    turn = L * omega / 2
+    return (v - turn) / r, (v + turn) / r
+
+
+class Drivetrain:
+
+    def __init__(self, motor_L, motor_R, offset_L = 0, offset_R = 0, gain = 1.0, slew = None,
+                 limit = 100, r = R_WHEEL, L = TRACK):
+        '''!@brief              Constructs a drivetrain object
+            @param              motor_L Motor driving the left wheel
+            @param              motor_R Motor driving the right wheel
+            @param              offset_L Duty cycle in % added to the left wheel's speed commands
+            @param              offset_R Duty cycle in % added to the right wheel's speed commands
+            @param              gain Duty cycle in % per rad/s of wheel speed
+            @param              slew Most change in a wheel's duty cycle per command in %, or None for no limit
+            @param              limit Largest duty cycle in %
+            @param              r Wheel radius in m
+            @param              L Track width in m
+        '''
+        self.motors = (motor_L, motor_R)
+        self.offsets = (offset_L, offset_R)
+        self.gain = gain
+        self.slew = slew
+        self.limit = limit
+        self.r = r
+        self.L = L
+
+    def set_twist(self, v, omega):
+        '''!@brief              Drives the robot at a forward velocity and yaw rate
+            @param              v Forward velocity in m/s
+            @param              omega Yaw rate, counterclockwise positive, in rad/s
+        '''
+        omega_l, omega_r = wheel_speeds(v, omega, self.r, self.L)
+        self.set_wheels(omega_l, omega_r)
+
+    def set_wheels(self, omega_l, omega_r):
+        '''!@brief              Drives each wheel at an angular velocity, through the gain and offsets
+            @param              omega_l Left wheel angular velocity in rad/s
+            @param              omega_r Right wheel angular velocity in rad/s
+        '''
+        self.set_duty(self.offsets[0] + self.gain * omega_l,
+                      self.offsets[1] + self.gain * omega_r)
+
+    def set_duty(self, duty_l, duty_r):
+        '''!@brief              Sets both duty cycles, slew limited and saturated, without the offsets
+            @param              duty_l Left motor duty cycle in %
+            @param              duty_r Right motor duty cycle in %
+        '''
+        self._write(0, duty_l)
+        self._write(1, duty_r)
+
+    def stop(self):
+        '''!@brief              Sets both duty cycles to zero at once, ignoring the slew limit
+        '''
+        for motor in self.motors:
+            motor.set_duty(0)
+
+    def enable(self):
+        '''!@brief              Enables both motors
+        '''
+        for motor in self.motors:
+            motor.enable()
+
+    def disable(self):
+        '''!@brief              Disables both motors
+        '''
+        for motor in self.motors:
+            motor.disable()
+
+    def _write(self, idx, duty):
+        '''!@brief              Slew limits and saturates one wheel's duty cycle and writes it if it changed
+            @param              idx 0 for the left wheel, 1 for the right
+            @param              duty Commanded duty cycle in %
+        '''
+        # Slew from what the motor really has, which another task may have set
+        motor = self.motors[idx]
+        last = motor.duty
+        if self.slew is not None:
+            if duty > last + self.slew:
+                duty = last + self.slew
+            elif duty < last - self.slew:
+                duty = last - self.slew
+        if duty > self.limit:
+            duty = self.limit
+        elif duty < -self.limit:
+            duty = -self.limit
+        if duty != last:
+            motor.set_duty(duty)
@@ -7,18 +7,38 @@
 '''
 
 from pyb import Pin, Timer
-'''!@package              Import Pin and Timer from pyb
+import time
+import math
+import fixed_point as fp
+'''!@package              Import Pin and Timer from pyb, time, math, and fixed_point
 '''
 
+## Velocity filter: none, the raw estimate is used as is
+NO_FILTER = 0
+## Velocity filter: first order low-pass on the raw estimate
+LOW_PASS = 1
+## Velocity filter: alpha-beta tracker on the position
+ALPHA_BETA = 2
+
 class Encoder:
 
 
-    def __init__(self, pinA, pinB, tim_N):
+    def __init__(self, pinA, pinB, tim_N, cpr = 16384, filter = NO_FILTER, alpha = 0.5, beta = 0.1,
+                 min_counts = 4, stop_us = 200_000, fixed = False):
         '''!@brief              Constructs an encoder object
             @details            Defines pins, channels, initizalizes the Auto Reload limit and counts
             @param              pinA Pin for channel 1 of the Timer
             @param              pinB Pin for channel 2 of the Timer
             @param              tim_N Timer for the encoder
+            @param              cpr Counts per revolution of the wheel
+            @param              filter Velocity filter, NO_FILTER, LOW_PASS or ALPHA_BETA
+            @param              alpha Low-pass coefficient from 0 to 1, or the alpha-beta position gain
+            @param              beta Alpha-beta velocity gain
+            @param              min_counts Below this many counts per update, velocity is found from the
+                                time between count changes instead of the counts per update
+            @param              stop_us Microseconds without a count after which the wheel is stopped
+            @param              fixed True to estimate the velocity in Q16.16 RPM with fixed_point.py
+                                instead of floats; ALPHA_BETA is not available then
         '''
         self.PinA = Pin(pinA)
         self.PinB = Pin(pinB)
@@ -32,17 +52,65 @@ class Encoder:
         self.currcount = 0
         self.delta = 0
         
+        # Velocity estimation, in counts per second
+        self.cpr = cpr
+        self.filter = filter
+        self.alpha = alpha
+        self.beta = beta
+        self.min_counts = min_counts
+        self.stop_us = stop_us
+        self.stamp = None       # ticks_us of the latest update
+        self.dt_us = 0          # microseconds between the last two updates
+        self.dt = 0.0           # the same in seconds
+        self.raw_velocity = 0.0
+        self.velocity = 0.0
+        self._move_us = 0       # ticks_us and position at the last count change
+        self._move_pos = 0
+        self._x_est = 0.0       # alpha-beta position estimate
+        self._latch_count = 0   # counter and ticks_us saved by latch()
+        self._latch_us = 0
+        
+        # Fixed point estimate, in Q16.16 RPM and seconds
+        self.fixed = fixed
+        if fixed and filter == ALPHA_BETA:
+            raise ValueError("ALPHA_BETA needs floating point velocities")
+        self.rpm_q = 0
+        self.raw_rpm_q = 0
+        self.dt_q = 0
+        self._alpha_q = fp.from_float(alpha)
+        self._rpm_scale = fp.count_scale(60 / cpr)
+        
         # Auto Reload Limit
         self.arlim = 65535
         self.half_arlim = self.arlim//2
     
-    def update(self):
-        '''!@brief              Updates encoder position and delta
-            @details            Uses the timer's counter to update, accounts for over and underflow
+    def latch(self):
+        '''!@brief              Saves the timer's counter and the time for a later update_latched()
+            @details            Allocates nothing, so it can be called from a hard interrupt
+        '''
+        self._latch_count = self.tim_N.counter()
+        self._latch_us = time.ticks_us()
+    
+    def update_latched(self):
+        '''!@brief              Updates encoder position, delta, and velocity from the last latch()
+        '''
+        self.update(self._latch_us, self._latch_count)
+    
+    def update(self, now_us = None, count = None):
+        '''!@brief              Updates encoder position, delta, and velocity
+            @details            Uses the timer's counter to update, accounts for over and underflow.
+                                The velocity uses the measured time since the last update, so it does
+                                not depend on how regularly update() is called.
+            @param              now_us ticks_us() when the counter was read, or None to read it now
+            @param              count Counter value read earlier, or None to read it now
         '''
         
         self.prevcount = self.currcount #copy
-        self.currcount = self.tim_N.counter() #get current count
+        if count is None:
+            count = self.tim_N.counter() #get current count
+        self.currcount = count
+        if now_us is None:
+            now_us = time.ticks_us()
         self.delta = self.currcount - self.prevcount #final - inital counts
         
         if(self.delta < -(self.half_arlim)):
@@ -52,6 +120,91 @@ class Encoder:
                 
         self.position = self.position + self.delta #update running position
         
+        if self.stamp is None:
+            # Nothing to measure a velocity against yet
+            self._move_us = now_us
+            self._move_pos = self.position
+            self._x_est = self.position
+        else:
+            self.dt_us = time.ticks_diff(now_us, self.stamp)
+            if self.fixed:
+                self.dt_q = fp.ratio(self.dt_us, 1_000_000)
+                self._estimate_q(now_us)
+            else:
+                self.dt = self.dt_us / 1_000_000
+                self._estimate(now_us)
+        self.stamp = now_us
+    
+    def _estimate(self, now_us):
+        '''!@brief              Updates the velocity estimate after a new sample
+            @param              now_us ticks_us() of the new sample
+        '''
+        dt = self.dt
+        if dt <= 0:
+            return
+        
+        # Counts per update at speed, the time between count changes when slow
+        if abs(self.delta) >= self.min_counts:
+            raw = self.delta / dt
+            self._move_us = now_us
+            self._move_pos = self.position
+        elif self.delta != 0:
+            raw = (self.position - self._move_pos) * 1_000_000 / time.ticks_diff(now_us, self._move_us)
+            self._move_us = now_us
+            self._move_pos = self.position
+        else:
+            # No count yet: the wheel is no faster than one count in the time so far
+            waited = time.ticks_diff(now_us, self._move_us)
+            if waited >= self.stop_us:
+                raw = 0.0
+            else:
+                bound = 1_000_000 / waited
+                raw = self.raw_velocity
+                if raw > bound:
+                    raw = bound
+                elif raw < -bound:
+                    raw = -bound
+        self.raw_velocity = raw
+        
+        if self.filter == LOW_PASS:
+            self.velocity += self.alpha * (raw - self.velocity)
+        elif self.filter == ALPHA_BETA:
+            predicted = self._x_est + self.velocity * dt
+            residual = self.position - predicted
+            self._x_est = predicted + self.alpha * residual
+            self.velocity += self.beta * residual / dt
+        else:
+            self.velocity = raw
+        
+    def _estimate_q(self, now_us):
+        '''!@brief              Updates the fixed point velocity estimate after a new sample, like _estimate()
+            @param              now_us ticks_us() of the new sample
+        '''
+        if self.dt_us <= 0:
+            return
+        
+        if abs(self.delta) >= self.min_counts:
+            raw = fp.count_rate(self.delta, self.dt_us, self._rpm_scale)
+            self._move_us = now_us
+            self._move_pos = self.position
+        elif self.delta != 0:
+            raw = fp.count_rate(self.position - self._move_pos,
+                                time.ticks_diff(now_us, self._move_us), self._rpm_scale)
+            self._move_us = now_us
+            self._move_pos = self.position
+        else:
+            waited = time.ticks_diff(now_us, self._move_us)
+            if waited >= self.stop_us:
+                raw = 0
+            else:
+                bound = fp.count_rate(1, waited, self._rpm_scale)
+                raw = fp.sat(self.raw_rpm_q, -bound, bound)
+        self.raw_rpm_q = raw
+        
+        if self.filter == LOW_PASS:
+            self.rpm_q = fp.add(self.rpm_q, fp.mul(self._alpha_q, fp.sub(raw, self.rpm_q)))
+        else:
+            self.rpm_q = raw
         
     def get_position(self):
         '''!@brief              Gets the most recent encoder position
@@ -65,7 +218,40 @@ class Encoder:
         '''
         return self.delta
 
+    def get_velocity(self):
+        '''!@brief              Gets the most recent filtered velocity
+            @returns            Velocity in counts per second
+        '''
+        if self.fixed:
+            return fp.to_float(self.rpm_q) * self.cpr / 60
+        return self.velocity
+
+    def get_rpm(self):
+        '''!@brief              Gets the most recent filtered velocity in RPM
+            @returns            Velocity in revolutions per minute
+        '''
+        if self.fixed:
+            return fp.to_float(self.rpm_q)
+        return self.velocity * 60 / self.cpr
+
+    def get_rad_s(self):
+        '''!@brief              Gets the most recent filtered velocity in rad/s
+            @returns            Velocity in radians per second
+        '''
+        return self.get_velocity() * 2 * math.pi / self.cpr
+
+    def get_dt(self):
+        '''!@brief              Gets the time between the last two updates
+            @returns            Time in seconds
+        '''
+        if self.fixed:
+            return self.dt_us / 1_000_000
+        return self.dt
+
     def zero(self):
         '''!@brief              Resets the encoder position to zero            
         '''
+        # Keep the velocity estimate, it is measured relative to the position
+        self._x_est -= self.position
+        self._move_pos -= self.position
         self.position = 0
\ No newline at end of file
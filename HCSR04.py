@@ -1,33 +1,54 @@
 '''!@file                       HCSR04.py
     @brief                      A class for reading from the ultrasonic sensor
-    @details
+    @details                    Distances can be measured two ways. The blocking methods distance_mm() and
+                                distance_cm() send a pulse and wait for the echo, which can take as long
+                                as the echo timeout. For use in tasks, enable_async() attaches a pin
+                                interrupt to the echo pin; trigger_pulse() then only sends the pulse, the
+                                interrupt timestamps both edges of the echo into a small ring buffer, and
+                                last_cm(), age_ms() and valid() report the newest completed measurement
+                                without waiting.
     @author                     Roberto Sánchez
     @date                       December 14, 2023
 '''
 
 import machine
 import time
-'''!@package              Import machine and time
+import array
+'''!@package              Import machine, time, and array
 '''
 
 
 class HCSR04:
 
     # echo_timeout_us is based in chip range limit (400cm)
-    def init(self, trigger, echo):
+    def __init__(self, trigger, echo, echo_timeout_us = 500230, depth = 4):
         '''!@brief              Constructs an ultrasonic sensor object
-            @details            Defines limits, sets pins and their values
-            @param              pinA Pin for channel 1 of the Timer
-            @param              pinB Pin for channel 2 of the Timer
-            @param              tim_N Timer for the encoder
+            @details            Defines limits, sets pins and their values, and allocates the ring buffer
+                                used by the interrupt driven mode
+            @param              trigger Output pin connected to the sensor's trigger input
+            @param              echo Input pin connected to the sensor's echo output
+            @param              echo_timeout_us Longest echo to wait for, in microseconds
+            @param              depth Number of completed echoes kept by the interrupt driven mode
         '''
-        self.echo_timeout_us = 500230 #4m limit
+        self.echo_timeout_us = echo_timeout_us #4m limit
 
         self.trigger = trigger # Init trigger pin (out)
 
         self.trigger.value(0)
 
-        self.echo = echo   # Init echo pin (in) 
+        self.echo = echo   # Init echo pin (in)
+
+        # Ring buffer of echo widths and the times their falling edges were
+        # seen, written only by the echo interrupt
+        self._depth = depth
+        self._widths = array.array('l', [0] * depth)
+        self._stamps = array.array('l', [0] * depth)
+        self._count = 0         # Completed echoes, only the ISR changes this
+        self._rise_us = 0       # Time of the last rising edge
+        self._high = False      # True while an echo is in progress
+        self._fired_us = 0      # Time of the last trigger pulse
+        self._pending = False   # True from trigger_pulse() until the echo ends
+        self._echo_cb_ref = self._echo_cb   # Bound once so the ISR never allocates
 
     def _send_pulse_and_wait(self):
         '''!@brief              Sends a 10us pulse from the transmitter and waits for response
@@ -62,4 +83,92 @@ class HCSR04:
         '''
         pulse_time = self._send_pulse_and_wait()
         cms = (pulse_time / 2) / 29.1
-        return cms
\ No newline at end of file
+        return cms
+
+    def enable_async(self):
+        '''!@brief              Starts the interrupt driven ranging mode
+            @details            Attaches an interrupt to both edges of the echo pin
+        '''
+        self.echo.irq(handler = self._echo_cb_ref,
+                      trigger = machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING)
+
+    def disable_async(self):
+        '''!@brief              Stops the interrupt driven ranging mode
+        '''
+        self.echo.irq(handler = None)
+        self._pending = False
+
+    def _echo_cb(self, pin):
+        '''!@brief              Echo pin interrupt, timestamps both edges of the echo
+            @details            Runs as a hard interrupt, so it must not allocate memory
+            @param              pin The echo pin
+        '''
+        now = time.ticks_us()
+        if pin.value():
+            self._rise_us = now
+            self._high = True
+        elif self._high:
+            self._high = False
+            idx = self._count % self._depth
+            self._widths[idx] = time.ticks_diff(now, self._rise_us)
+            self._stamps[idx] = now
+            self._count += 1
+            self._pending = False
+
+    def trigger_pulse(self):
+        '''!@brief              Starts a measurement without waiting for the echo
+            @details            Does nothing while the previous echo is still expected, unless it has
+                                been missing for longer than the echo timeout. The result appears in
+                                last_cm() once the echo interrupt sees the end of the echo.
+            @returns            True if a pulse was sent, False if a measurement is still in progress
+        '''
+        now = time.ticks_us()
+        if self._pending and time.ticks_diff(now, self._fired_us) < self.echo_timeout_us:
+            return False
+
+        self._high = False
+        self._pending = True
+        self._fired_us = now
+        self.trigger.value(1) # Send a 10us pulse.
+        time.sleep_us(10)
+        self.trigger.value(0)
+        return True
+
+    def last_us(self):
+        '''!@brief              Gets the width of the newest completed echo
+            @returns            Echo width in microseconds, or -1 if there has not been one
+        '''
+        count = self._count
+        if count == 0:
+            return -1
+        return self._widths[(count - 1) % self._depth]
+
+    def last_cm(self):
+        '''!@brief              Gets the distance from the newest completed echo
+            @returns            Distance in cm, or -1 if there has not been an echo
+        '''
+        pulse_time = self.last_us()
+        if pulse_time < 0:
+            return -1
+        return (pulse_time / 2) / 29.1
+
+    def age_ms(self):
+        '''!@brief              Gets how long ago the newest echo ended
+            @returns            Age in ms, or -1 if there has not been an echo
+        '''
+        count = self._count
+        if count == 0:
+            return -1
+        stamp = self._stamps[(count - 1) % self._depth]
+        return time.ticks_diff(time.ticks_us(), stamp) // 1000
+
+    def valid(self, max_age_ms = 200):
+        '''!@brief              Checks whether the newest echo can be trusted
+            @details            An echo is valid if it is recent and shorter than the echo timeout
+            @param              max_age_ms Oldest echo to accept, in ms
+            @returns            True if last_cm() holds a valid measurement
+        '''
+        age = self.age_ms()
+        if age < 0 or age > max_age_ms:
+            return False
+        return self.last_us() < self.echo_timeout_us
@@ -8,15 +8,17 @@
 import struct
 import os
 from task_share import Queue
-from task_share import Share
+from task_share import Share, RecordShare
 from pyb import USB_VCP
 import math
-'''!@package              Import struct, os, queue, share, vcp and math
+import Logger
+import BNO055
+'''!@package              Import struct, os, queue, share, record share, vcp, math, Logger and BNO055
 '''
 
 class IMU_Task:
     
-    def __init__(self, imu, modeID:Share, EA:Share, AV:Share, cc:Share, command_flag, motor_A, motor_B):
+    def __init__(self, imu, modeID:Share, EA:Share, AV:Share, cc:Share, command_flag, motor_A, motor_B, log = None, snapshot: RecordShare = None, ser = None):
         '''!@brief              Constructs an IMU Task object
             @details            Sets flags, objects, motors, initializes data, mode, and state
             @param              imu For IMU object
@@ -27,8 +29,15 @@ class IMU_Task:
             @param              command_flag Command from UI
             @param              motor_A Motor A
             @param              motor_B Motor B
+            @param              log Logger for calibration progress, or None for no logging
+            @param              snapshot RecordShare of BNO055.NUM_FIELDS floats which receives every
+                                IMU quantity once per run, or None to not publish them
+            @param              ser Where text for the user is written, such as an Output_Task channel,
+                                or None to write straight to the USB serial port
         '''
         self.imu = imu
+        self.log = Logger.null if log is None else log
+        self.snapshot = snapshot
         self.command_flag = command_flag
         self.modeID = modeID # start in config mode
         self.EA = EA
@@ -36,7 +45,7 @@ class IMU_Task:
         self.cc = cc
         self.motor_A = motor_A
         self.motor_B = motor_B
-        self.ser = USB_VCP()
+        self.ser = USB_VCP() if ser is None else ser
         self.state = 0
         self.mode_dict = {0: "CONFIG",
                           8: "IMU",
@@ -45,39 +54,47 @@ class IMU_Task:
                           11: "NDOF_FMC_OFF",
                           12: "NDOF", }
         
+        # Mode each command reads the sensor in; the compass pivot stays in
+        # COMPASS until another command needs the fusion mode
+        self.cmd_modes = {'a': "NDOF",
+                          'b': "NDOF",
+                          'e': "NDOF",
+                          'f': "NDOF",
+                          'n': "COMPASS"}
+        
         self.imu.change_mode("NDOF")
+        self.modeID.put(BNO055.MODES["NDOF"])
         
     
     def run(self):
         '''!@brief              FSM for the IMU Task
-            @details            Reads in coefficients if a file exists, else, calibrate to get data, then takes data based on UI command
+            @details            Reads in coefficients if a good calibration file exists, else, calibrate to get data, then takes data based on UI command
         '''
         while True:
             # print(self.imu.mode)
             # print("State: " + str(self.state))
             
             if self.state == 0:
-                print(self.imu.get_status())
-                if "IMU_cal_coeffs.txt" in os.listdir():
-                    print("FILE EXISTS")
-                    self.state = 1
-                else:
-                    self.state = 2
+                self.imu.get_status()
+                self.log.info(Logger.TASK_IMU, Logger.IMU_STATUS, self.imu.status)
+                self.state = 1
         
-            # State 1: File exists, read the coefficients
+            # State 1: Load the coefficients from the calibration file if it is good
             elif self.state == 1:
-                with open("IMU_cal_coeffs.txt", 'r') as file:
-                    values = file.readline().strip().split(',')
-                    cc_list = bytearray([int(value, 16) for value in values])
-                    cc_struct = struct.pack('22b', *cc_list)
-                    self.imu.set_coeffs(cc_struct)
-                self.state = 4 # Skip to command state since we have coeffs already
+                status = self.imu.load_calibration()
+                self.log.info(Logger.TASK_IMU, Logger.IMU_CALIB_FILE, status)
+                if status == BNO055.CAL_OK:
+                    self.state = 4 # Skip to command state since we have coeffs already
+                else:
+                    self.state = 2 # Missing, damaged or stale file, calibrate again
                 
             # State 2: Calibration
             elif self.state == 2:
                 self.imu.change_mode("NDOF")
-                self.ser.write(str((struct.unpack('b', self.imu.i2c.mem_read(1, 0x28, 0x35))[0])) + "\n\r")
-                if self.imu.get_status():
+                calibrated = self.imu.get_status()
+                self.ser.write(str(self.imu.status) + "\n\r")
+                self.log.debug(Logger.TASK_IMU, Logger.IMU_STATUS, self.imu.status)
+                if calibrated:
                     self.state = 3 # Once calibrated, go to next step
                 else:
                     self.state = 2 #not calibrated, stay in calibration state
@@ -85,80 +102,74 @@ class IMU_Task:
             
             # State 3: Write new coefficients to file
             elif self.state == 3:
-                with open("IMU_cal_coeffs.txt", 'w') as file:
-                    print("FILE DOES NOT EXIST")
-                    # print(self.imu.get_status())
-                    if self.imu.get_status():
-                        cc_tuple = struct.unpack('22b', self.imu.get_coeffs())
-                        print(str(cc_tuple))
-                        file.write(','.join(map(str, cc_tuple)))
+                if self.imu.get_status() and self.imu.save_calibration():
+                    self.log.info(Logger.TASK_IMU, Logger.IMU_COEFFS_SAVED)
                             
                 self.state = 4 # Now we have new coeffs, go to command state
             
             
             # Command Flag State
             elif self.state == 4:
-                # euler angles
-                if chr(self.command_flag.get()) == 'a':
-                    self.imu.change_mode("NDOF")
-                    x,y,z = struct.unpack('hhh', self.imu.read_euler())
-                    
-                    # Convert to degrees
-                    x = x // 16
-                    y = y // 16
-                    z = z // 16
-                    self.ser.write(f"OLEA - X: {x}, Y: {y}, Z: {z}\n\r")
-                    
+                cmd = chr(self.command_flag.get())
                 
-                # angular velocity
-                elif chr(self.command_flag.get()) == 'b':
-                    x,y,z = struct.unpack('hhh', self.imu.read_ang_vel())
+                # A command which needs another mode asks for it, and the
+                # change is made over the next runs instead of waited for
+                mode = self.cmd_modes.get(cmd)
+                if mode is not None and mode != self.imu.target_mode:
+                    self.imu.request_mode(mode)
+                    self.modeID.put(BNO055.MODES[mode])
+                    self.log.info(Logger.TASK_IMU, Logger.IMU_MODE, BNO055.MODES[mode])
+                
+                if self.imu.service():
+                    # One bus transaction per run gives every quantity, which is
+                    # published for other tasks and used by the commands below
+                    snap = self.imu.read_snapshot()
+                    if self.snapshot is not None:
+                        self.snapshot.put(snap)
                     
-                    # Convert to degrees/sec
-                    x = x // 16
-                    y = y // 16
-                    z = z // 16
-                    self.ser.write(f"OLAV - X: {x}, Y: {y}, Z: {z}\n\r")
+                    # euler angles
+                    if cmd == 'a':
+                        x = int(snap[BNO055.HEADING]) # degrees
+                        y = int(snap[BNO055.ROLL])
+                        z = int(snap[BNO055.PITCH])
+                        self.ser.write(f"OLEA - X: {x}, Y: {y}, Z: {z}\n\r")
                     
-                # magnetometer
-                elif chr(self.command_flag.get()) == 'n':
-                    self.imu.change_mode("COMPASS")
-                    x,y,z = struct.unpack('hhh', self.imu.read_mag())
+                
+                    # angular velocity
+                    elif cmd == 'b':
+                        x = int(snap[BNO055.GYR_X]) # degrees/sec
+                        y = int(snap[BNO055.GYR_Y])
+                        z = int(snap[BNO055.GYR_Z])
+                        self.ser.write(f"OLAV - X: {x}, Y: {y}, Z: {z}\n\r")
                     
-                    # Convert to uT
-                    x = x // 16
-                    y = y // 16
-                    z = z // 16
-                    if  (-3 < y and y < 3):
-                        print("FACING NORTH (kinda)")
-                        self.motor_A.set_duty(0)
-                        self.motor_B.set_duty(0)
-                        # self.command_flag.put(0)
-                    else:
-                        self.motor_A.set_duty(20)
-                        self.motor_B.set_duty(-20)
-                    self.ser.write(f"OLMG - X: {x}, Y: {y}, Z: {z}\n\r")
-                    self.imu.change_mode("NDOF")
+                    # magnetometer
+                    elif cmd == 'n':
+                        x = int(snap[BNO055.MAG_X]) # uT
+                        y = int(snap[BNO055.MAG_Y])
+                        z = int(snap[BNO055.MAG_Z])
+                        if  (-3 < y and y < 3):
+                            self.log.info(Logger.TASK_IMU, Logger.IMU_NORTH, y)
+                            self.motor_A.set_duty(0)
+                            self.motor_B.set_duty(0)
+                            # self.command_flag.put(0)
+                        else:
+                            self.motor_A.set_duty(20)
+                            self.motor_B.set_duty(-20)
+                        self.ser.write(f"OLMG - X: {x}, Y: {y}, Z: {z}\n\r")
                     
-                # euler angles
-                elif chr(self.command_flag.get()) == 'e':
-                    x,y,z = struct.unpack('hhh', self.imu.read_euler())
-        
-                    # Convert to degrees
-                    x = x // 16
-                    y = y // 16
-                    z = z // 16
-                    self.ser.write(f"CLEA - X: {x}, Y: {y}, Z: {z}\n\r")
+                    # euler angles
+                    elif cmd == 'e':
+                        x = int(snap[BNO055.HEADING]) # degrees
+                        y = int(snap[BNO055.ROLL])
+                        z = int(snap[BNO055.PITCH])
+                        self.ser.write(f"CLEA - X: {x}, Y: {y}, Z: {z}\n\r")
                     
         
-                # angular velocity
-                elif chr(self.command_flag.get()) == 'f':    
-                    x,y,z = struct.unpack('hhh', self.imu.read_ang_vel())
-        
-                    # Convert to m/s^2
-                    x = x // 900
-                    y = y // 900
-                    z = z // 900
-                    self.ser.write(f"CLAV - X: {x}, Y: {y}, Z: {z}\n\r")
+                    # angular velocity
+                    elif cmd == 'f':
+                        x = int(math.radians(snap[BNO055.GYR_X])) # rad/s
+                        y = int(math.radians(snap[BNO055.GYR_Y]))
+                        z = int(math.radians(snap[BNO055.GYR_Z]))
+                        self.ser.write(f"CLAV - X: {x}, Y: {y}, Z: {z}\n\r")
                 
             yield self.state
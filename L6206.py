@@ -37,17 +37,23 @@ class L6206:
     
     def set_duty (self, duty):
         '''!@brief              Sets the duty cycle of the motor
-            @details            If duty paramter is negative, it converted back to a positive value and the direction pin is sent high, else it is sent low
+            @details            If duty paramter is negative, it converted back to a positive value and the direction pin is sent high, else it is sent low.
+                                Nothing is written if the duty cycle has not changed, and the direction pin is only written when the sign changes.
             @param              duty The duty cycle entered as a percentage of a pulse
         '''
-        self.duty = duty
-        if duty < 0:
+        if duty == self.duty:
+            return
+        reverse = duty < 0
+        if reverse:
             self.PWM.pulse_width_percent(-1*duty)
-            self.Dir_pin.high()
-
         else:
             self.PWM.pulse_width_percent(duty)
-            self.Dir_pin.low()
+        if reverse != (self.duty < 0):
+            if reverse:
+                self.Dir_pin.high()
+            else:
+                self.Dir_pin.low()
+        self.duty = duty
             
     
     def enable(self):
@@ -1,51 +1,89 @@
 '''!@file                       LineFollowerPID.py
     @brief                      A class for PID control
-    @details
+    @details                    Runs the line error through a ClosedLoop controller and turns its output
+                                into target speeds for each wheel. The gains keep their per-update
+                                meaning at the nominal time step dt; when a measured time step is given
+                                the integral and derivative terms are scaled to match.
     @author                     Andrew Whitacre
                                 Drake Small
     @date                       December 11, 2023
 '''
 
+import ClosedLoop as CL
+import Drivetrain as DT
+import fixed_point as fp
+import array
+'''!@package              Import ClosedLoop, Drivetrain, fixed_point, and array
+'''
+
 class LineFollowerPID:
 
-    def init(self, v_target, omega_target, Kp, Ki, Kd):
+    def __init__(self, v_target, omega_target, Kp, Ki, Kd, dt = 0.06, i_limit = None, out_limit = None, fixed = False):
         '''!@brief              Constructs a PID controller object
             @details            Defines constants, sets PID variables
             @param              v_target Target linear velocity
             @param              omega_target Setpoint for angular velocity of the robot
             @param              Kp Proportional gain of controller
-            @param              Ki Integral gain of controller
-            @param              Kd Derivative gain of controller
+            @param              Ki Integral gain of controller, per update at the nominal time step
+            @param              Kd Derivative gain of controller, per update at the nominal time step
+            @param              dt Nominal time between updates in seconds
+            @param              i_limit Largest size of the integral term, or None for no limit
+            @param              out_limit Largest size of the controller output, or None for no limit
+            @param              fixed True to run the controller in fixed point with
+                                get_wheel_speed_into(), which returns its result in an array
         '''
-        self.r = .035 #m
-        self.L = .14 #m
+        self.r = DT.R_WHEEL
+        self.L = DT.TRACK
         self.v_target = v_target
         self.omega_target = omega_target
         self.Kp = Kp
         self.Ki = Ki
         self.Kd = Kd
 
-        # Initialize PID vars
-        self.error = 0.0
-        self.last_error = 0.0
-        self.integral = 0.0
+        # Initialize PID vars, the error is in Q16.16 when fixed
+        self.error = 0 if fixed else 0.0
 
+        # The error is fed in as a negative measurement against a setpoint of zero
+        i_min = None if i_limit is None else -i_limit
+        out_min = None if out_limit is None else -out_limit
+        loop = fp.PID if fixed else CL.ClosedLoop
+        self.fixed = fixed
+        self.pid = loop(Kp, 0.0, kI = Ki / dt, kD = Kd * dt, dt = dt,
+                        out_min = out_min, out_max = out_limit,
+                        i_min = i_min, i_max = i_limit)
 
-    def get_wheel_speed(self):
+        # Wheel speeds for the target motion, left then right, in Q16.16 rad/s
+        self._base = array.array('i', [0, 0])
+        fp.Kinematics(self.r, self.L).wheel_speeds_into(self._base, fp.from_float(v_target),
+                                                        fp.from_float(omega_target))
+
+    def get_wheel_speed(self, dt = None):
         '''!@brief              Uses PID to get an output, uses output to calulate angular velocity of wheels
+            @param              dt Seconds since the last update, or None to use the nominal time step
             @returns            Tuple of the target angular velocities of each wheel
         '''
-        # Add to the integral error
-        self.integral += self.error
-
         #find output
-        output = self.Kp * self.error + self.Ki * self.integral + self.Kd * (self.error - self.last_error)
+        output = self.pid.update(-self.error, dt)
 
         # Calculate angular velocities of the wheels using the output
-        omega_r = (self.v_target + self.L * self.omega_target / 2) / self.r + output
-        omega_l = (self.v_target - self.L * self.omega_target / 2) / self.r - output
+        omega_l, omega_r = DT.wheel_speeds(self.v_target, self.omega_target, self.r, self.L)
 
-        # Save current error for integral next loop
-        self.last_error = self.error
+        return omega_r + output, omega_l - output
 
-        return omega_r, omega_l
\ No newline at end of file
+    def get_wheel_speed_into(self, dest, dt_us = None):
+        '''!@brief              Fixed point version of get_wheel_speed() for a controller made with fixed=True
+            @details            The error must be set in Q16.16
+            @param              dest Array of at least 2 integers which gets the target angular
+                                velocities of the right then the left wheel in Q16.16 rad/s
+            @param              dt_us Microseconds since the last update, or None to use the nominal time step
+        '''
+        dt = None if dt_us is None else fp.ratio(dt_us, 1_000_000)
+        output = self.pid.update(-self.error, dt)
+        dest[0] = fp.add(self._base[1], output)
+        dest[1] = fp.sub(self._base[0], output)
+
+    def reset(self):
+        '''!@brief              Clears the controller's integral and derivative history
+        '''
+        self.error = 0 if self.fixed else 0.0
+        self.pid.reset()
@@ -0,0 +1,179 @@
+'''!@file                       Logger.py
+    @brief                      A class for cheap diagnostic logging from tasks
+    @details                    Instead of formatting and printing a string, a task logs a fixed-size
+                                binary record holding a timestamp, the task's ID, a level, a message
+                                code and two integer arguments. Records are packed into a preallocated
+                                ring buffer, so logging takes a few microseconds and never waits on the
+                                serial link; if the ring fills up the oldest records are overwritten and
+                                counted as dropped. The records are sent later, as telemetry frames on
+                                their own stream, by flush() or by the low priority task run(), and
+                                log_decode.py turns them back into text on the PC.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import struct
+import time
+import Telemetry
+'''!@package              Import struct, time, and Telemetry
+'''
+
+## Level for detailed messages, normally filtered out
+DEBUG = 10
+## Level for normal messages such as state changes
+INFO = 20
+## Level for unexpected but handled conditions
+WARN = 30
+## Level for failures
+ERROR = 40
+## Level which filters out everything
+OFF = 100
+
+## Task ID of QTR_Task
+TASK_QTR = 1
+## Task ID of IMU_Task
+TASK_IMU = 2
+## Task ID of Motor_Task
+TASK_MOTOR = 3
+## Task ID of the user interface task
+TASK_UI = 4
+
+## Message code: a task changed state to a
+STATE = 1
+## Message code: the line follower's prev flag a and wall flag b
+WALL_FLAGS = 2
+## Message code: the ultrasonic range is a mm
+RANGE = 3
+## Message code: IMU calibration status a, packed as in the CALIB_STAT register
+IMU_STATUS = 4
+## Message code: the IMU calibration file was loaded with status a, see BNO055.CAL_OK
+IMU_CALIB_FILE = 5
+## Message code: IMU calibration coefficients were saved
+IMU_COEFFS_SAVED = 6
+## Message code: the IMU is facing north, magnetometer y reading a
+IMU_NORTH = 7
+## Message code: the IMU was asked to change to operating mode a
+IMU_MODE = 8
+
+## Stream ID of log frames, see Telemetry.py
+STREAM_ID = 100
+## Layout of one record after the timestamp: task, level, code, a, b
+FMT = 'BBhii'
+## Layout of a whole record including its timestamp
+REC_FMT = '<I' + FMT
+## Number of bytes in one record
+REC_SIZE = struct.calcsize(REC_FMT)
+
+
+class Logger:
+
+    def __init__(self, out = None, depth = 64, level = INFO, batch = 16):
+        '''!@brief              Constructs a logger
+            @details            Allocates the ring buffer and, if there is an output, the frame buffer
+            @param              out Object with a write() method for flushed records, or None to only buffer
+            @param              depth Number of records the ring buffer holds
+            @param              level Records below this level are ignored
+            @param              batch Number of records sent in one frame when flushing
+        '''
+        self.level = level
+        self._depth = depth
+        self._ring = bytearray(depth * REC_SIZE)
+        self._view = memoryview(self._ring)
+        self._wr = 0        # Slot the next record goes in
+        self._num = 0       # Records waiting to be flushed
+        self.dropped = 0
+        self.logged = 0
+        self._batch = batch
+
+        if out is None:
+            self._telem = None
+        else:
+            self._telem = Telemetry.Telemetry(out, FMT, batch = batch, stream_id = STREAM_ID)
+
+    def log(self, level, task, code, a = 0, b = 0):
+        '''!@brief              Adds a record to the ring buffer if its level is high enough
+            @param              level DEBUG, INFO, WARN or ERROR
+            @param              task ID of the task logging the record
+            @param              code Message code, which says what a and b mean
+            @param              a First argument of the message
+            @param              b Second argument of the message
+        '''
+        if level < self.level:
+            return
+        struct.pack_into(REC_FMT, self._ring, self._wr * REC_SIZE,
+                         time.ticks_us(), task, level, code, a, b)
+        self._wr += 1
+        if self._wr >= self._depth:
+            self._wr = 0
+        if self._num < self._depth:
+            self._num += 1
+        else:
+            self.dropped += 1   # The oldest record was just overwritten
+        self.logged += 1
+
+    def debug(self, task, code, a = 0, b = 0):
+        '''!@brief              Logs a record at DEBUG level, see log()
+        '''
+        self.log(DEBUG, task, code, a, b)
+
+    def info(self, task, code, a = 0, b = 0):
+        '''!@brief              Logs a record at INFO level, see log()
+        '''
+        self.log(INFO, task, code, a, b)
+
+    def warn(self, task, code, a = 0, b = 0):
+        '''!@brief              Logs a record at WARN level, see log()
+        '''
+        self.log(WARN, task, code, a, b)
+
+    def error(self, task, code, a = 0, b = 0):
+        '''!@brief              Logs a record at ERROR level, see log()
+        '''
+        self.log(ERROR, task, code, a, b)
+
+    def pending(self):
+        '''!@brief              Gets the number of records waiting to be flushed
+            @returns            Number of records in the ring buffer
+        '''
+        return self._num
+
+    def flush(self, max_records = -1):
+        '''!@brief              Sends waiting records, oldest first
+            @details            Without an output the records are simply discarded
+            @param              max_records Most records to send, or a negative number for all of them
+            @returns            Number of records sent
+        '''
+        count = self._num
+        if 0 <= max_records < count:
+            count = max_records
+
+        if self._telem is not None:
+            frame = self._telem.frame_buffer()
+            rd = self._wr - self._num
+            if rd < 0:
+                rd += self._depth
+            for i in range(count):
+                off = self._telem.reserve()
+                src = rd * REC_SIZE
+                frame[off:off + REC_SIZE] = self._view[src:src + REC_SIZE]
+                rd += 1
+                if rd >= self._depth:
+                    rd = 0
+            self._telem.flush()
+
+        self._num -= count
+        return count
+
+    def run(self):
+        '''!@brief              Task which flushes one frame of records per run
+            @details            Schedule this at the lowest priority so records are only sent when
+                                no other task has work to do
+        '''
+        while True:
+            self.flush(self._batch if self._telem is not None else -1)
+            yield self._num
+
+
+## A logger which ignores everything, for tasks created without one
+null = Logger(depth = 1, level = OFF)
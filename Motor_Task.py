@@ -0,0 +1,307 @@
+'''!@file                       Motor_Task.py
+    @brief                      A class for driving both motors in main
+    @details                    Replaces the separate Motor A and Motor B tasks. Both encoders are read
+                                back to back at the start of every run so the two wheels are sampled at
+                                the same instant, then each wheel's state machine and controller are
+                                run. Commands arrive from the UI as bytes in a queue; at most one is
+                                taken per run and looked up in a table of handlers. Lowercase commands
+                                go to Motor A and uppercase commands go to Motor B, as listed in the
+                                UI menu.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+from pyb import UART, USB_VCP
+from task_share import Share, Queue, RecordShare
+import ClosedLoop as CL
+import fixed_point as fp
+import Telemetry
+import time
+import array
+'''!@package              Import UART, vcp, share, queue, record share, CL, fixed_point, Telemetry, time, and array
+'''
+
+class Motor_Task:
+
+    def __init__(self, motor_A, motor_B, encoder_A, encoder_B, duty_cycle: Share, OC: Share, sp: Share, gain: Share, commands: Queue, setpoints: RecordShare = None, ser = None, uart = None, fixed = False):
+        '''!@brief              Constructs a Motor Task object
+            @details            Sets flags, objects, motors, collects open/closed loop response data for both wheels
+            @param              motor_A Motor A, the left wheel
+            @param              motor_B Motor B, the right wheel
+            @param              encoder_A Encoder on Motor A
+            @param              encoder_B Encoder on Motor B
+            @param              duty_cycle Share for duty cycle of motor
+            @param              OC Share for open/closed loop
+            @param              sp Share for closed loop setpoint
+            @param              gain Share for closed loop gain
+            @param              commands Queue of command bytes from the UI, one per completed command
+            @param              setpoints RecordShare of the speed setpoints of Motor A and Motor B in
+                                RPM, written by an outer task, or None to set them from the UI; with
+                                fixed it holds integers in Q16.16
+            @param              ser Where text for the user is written, such as an Output_Task channel,
+                                or None to write straight to the USB serial port
+            @param              uart Where telemetry frames are written, such as an Output_Task channel,
+                                or None to write straight to UART 2
+            @param              fixed True to run the speed loops in fixed point, which needs encoders
+                                made with fixed=True
+        '''
+        if ser is None:
+            ser = USB_VCP()
+        if uart is None:
+            uart = UART(2, 115200)
+            uart.init(115200, bits=8, parity=None, stop=1)
+        self.ser = ser
+        self.uart = uart
+
+        # Constructors
+        self.commands = commands
+        self.gain = gain
+        self.duty_cycle = duty_cycle
+        self.setpoint = sp
+        self.OC = OC
+
+        # Everything for one wheel is at the same index, 0 = A and 1 = B
+        self.names = ("A", "B")
+        self.motors = (motor_A, motor_B)
+        self.encoders = (encoder_A, encoder_B)
+        for motor in self.motors:
+            motor.set_duty(0)
+            motor.enable()
+        # Speed loops work in RPM; their +/-250 output maps onto +/-100 % duty
+        self.fixed = fixed
+        loop = fp.PID if fixed else CL.ClosedLoop
+        self.closedloops = (loop(self.gain.get(), self.setpoint.get(), kI=5.0, dt=0.1,
+                                 out_min=-250, out_max=250),
+                            loop(self.gain.get(), self.setpoint.get(), kI=5.0, dt=0.1,
+                                 out_min=-250, out_max=250))
+        self._duty_scale = fp.from_float(100/250)
+
+        # Position and speed samples go out in binary frames, see Telemetry.py
+        self.telems = (Telemetry.Telemetry(self.uart, 'if', batch=16, stream_id=1),
+                       Telemetry.Telemetry(self.uart, 'if', batch=16, stream_id=2))
+
+        self.state = [1, 1] # set both wheels to Open Loop initially
+        self.start = [0, 0] # start times of data collection
+        self.now = 0        # time of the current run, shared by both wheels
+        
+        # Set when the encoders and speed loops are run by a rate group
+        self.fast = False
+        self.setpoints = setpoints
+        self._sp_buf = array.array('i' if fixed else 'f', [0, 0])
+        self.sp_misses = 0  # control() runs which kept the old setpoints
+        
+        # Handler, wheel, and the state the wheel must be in for each command
+        # byte; lowercase letters are for Motor A and uppercase for Motor B
+        self.dispatch = {}
+        for letter, handler, state in (('m', self.cmd_duty, 1),
+                                       ('z', self.cmd_zero, 1),
+                                       ('p', self.cmd_position, 1),
+                                       ('d', self.cmd_delta, 1),
+                                       ('v', self.cmd_velocity, 1),
+                                       ('g', self.cmd_collect, 1),
+                                       ('c', self.cmd_closed, 1),
+                                       ('k', self.cmd_gain, 3),
+                                       ('s', self.cmd_setpoint, 3),
+                                       ('r', self.cmd_step, 3),
+                                       ('o', self.cmd_open, 3)):
+            self.dispatch[ord(letter)] = (handler, 0, state)
+            self.dispatch[ord(letter.upper())] = (handler, 1, state)
+
+
+    def attach(self, group, divisor = 1):
+        '''!@brief              Moves encoder sampling and the speed loops into a rate group
+            @details            Both encoders are latched in the timer interrupt and the closed loop
+                                wheels are updated right after it, so their timing does not depend on
+                                the other tasks. run() then only handles commands and telemetry.
+            @param              group RateGroup to run in
+            @param              divisor Run on every divisor'th tick of the group
+        '''
+        group.add_hard(self.sample, divisor)
+        group.add(self.control, divisor)
+        self.fast = True
+
+
+    def sample(self):
+        '''!@brief              Latches both encoders at the same instant, safe in a hard interrupt
+        '''
+        self.encoders[0].latch()
+        self.encoders[1].latch()
+
+
+    def control(self):
+        '''!@brief              Updates both encoders from their latches and runs the closed loop wheels
+            @details            Runs in a rate group's soft callback, which can interrupt a task in the
+                                middle of writing the setpoints, so a torn read is not retried forever;
+                                the previous setpoints are kept instead
+        '''
+        self.encoders[0].update_latched()
+        self.encoders[1].update_latched()
+        
+        if self.setpoints is not None:
+            if self.setpoints.get_into(self._sp_buf, 3):
+                if self.fixed:
+                    self.closedloops[0].set_sp_q(self._sp_buf[0])
+                    self.closedloops[1].set_sp_q(self._sp_buf[1])
+                else:
+                    self.closedloops[0].set_sp(self._sp_buf[0])
+                    self.closedloops[1].set_sp(self._sp_buf[1])
+            else:
+                self.sp_misses += 1
+        
+        for idx in range(2):
+            if self.state[idx] == 4:
+                self.close_loop(idx)
+
+
+    def close_loop(self, idx):
+        '''!@brief              Runs one update of one wheel's speed loop and sets its duty cycle
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        encoder = self.encoders[idx]
+        # Speed loop output of +/-250 maps onto +/-100 % duty
+        if self.fixed:
+            output = self.closedloops[idx].update(encoder.rpm_q, encoder.dt_q)
+            self.motors[idx].set_duty(fp.to_int(fp.mul(output, self._duty_scale)))
+            return
+        output = self.closedloops[idx].update(encoder.get_rpm(), encoder.get_dt())
+        self.motors[idx].set_duty(output*100/250)
+
+
+    def run(self):
+        '''!@brief              FSM for the Motor_Task
+            @details            Samples both encoders unless a rate group does, dispatches the next command, then runs each wheel's FSM
+        '''
+        while True:
+            # Sample both wheels at the same instant; each encoder times its
+            # own samples, so velocities do not depend on the task period
+            self.now = time.ticks_ms()
+            if not self.fast:
+                now_us = time.ticks_us()
+                self.encoders[0].update(now_us)
+                self.encoders[1].update(now_us)
+
+            # At most one command per run, looked up instead of searched for
+            entry = self.dispatch.get(self.commands.try_get())
+            if entry is not None:
+                handler, idx, state = entry
+                if self.state[idx] == state:
+                    handler(idx)
+
+            self.wheel(0)
+            self.wheel(1)
+
+            # Both states in one number, tens for A and ones for B
+            yield 10*self.state[0] + self.state[1]
+
+
+    def cmd_duty(self, idx):
+        '''!@brief              Sets the duty cycle of the motor from the duty cycle share
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.motors[idx].set_duty(self.duty_cycle.get())
+
+    def cmd_zero(self, idx):
+        '''!@brief              Zeros the position of the encoder
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.encoders[idx].zero()
+
+    def cmd_position(self, idx):
+        '''!@brief              Prints out the position of the encoder
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.ser.write("\n\r"+"Motor "+self.names[idx]+" Encoder Position:"+str(self.encoders[idx].get_position())) #write position to PuTTY
+
+    def cmd_delta(self, idx):
+        '''!@brief              Prints out the delta of the encoder
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.ser.write("\n\r"+"Motor "+self.names[idx]+" Encoder Delta:"+str(self.encoders[idx].get_delta()))
+
+    def cmd_velocity(self, idx):
+        '''!@brief              Prints out the velocity of the encoder
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.ser.write("\n\r"+"Motor "+self.names[idx]+" Encoder velocity:"+str(self.encoders[idx].get_rpm()))
+
+    def cmd_collect(self, idx):
+        '''!@brief              Starts collecting speed and position to send to Jupyter
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.start[idx] = self.now
+        self.state[idx] = 2
+
+    def cmd_closed(self, idx):
+        '''!@brief              Switches to closed loop with the gain and setpoint in their shares
+            @details            A gain or setpoint entered while the wheel was in open loop, where 'k'
+                                and 's' are not taken, is picked up here
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.closedloops[idx].set_gain(self.gain.get())
+        self.closedloops[idx].set_sp(self.setpoint.get())
+        self.state[idx] = 3
+
+    def cmd_gain(self, idx):
+        '''!@brief              Sets the closed loop gain from the gain share
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.closedloops[idx].set_gain(self.gain.get())
+
+    def cmd_setpoint(self, idx):
+        '''!@brief              Sets the closed loop setpoint from the setpoint share
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.closedloops[idx].set_sp(self.setpoint.get())
+
+    def cmd_step(self, idx):
+        '''!@brief              Triggers a step response and sends it to plot
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.closedloops[idx].reset()
+        self.start[idx] = self.now
+        self.state[idx] = 4
+
+    def cmd_open(self, idx):
+        '''!@brief              Switches to open loop
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        self.state[idx] = 1
+
+
+    def wheel(self, idx):
+        '''!@brief              Runs one step of one wheel's data collection states
+            @details            States 1 (open loop) and 3 (closed loop) only wait for commands
+            @param              idx 0 for Motor A, 1 for Motor B
+        '''
+        encoder = self.encoders[idx]
+        telem = self.telems[idx]
+        state = self.state[idx]
+
+        # state for doing 30 seconds of data collection
+        if state == 2:
+            if time.ticks_diff(self.now, self.start[idx]) < 30000:
+                pos1 = encoder.get_position()
+                spd1 = encoder.get_delta()#*60000/16384/100
+                telem.put(pos1, spd1)
+
+            else:
+                telem.end() # End condition for data transfer
+
+                self.state[idx] = 1
+
+        elif state == 4:
+            if time.ticks_diff(self.now, self.start[idx]) < 5000:
+                pos2 = encoder.get_position()
+                spd2 = encoder.get_rpm()
+                telem.put(pos2, spd2)
+
+            else:
+                self.ser.write("\n\r Motor "+self.names[idx]+" Data Transfer Complete")
+                telem.end() # End condition for data transfer
+                self.state[idx] = 3
+
+            # Set duty cycle based on speed of motor, one controller update per
+            # run unless a rate group runs the loop
+            if not self.fast:
+                self.close_loop(idx)
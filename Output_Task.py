@@ -0,0 +1,144 @@
+'''!@file                       Output_Task.py
+    @brief                      A class for sending all serial output from one low priority task
+    @details                    The output task owns the USB serial port and UART 2. Other tasks never
+                                write to them directly; instead they write to an OutputChannel, which
+                                has the same write() method as a serial port but only copies the bytes
+                                into a queue and returns at once. Each run of the output task then
+                                writes at most a set number of bytes from each queue to its port, so a
+                                slow or unplugged host only makes the queues fill up.
+
+                                When a queue is full the channel's drop policy decides what is lost, and
+                                every lost byte is counted. The default policy drops a whole block that
+                                does not fit, so binary telemetry frames are never cut in half.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+from pyb import UART, USB_VCP
+from task_share import Queue
+'''!@package              Import UART, vcp, and queue
+'''
+
+## Drop policy: a block which does not fit is dropped whole
+DROP_BLOCK = 0
+## Drop policy: as much of a block as fits is kept and the rest is dropped
+DROP_TAIL = 1
+## Drop policy: the oldest waiting bytes are dropped to make room
+DROP_OLDEST = 2
+
+
+class OutputChannel:
+
+    def __init__(self, device, size = 512, budget = 64, policy = DROP_BLOCK, name = None):
+        '''!@brief              Constructs an output channel
+            @param              device Serial port with a write() method returning the bytes written
+            @param              size Number of bytes the queue holds
+            @param              budget Most bytes written to the device per drain(), which should be
+                                what the link can carry in one period of the output task
+            @param              policy DROP_BLOCK, DROP_TAIL or DROP_OLDEST
+            @param              name Name of the queue, for diagnostics
+        '''
+        self.device = device
+        self.size = size
+        self.policy = policy
+        self.queue = Queue('B', size, thread_protect=True, overwrite=(policy == DROP_OLDEST), name=name)
+
+        # Bytes taken from the queue which the device has not accepted yet
+        self._buf = bytearray(budget)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+        self.written = 0    # Bytes written to the device
+        self.dropped = 0    # Bytes lost because the queue was full
+        self.drops = 0      # Writes which lost bytes
+
+    def write(self, data):
+        '''!@brief              Queues bytes to be written to the device, without waiting
+            @param              data Bytes, bytearray, memoryview, or str to be written
+            @returns            Number of bytes queued, which is 0 if the block was dropped
+        '''
+        if isinstance(data, str):
+            data = data.encode()
+        count = len(data)
+        room = self.size - self.queue.num_in()
+
+        if count > room:
+            self.drops += 1
+            if self.policy == DROP_BLOCK:
+                self.dropped += count
+                return 0
+            # Either the end of the block or the oldest waiting bytes are lost
+            self.dropped += count - room
+        return self.queue.put_many(data)
+
+    def pending(self):
+        '''!@brief              Gets the number of bytes still to be written
+            @returns            Number of bytes in the queue and the drain buffer
+        '''
+        return self.queue.num_in() + self._end - self._start
+
+    def drain(self):
+        '''!@brief              Writes up to one budget of waiting bytes to the device
+            @details            Bytes the device does not accept are kept and written first next time
+            @returns            Number of bytes written
+        '''
+        if self._start == self._end:
+            self._start = 0
+            self._end = self.queue.get_into(self._buf)
+            if not self._end:
+                return 0
+
+        sent = self.device.write(self._view[self._start:self._end])
+        if sent is None: # timed out without writing anything
+            sent = 0
+        self._start += sent
+        self.written += sent
+        return sent
+
+    def __repr__(self):
+        '''!@brief              Makes a summary of the channel's traffic
+            @returns            A line of text
+        '''
+        return "{:16s} written {:8d}  dropped {:6d} in {:4d} writes  waiting {:5d}".format(
+            self.queue._name, self.written, self.dropped, self.drops, self.pending())
+
+
+class Output_Task:
+
+    def __init__(self, usb_size = 1024, usb_budget = 256, uart_size = 1024, uart_budget = 64, baudrate = 115200):
+        '''!@brief              Constructs an output task object
+            @details            Opens the USB serial port and UART 2 and gives each an output channel
+            @param              usb_size Number of bytes the USB queue holds, which must take the
+                                whole of the UI's menu and settings, about 700 bytes written in one run
+            @param              usb_budget Most bytes written to USB per run
+            @param              uart_size Number of bytes the UART queue holds
+            @param              uart_budget Most bytes written to the UART per run; writing to the UART
+                                waits for each byte to be sent, so keep this to what the baud rate
+                                carries in a fraction of the task's period
+            @param              baudrate Baud rate of UART 2
+        '''
+        self.ser = USB_VCP()
+        self.uart_dev = UART(2, baudrate)
+        self.uart_dev.init(baudrate, bits=8, parity=None, stop=1)
+
+        ## Channel for text to the USB serial port
+        self.usb = OutputChannel(self.ser, usb_size, usb_budget, DROP_BLOCK, name="usb_out")
+        ## Channel for telemetry and log frames to UART 2
+        self.uart = OutputChannel(self.uart_dev, uart_size, uart_budget, DROP_BLOCK, name="uart_out")
+        self.channels = (self.usb, self.uart)
+
+    def run(self):
+        '''!@brief              Task which writes one budget of bytes from each channel per run
+        '''
+        while True:
+            for channel in self.channels:
+                channel.drain()
+            yield self.usb.pending() + self.uart.pending()
+
+    def __repr__(self):
+        '''!@brief              Makes a summary of every channel's traffic
+            @returns            One line of text per channel
+        '''
+        return repr(self.usb) + "\n" + repr(self.uart)
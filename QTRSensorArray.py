@@ -0,0 +1,186 @@
+'''!@file                       QTRSensorArray.py
+    @brief                      A class for reading all of the reflectance sensor channels together
+    @details                    All six channels of the three two-channel sensors are captured by one
+                                timed ADC read into one buffer per channel. Each buffer is then reduced
+                                in place to a single value per channel, either the mean or the median of
+                                the samples, so every sample taken helps reject noise. The channels are
+                                given left to right across the robot, so sensor s uses channels 2s (its
+                                left channel) and 2s+1 (its right channel).
+
+                                After a calibration sweep, in which calibrate() is called while the
+                                sensors pass back and forth over the line, each channel is scaled from
+                                0 (the whitest reading seen) to 1000 (the blackest), and line_position()
+                                gives a continuous line position as the weighted centroid of all six
+                                channels instead of a black/white code per sensor.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import pyb
+import array
+'''!@package              Import pyb and array
+'''
+
+## Index of the left sensor
+LEFT = 0
+## Index of the front (middle) sensor
+FRONT = 1
+## Index of the right sensor
+RIGHT = 2
+
+
+class QTRSensorArray:
+
+    def __init__(self, adcs, samples = 8, median = False, tim_num = 7, freq = 20_000, threshold = 1500):
+        '''!@brief              Constructs a reflectance sensor array object
+            @details            Allocates one sample buffer per channel and the result array
+            @param              adcs ADC objects for each channel, left to right across the robot
+            @param              samples Number of samples taken of each channel per reading
+            @param              median True to reduce samples with the median, False for the mean
+            @param              tim_num Timer used to pace the ADC samples
+            @param              freq Sample rate of each channel in Hz
+            @param              threshold ADC value at or above which a channel sees black
+        '''
+        self.adcs = tuple(adcs)
+        self.num = len(self.adcs)
+        self.samples = samples
+        self.median = median
+        self.threshold = threshold # ADC value threshold
+
+        self.tim = pyb.Timer(tim_num, freq=freq)        # Create timer
+
+        self.bufs = tuple(array.array('H', (0 for i in range(samples))) for adc in self.adcs)
+
+        ## The reduced reading of each channel, updated by read()
+        self.values = array.array('H', (0 for i in range(self.num)))
+
+        ## Each channel scaled from 0 (white) to 1000 (black), updated by read_calibrated()
+        self.norm = array.array('H', (0 for i in range(self.num)))
+        self.cal_min = array.array('H', (0 for i in range(self.num)))
+        self.cal_max = array.array('H', (0 for i in range(self.num)))
+        self.min_span = 200     # Smallest max - min range of a calibrated channel
+        self.noise = 50         # Normalized readings below this are treated as white
+        self.reset_calibration()
+
+        ## Line position from the last call to line_position(), 0 is centered
+        self.position = 0
+        ## How strongly the line was seen by line_position(), 0 to 1000
+        self.confidence = 0
+
+    def read(self):
+        '''!@brief              Samples every channel in one timed capture and reduces each to one value
+            @returns            The array of per-channel values, which is reused by later readings
+        '''
+        pyb.ADC.read_timed_multi(self.adcs, self.bufs, self.tim)
+
+        for ch in range(self.num):
+            buf = self.bufs[ch]
+            if self.median:
+                self.values[ch] = self._median(buf)
+            else:
+                total = 0
+                for val in buf:
+                    total += val
+                self.values[ch] = total // self.samples
+        return self.values
+
+    def _median(self, buf):
+        '''!@brief              Finds the median of a buffer by sorting it in place
+            @details            Insertion sort, which is quick for the few samples used here
+            @param              buf Sample buffer, which is left sorted
+            @returns            The middle value
+        '''
+        for i in range(1, len(buf)):
+            val = buf[i]
+            j = i - 1
+            while j >= 0 and buf[j] > val:
+                buf[j + 1] = buf[j]
+                j -= 1
+            buf[j + 1] = val
+        return buf[len(buf) // 2]
+
+    def line_state(self, sensor):
+        '''!@brief              Determines which channels of one sensor see black or white in the last reading
+            @details            Same codes as QTRSensorAnalog.readLine()
+            @param              sensor Index of the sensor, LEFT, FRONT or RIGHT
+            @returns            3 for all white, 2 for left white, 1 for right white, 0 for all black
+        '''
+        left_black = self.values[2*sensor] >= self.threshold
+        right_black = self.values[2*sensor + 1] >= self.threshold
+
+        if not left_black and not right_black:
+            return 3 #both see white
+        elif not right_black: # assuming a low value means white
+            return 1 #right sees white
+        elif not left_black:
+            return 2 #left sees white
+        else:
+            return 0 #both see black
+
+    def reset_calibration(self):
+        '''!@brief              Forgets the lowest and highest readings of every channel
+        '''
+        for ch in range(self.num):
+            self.cal_min[ch] = 65535
+            self.cal_max[ch] = 0
+        self.calibrated = False
+
+    def calibrate(self):
+        '''!@brief              Takes a reading and widens each channel's calibration range to include it
+            @details            Call this repeatedly while the sensors sweep across the line
+            @returns            True once every channel has seen a wide enough range of readings
+        '''
+        self.read()
+        done = True
+        for ch in range(self.num):
+            val = self.values[ch]
+            if val < self.cal_min[ch]:
+                self.cal_min[ch] = val
+            if val > self.cal_max[ch]:
+                self.cal_max[ch] = val
+            if self.cal_max[ch] - self.cal_min[ch] < self.min_span:
+                done = False
+        self.calibrated = done
+        return done
+
+    def read_calibrated(self):
+        '''!@brief              Takes a reading and scales each channel by its calibration range
+            @returns            The array of per-channel values from 0 (white) to 1000 (black)
+        '''
+        self.read()
+        for ch in range(self.num):
+            lo = self.cal_min[ch]
+            span = self.cal_max[ch] - lo
+            val = self.values[ch]
+            if span <= 0 or val <= lo:
+                self.norm[ch] = 0
+            elif val - lo >= span:
+                self.norm[ch] = 1000
+            else:
+                self.norm[ch] = (val - lo) * 1000 // span
+        return self.norm
+
+    def line_position(self):
+        '''!@brief              Finds the line position from the last calibrated reading
+            @details            Each channel is weighted by how black it sees. Positions run from
+                                -500*(channels-1) under the leftmost channel to +500*(channels-1)
+                                under the rightmost, in steps of 1000 per channel. If no channel
+                                sees the line the last position is kept. The peak normalized reading
+                                is stored in @c confidence.
+            @returns            The line position, 0 when centered
+        '''
+        total = 0
+        weighted = 0
+        peak = 0
+        for ch in range(self.num):
+            val = self.norm[ch]
+            if val > peak:
+                peak = val
+            if val >= self.noise:
+                total += val
+                weighted += val * ch * 1000
+        self.confidence = peak
+        if total:
+            self.position = weighted // total - 500 * (self.num - 1)
+        return self.position
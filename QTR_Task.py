@@ -12,29 +12,40 @@ import LineFollowerPID as PID
 import machine
 from pyb import Pin
 import HCSR04
-'''!@package                    Import time, LineFollowerPID, machine, Pin, HCSR04
+import QTRSensorArray as QTRA
+import Logger
+'''!@package                    Import time, LineFollowerPID, machine, Pin, HCSR04, QTRSensorArray, Logger
 '''
 
 class QTR_Task:
     
-    def __init__(self, qtr_front, qtr_left, qtr_right, motor_A, motor_B, hcr):
+    def __init__(self, qtr, drive, hcr, continuous = False, log = None, Kp = 1.25, Ki = 0.2, Kd = 0.01,
+                 V = .1, target_w = 2):
         '''!@brief              Constructs a QTR Task object
             @details            Sets flags, objects, motors, initializes data, mode, and state
-            @param              qtr_front front line sensor
-            @param              qtr_left left line sensor
-            @param              qtr_right right line sensor
-            @param              motor_A Motor A
-            @param              motor_B Motor B
+            @param              qtr array of the left, front and right line sensors
+            @param              drive Drivetrain of both wheels, whose offsets set the duty
+                                cycles the line follower's wheel speeds are added to
             @param              hcr Ultrasonic sensor
+            @param              continuous True to calibrate the sensors with a pivot first and then
+                                steer from the continuous line position instead of the error table
+            @param              log Logger for state changes, or None for no logging
+            @param              Kp Proportional gain of the line follower
+            @param              Ki Integral gain of the line follower
+            @param              Kd Derivative gain of the line follower
+            @param              V Forward speed while following the line, in m/s
+            @param              target_w Wheel speed the line follower's output is scaled to, in rad/s
         '''
-        self.qtr_front = qtr_front#instantiates object
+        self.qtr = qtr#instantiates object
         
-        self.qtr_left = qtr_left
-        self.qtr_right = qtr_right
-        
-        self.state = 0
-        self.motor_A = motor_A
-        self.motor_B = motor_B
+        # Continuous line position starts with a calibration sweep
+        self.continuous = continuous
+        self.state = 11 if continuous else 0
+        self.cal_time = 2000 # ms to pivot over the line while calibrating
+        self.cal_start = None
+        self.pos_gain = 8 / 2250 # error per unit of line position, 8 at the outer sensors
+        self.min_confidence = 200 # weakest line reading that is trusted
+        self.drive = drive
         
         # Reflectance Sensor Line States
         self.line_state1 = 0
@@ -42,17 +53,30 @@ class QTR_Task:
         self.line_state3 = 0
         
         # PID Params
-        self.r_w = .035 # m
-        self.V = .1
-        self.target_w = 2 #rad/s
-        self.L = 0.14
+        self.V = V
+        self.target_w = target_w #rad/s
         self.previous_error = 0
         
+        # One controller keeps its state for the whole run; line following
+        # updates every other run of this task, so about every 60 ms
+        self.LF = PID.LineFollowerPID(self.V, self.target_w, Kp=Kp, Ki=Ki, Kd=Kd,
+                                      dt=0.06, i_limit=10)
+        self.lf_last_us = 0
+        self.lf_started = False
+        
+        # Time in ms the present timed maneuver started, set on entering it
+        self.start = time.ticks_ms()
+        
         # Ultrasonic Sensor
         self.hcr = hcr
+        self.no_echo_cm = 400 # Distance assumed when there is no valid echo
         self.wall = 0
         self.prev = 0
         
+        # State changes are logged instead of printed, see Logger.py
+        self.log = Logger.null if log is None else log
+        self.logged_state = -1
+        
         
     def run(self):
         '''!@brief              FSM for the QTR Task
@@ -60,12 +84,15 @@ class QTR_Task:
         '''
         while True:
                 if self.state == 0:
-                    cms = self.hcr.distance_cm()
-                    cm2 = self.hcr.distance_cm()
-                    cm3 = self.hcr.distance_cm()
-                    cms = (cms+ cm2 + cm3) /3
-                    print("PREV: " + str(self.prev))
-                    print("Wall: " + str(self.wall))
+                    # Start the next ranging and use the newest finished one;
+                    # with no recent echo there is no wall in range
+                    self.hcr.trigger_pulse()
+                    if self.hcr.valid():
+                        cms = self.hcr.last_cm()
+                    else:
+                        cms = self.no_echo_cm
+                    self.log.debug(Logger.TASK_QTR, Logger.WALL_FLAGS, self.prev, self.wall)
+                    self.log.debug(Logger.TASK_QTR, Logger.RANGE, int(cms * 10))
                     if cms <= 3 and not self.wall:
                         # if self.wall == 1:
                         #     self.state = 9
@@ -74,11 +101,11 @@ class QTR_Task:
                     # You hit the wall again after already hitting it
                     elif cms <= 3 and self.wall == 2:
                         self.state = 9
-                        start = time.ticks_ms()
+                        self.start = time.ticks_ms()
                     # You have crossed finish line and hit wall
                         
                     elif self.prev == 1 and self.wall == 1:
-                            start = time.ticks_ms()
+                            self.start = time.ticks_ms()
                             self.state = 7
                     # Didn't cross finish line, keep going
                     else:
@@ -86,19 +113,18 @@ class QTR_Task:
                         
                 # Line Follower
                 elif self.state == 1:
-                    print(self.state)
-                    # Update Each Sensor Reading
-                    self.line_state1 = self.qtr_left.readLine()
-                    self.line_state2 = self.qtr_front.readLine()
-                    self.line_state3 = self.qtr_right.readLine()
+                    # Update Each Sensor Reading from one capture of all channels
+                    if self.continuous:
+                        self.qtr.read_calibrated()
+                    else:
+                        self.qtr.read()
+                    self.line_state1 = self.qtr.line_state(QTRA.LEFT)
+                    self.line_state2 = self.qtr.line_state(QTRA.FRONT)
+                    self.line_state3 = self.qtr.line_state(QTRA.RIGHT)
                     
                     # print("L: " + str(self.line_state1))
                     # print("F: " + str(self.line_state2))
                     # print("R: " + str(self.line_state3))
-                    # Create LineFollower instance
-                    LF = PID.LineFollowerPID(self.V, self.target_w, Kp=1.25, Ki=0.2, Kd=0.01)
-                    
-                    
                     
                     if self.line_state1 == 0 and self.line_state2 == 0 and self.line_state3 == 0:
                         # All sensors see black, go straight
@@ -109,6 +135,7 @@ class QTR_Task:
                         error = 0
                         if self.prev == 1:
                             self.state = 7
+                            self.start = time.ticks_ms()
                         else:
                             self.prev = 2
                     elif self.line_state2 == 2 and (self.line_state3 == 1 or self.line_state3 == 3):
@@ -132,116 +159,135 @@ class QTR_Task:
                         # Middle sensor sees white, go straight
                         error = 0.8 * self.previous_error
                         self.previous_error = error
+                    
+                    # Steer from where the line actually is when calibrated
+                    if self.continuous:
+                        pos = self.qtr.line_position()
+                        if self.qtr.confidence >= self.min_confidence:
+                            error = pos * self.pos_gain
+                        else:
+                            error = 0.8 * self.previous_error
+                        self.previous_error = error
                         
-                    LF.error = error
+                    self.LF.error = error
                     
-                    # Calculate motor speeds
-                    omega_r, omega_l = LF.get_wheel_speed()
+                    # Calculate motor speeds using the measured time since the last update
+                    now_us = time.ticks_us()
+                    if self.lf_started:
+                        dt = time.ticks_diff(now_us, self.lf_last_us) / 1_000_000
+                    else:
+                        dt = None
+                        self.lf_started = True
+                    self.lf_last_us = now_us
+                    omega_r, omega_l = self.LF.get_wheel_speed(dt)
                     
-                    self.motor_A.set_duty(15+omega_l)
-                    self.motor_B.set_duty(8+omega_r)
+                    self.drive.set_wheels(omega_l, omega_r)
                     self.state = 0
                     
                 # Detected wall state    
                 if self.state == 2:
-                    print(self.state)
-                    self.line_state2 = self.qtr_front.readLine()
+                    self.qtr.read()
+                    self.line_state2 = self.qtr.line_state(QTRA.FRONT)
                     # print(self.line_state2)
                     # Align yourself if not aligned
                     if not self.line_state2 == 0:
                         if self.line_state2 == 2 or self.line_state3 == 1:
-                            self.motor_A.set_duty(-10)
-                            self.motor_B.set_duty(10)
+                            self.drive.set_duty(-10, 10)
                         else:
-                            self.motor_A.set_duty(-10)
-                            self.motor_B.set_duty(10)
+                            self.drive.set_duty(-10, 10)
                         self.state = 2
                     # Once aligned, go around box
                     else:
                         self.state = 3
-                        start = time.ticks_ms()
+                        self.start = time.ticks_ms()
                 # Pivot
                 elif self.state == 3:
                     
-                    if time.ticks_diff(time.ticks_ms(),start) < 2000:
-                        self.motor_A.set_duty(10)
-                        self.motor_B.set_duty(-10)
+                    if time.ticks_diff(time.ticks_ms(), self.start) < 2000:
+                        self.drive.set_duty(10, -10)
                     else:
-                        start = time.ticks_ms()
+                        self.start = time.ticks_ms()
                         self.state = 4
                 # Go straight 
                 elif self.state == 4:
-                        print(self.state)
-                        if time.ticks_diff(time.ticks_ms(),start) < 3000:
-                            self.motor_A.set_duty(15)
-                            self.motor_B.set_duty(15)
+                        if time.ticks_diff(time.ticks_ms(), self.start) < 3000:
+                            self.drive.set_duty(15, 15)
                         else:
-                            start = time.ticks_ms()
+                            self.start = time.ticks_ms()
                             self.state = 5
                 # Pivot         
                 elif self.state == 5:
-                        print(self.state)
-                        if time.ticks_diff(time.ticks_ms(),start) < 1500:
-                            self.motor_A.set_duty(-10)
-                            self.motor_B.set_duty(10)
+                        if time.ticks_diff(time.ticks_ms(), self.start) < 1500:
+                            self.drive.set_duty(-10, 10)
                         else:
-                            start = time.ticks_ms()
+                            self.start = time.ticks_ms()
                             self.state = 6
                 # Turn back onto path            
                 elif self.state == 6:
-                        print(self.state)
                         self.wall = 1
-                        if time.ticks_diff(time.ticks_ms(),start) < 1750:
-                            self.motor_A.set_duty(25)
-                            self.motor_B.set_duty(35)
+                        if time.ticks_diff(time.ticks_ms(), self.start) < 1750:
+                            self.drive.set_duty(25, 35)
                         else:
-                            start = time.ticks_ms()
+                            self.start = time.ticks_ms()
                             self.state = 0
                             
                 # Hit the finish line, drive into the box and           
                 elif self.state == 7:
-                    print(self.state)
                         
-                    if time.ticks_diff(time.ticks_ms(),start) < 2000:
-                        self.motor_A.set_duty(12)
-                        self.motor_B.set_duty(12)
+                    if time.ticks_diff(time.ticks_ms(), self.start) < 2000:
+                        self.drive.set_duty(12, 12)
                     else:
-                        self.motor_A.set_duty(0)
-                        self.motor_B.set_duty(0)
-                        start = time.ticks_ms()
+                        self.drive.set_duty(0, 0)
+                        self.start = time.ticks_ms()
                         self.state = 8
                  
                 # Stop to show robot is in the box       
                 elif self.state == 8:
                     self.wall = 2
-                    print(self.state)
-                    if time.ticks_diff(time.ticks_ms(),start) < 4250:
-                        self.motor_A.set_duty(-20)
-                        self.motor_B.set_duty(20)
+                    if time.ticks_diff(time.ticks_ms(), self.start) < 4250:
+                        self.drive.set_duty(-20, 20)
                     else:
                         self.state = 0
                         
                         
                 # Pivot to start        
                 elif self.state == 9:
-                    print(self.state)
-                    if time.ticks_diff(time.ticks_ms(),start) < 1750:
-                        self.motor_A.set_duty(-20)
-                        self.motor_B.set_duty(20)
+                    if time.ticks_diff(time.ticks_ms(), self.start) < 1750:
+                        self.drive.set_duty(-20, 20)
                     else:
-                        start = time.ticks_ms()
+                        self.start = time.ticks_ms()
                         self.state = 10
                         
                 # Stop at Start        
                 elif self.state == 10:
-                        print(self.state)
-                        if time.ticks_diff(time.ticks_ms(),start) < 3500:
-                            self.motor_A.set_duty(20)
-                            self.motor_B.set_duty(20)
+                        if time.ticks_diff(time.ticks_ms(), self.start) < 3500:
+                            self.drive.set_duty(20, 20)
                         else:
-                            self.motor_A.disable()
-                            self.motor_B.disable()
+                            self.drive.disable()
                             self.state = 10
+                
+                # Calibrate the line sensors by pivoting over the line
+                elif self.state == 11:
+                    if self.cal_start is None:
+                        self.qtr.reset_calibration()
+                        self.cal_self.start = time.ticks_ms()
+                    if time.ticks_diff(time.ticks_ms(), self.cal_start) < self.cal_time:
+                        self.drive.set_duty(-10, 10)
+                        self.qtr.calibrate()
+                    else:
+                        self.drive.set_duty(0, 0)
+                        self.state = 0
+
+                # A maneuver breaks up line following, so the controller starts
+                # over afterwards instead of taking the whole maneuver as one step
+                if self.state > 1 and self.lf_started:
+                    self.lf_started = False
+                    self.LF.reset()
+                    self.previous_error = 0
+
+                if self.state != self.logged_state:
+                    self.log.info(Logger.TASK_QTR, Logger.STATE, self.state)
+                    self.logged_state = self.state
 
                 yield self.state
                     
\ No newline at end of file
@@ -0,0 +1,126 @@
+'''!@file                       RateGroup.py
+    @brief                      A class for running fast control loops from a hardware timer
+    @details                    The timer's interrupt runs the hard functions, which must be short and
+                                must not allocate memory, such as latching encoder counts. It then asks
+                                micropython.schedule() to run the soft functions, such as the wheel
+                                speed loops, as soon as the interrupt returns. Soft functions may use
+                                floats, but they interrupt the cooperative tasks between any two
+                                bytecodes, so they must only exchange data with tasks through ISR-safe
+                                shares such as task_share.RecordShare with a bounded number of retries.
+
+                                Each function has a divisor, so one group can run several rates: a
+                                function with divisor 4 runs on every 4th timer tick. If the soft
+                                functions of one tick have not finished when the next tick comes, that
+                                tick's soft functions are skipped and counted as an overrun, so the loop
+                                timing never drifts.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import pyb
+import micropython
+import time
+'''!@package              Import pyb, micropython, and time
+'''
+
+
+class RateGroup:
+
+    def __init__(self, tim_num, freq, name = "Rate Group"):
+        '''!@brief              Constructs a rate group
+            @details            The timer is set up but does not call the group until start()
+            @param              tim_num Number of a timer which is not used for anything else
+            @param              freq Base rate of the group in Hz
+            @param              name Name shown when the group is printed
+        '''
+        self.name = name
+        self.freq = freq
+        self.tim = pyb.Timer(tim_num, freq=freq)
+
+        self._hard = []         # Functions run in the interrupt
+        self._hard_div = []
+        self._soft = []         # Functions run by micropython.schedule()
+        self._soft_div = []
+
+        self.ticks = 0          # Timer ticks since start()
+        self.runs = 0           # Ticks whose soft functions ran
+        self.overruns = 0       # Ticks whose soft functions were skipped
+        self.last_us = 0        # Time taken by the latest soft functions
+        self.max_us = 0         # Longest time taken by the soft functions
+        self._pending = False   # True from scheduling the soft functions until they finish
+        self._soft_tick = 0     # Tick the scheduled soft functions belong to
+
+        # Bound once so the interrupt never allocates
+        self._isr_ref = self._isr
+        self._run_soft_ref = self._run_soft
+
+    def add_hard(self, fun, divisor = 1):
+        '''!@brief              Adds a function to run in the timer interrupt
+            @param              fun Function with no arguments which does not allocate memory
+            @param              divisor The function runs on every divisor'th tick
+        '''
+        self._hard.append(fun)
+        self._hard_div.append(divisor)
+
+    def add(self, fun, divisor = 1):
+        '''!@brief              Adds a function to run soon after the timer interrupt
+            @param              fun Function with no arguments
+            @param              divisor The function runs on every divisor'th tick
+        '''
+        self._soft.append(fun)
+        self._soft_div.append(divisor)
+
+    def start(self):
+        '''!@brief              Starts calling the group from the timer
+        '''
+        self.tim.callback(self._isr_ref)
+
+    def stop(self):
+        '''!@brief              Stops calling the group
+        '''
+        self.tim.callback(None)
+
+    def _isr(self, tim):
+        '''!@brief              Timer interrupt, runs the hard functions and schedules the soft ones
+            @param              tim The timer which interrupted
+        '''
+        tick = self.ticks
+        self.ticks = tick + 1
+        for idx in range(len(self._hard)):
+            if tick % self._hard_div[idx] == 0:
+                self._hard[idx]()
+
+        if self._pending:
+            self.overruns += 1
+            return
+        self._pending = True
+        self._soft_tick = tick
+        try:
+            micropython.schedule(self._run_soft_ref, 0)
+        except RuntimeError:
+            # Schedule queue full, try again next tick
+            self._pending = False
+            self.overruns += 1
+
+    def _run_soft(self, arg):
+        '''!@brief              Runs the soft functions due on the scheduled tick
+            @param              arg Unused argument given by micropython.schedule()
+        '''
+        start = time.ticks_us()
+        tick = self._soft_tick
+        for idx in range(len(self._soft)):
+            if tick % self._soft_div[idx] == 0:
+                self._soft[idx]()
+        self.last_us = time.ticks_diff(time.ticks_us(), start)
+        if self.last_us > self.max_us:
+            self.max_us = self.last_us
+        self.runs += 1
+        self._pending = False
+
+    def __repr__(self):
+        '''!@brief              Makes a summary of how the group has kept to its rate
+            @returns            A line of text
+        '''
+        return "{:16s} {:5d} Hz  ticks {:8d}  runs {:8d}  overruns {:6d}  max {:6d} us".format(
+            self.name, self.freq, self.ticks, self.runs, self.overruns, self.max_us)
@@ -0,0 +1,136 @@
+'''!@file                       Telemetry.py
+    @brief                      A class for sending batches of timestamped samples as binary frames
+    @details                    Samples are packed with struct.pack_into straight into a preallocated
+                                frame buffer, so logging a sample does not build a string or allocate
+                                a new buffer. When the batch is full the frame header and CRC are
+                                filled in and the whole frame goes out in one write. Each frame is:
+
+                                | Bytes | Contents |
+                                |:------|:---------|
+                                | 2 | Sync bytes 0xA5 0x5A |
+                                | 1 | Stream ID, so several sources can share one link |
+                                | 1 | Number of records in the frame, 0 marks the end of a stream |
+                                | 2 | Sequence number, counts frames on this stream |
+                                | 2 | Payload length in bytes |
+                                | n | Records, each a uint32 ticks_us() timestamp then the channels |
+                                | 4 | CRC32 of everything after the sync bytes |
+
+                                All fields are little-endian. telemetry_decode.py decodes the frames
+                                on the PC.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import struct
+import binascii
+import time
+'''!@package              Import struct, binascii, and time
+'''
+
+## First sync byte of every frame
+SYNC0 = 0xA5
+## Second sync byte of every frame
+SYNC1 = 0x5A
+## Frame header layout after which the records start
+HEADER_FMT = '<BBBBHH'
+## Number of bytes in the frame header
+HEADER_SIZE = 8
+## Number of bytes in the CRC after the records
+CRC_SIZE = 4
+
+
+class Telemetry:
+
+    def __init__(self, out, fmt = 'ii', batch = 16, stream_id = 1):
+        '''!@brief              Constructs a telemetry stream
+            @details            Allocates one frame buffer big enough for a full batch of records
+            @param              out Object with a write() method, such as a UART
+            @param              fmt struct format of the channels in each record, one letter per
+                                channel; a timestamp is always added first. put() fills at most four
+                                channels, so a stream with more packs its own records at the offsets
+                                reserve() gives, as Logger does with its five
+            @param              batch Number of records sent together in one frame, at most 255
+            @param              stream_id Number from 0 to 255 identifying this stream to the decoder
+        '''
+        self._out = out
+        self._rec_fmt = '<I' + fmt
+        self._rec_size = struct.calcsize(self._rec_fmt)
+        self._nch = len(fmt)
+        self._batch = batch
+        self._stream_id = stream_id
+
+        self._frame = bytearray(HEADER_SIZE + batch * self._rec_size + CRC_SIZE)
+        self._view = memoryview(self._frame)
+        self._num = 0 # Records in the frame being filled
+        self._seq = 0
+
+        self.frames_sent = 0
+        self.records_sent = 0
+
+    def reserve(self):
+        '''!@brief              Finds room for one more record in the frame being filled
+            @details            Sends the frame first if it is already full. The caller must pack a
+                                complete record, timestamp first, at the returned offset.
+            @returns            Offset into frame_buffer() of the reserved record
+        '''
+        if self._num >= self._batch:
+            self._send(self._num)
+        off = HEADER_SIZE + self._num * self._rec_size
+        self._num += 1
+        return off
+
+    def frame_buffer(self):
+        '''!@brief              Gets the frame buffer records are packed into
+            @returns            The bytearray used for frames
+        '''
+        return self._frame
+
+    def put(self, a, b = 0, c = 0, d = 0):
+        '''!@brief              Adds a timestamped record to the stream
+            @details            Only the first as many values as the format has channels are used
+            @param              a Value of the first channel
+            @param              b Value of the second channel
+            @param              c Value of the third channel
+            @param              d Value of the fourth channel
+        '''
+        t = time.ticks_us()
+        off = self.reserve()
+        nch = self._nch
+        if nch == 1:
+            struct.pack_into(self._rec_fmt, self._frame, off, t, a)
+        elif nch == 2:
+            struct.pack_into(self._rec_fmt, self._frame, off, t, a, b)
+        elif nch == 3:
+            struct.pack_into(self._rec_fmt, self._frame, off, t, a, b, c)
+        else:
+            struct.pack_into(self._rec_fmt, self._frame, off, t, a, b, c, d)
+
+    def flush(self):
+        '''!@brief              Sends any records waiting in a partly filled frame
+        '''
+        if self._num:
+            self._send(self._num)
+
+    def end(self):
+        '''!@brief              Sends waiting records and then an empty frame marking the end of the stream
+        '''
+        self.flush()
+        self._send(0)
+
+    def _send(self, num):
+        '''!@brief              Fills in the header and CRC of the frame and writes it out
+            @param              num Number of records in the frame
+        '''
+        length = num * self._rec_size
+        struct.pack_into(HEADER_FMT, self._frame, 0, SYNC0, SYNC1,
+                         self._stream_id, num, self._seq, length)
+        end = HEADER_SIZE + length
+        crc = binascii.crc32(self._view[2:end])
+        struct.pack_into('<I', self._frame, end, crc & 0xFFFFFFFF)
+        self._out.write(self._view[0:end + CRC_SIZE])
+
+        self._seq = (self._seq + 1) & 0xFFFF
+        self._num = 0
+        self.frames_sent += 1
+        self.records_sent += num
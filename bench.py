@@ -0,0 +1,388 @@
+'''!@file                       bench.py
+    @brief                      Microbenchmarks of the hot paths of the firmware
+    @details                    Times the calls the tasks make most often: Queue.put() and get(),
+                                Share.get(), Encoder.update(), the line sensor reads,
+                                LineFollowerPID.get_wheel_speed() and ClosedLoop.update(), each with its
+                                fixed point version where there is one. Every benchmark is run in
+                                batches of calls; the time of an empty batch is taken off, and the
+                                report gives the calls per second, the mean and the 50th, 90th and 99th
+                                percentile time per call, and the bytes allocated per call.
+
+                                On the PC, @c python bench.py runs every benchmark under hostsim with
+                                the PC's clock, adds the results to bench_history.json, and flags any
+                                benchmark whose median is more than 15 % slower than the median of its
+                                last five runs. Options: -k to pick benchmarks by name, --n for the
+                                number of calls, --history, --threshold, --no-save, and --record to
+                                add the output of a run on the robot to the history.
+
+                                On the robot, @c import bench; bench.main() times the same calls with
+                                ticks_us() and counts allocations with gc.mem_alloc(), which is exact
+                                there since nothing is freed while the garbage collector is off. It
+                                prints the table and a line starting with BENCH holding the results as
+                                JSON; saved to a file, that line can be given to --record. On the PC,
+                                allocations are measured with tracemalloc, which does not see objects
+                                CPython recycles from its free lists, so they are a lower bound.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import gc
+import sys
+import time
+try:
+    import pyb
+    _ON_ROBOT = sys.implementation.name == "micropython"
+except ImportError:
+    import hostsim
+    hostsim.install()
+    import pyb
+    _ON_ROBOT = False
+'''!@package              Import gc, sys, time, and pyb, through hostsim on the PC
+'''
+
+## Calls per timed batch
+BATCH = 10
+## Runs of history a new result is compared with
+HISTORY_RUNS = 5
+## Slowdown of the median beyond which a benchmark is flagged
+THRESHOLD = .15
+
+if _ON_ROBOT:
+    _ticks = time.ticks_us
+    _diff = time.ticks_diff
+    ## Nanoseconds per tick of the benchmark clock
+    TICK_NS = 1000
+else:
+    _ticks = time.perf_counter_ns
+    _diff = lambda end, start: end - start
+    TICK_NS = 1
+
+
+def _nop(i):
+    '''!@brief              Does nothing, to time an empty batch
+        @param              i Call number
+    '''
+    pass
+
+
+def _queue_put_get():
+    '''!@brief              Puts an item in a queue and gets it back
+    '''
+    import task_share
+    q = task_share.Queue('h', 16, name = "Bench")
+    def op(i):
+        q.put(i & 0x7FFF)
+        q.get()
+    return op
+
+
+def _share_get():
+    '''!@brief              Gets the value of a share
+    '''
+    import task_share
+    s = task_share.Share('f', name = "Bench")
+    s.put(1.0)
+    def op(i):
+        s.get()
+    return op
+
+
+def _encoder(fixed):
+    '''!@brief              Updates an encoder with the low pass velocity filter
+        @param              fixed True for the fixed point encoder
+    '''
+    import Encoder
+    tim = pyb.Timer(3, period = 65535, prescaler = 0)
+    enc = Encoder.Encoder(pyb.Pin.cpu.B4, pyb.Pin.cpu.B5, tim, filter = Encoder.LOW_PASS,
+                          alpha = 0.5, fixed = fixed)
+    def op(i):
+        # 5 ms apart, as the wheel loop runs, at a steady speed
+        enc.update(i * 5000, (i * 37) & 0xFFFF)
+    return op
+
+
+def _qtr_analog_read_line():
+    '''!@brief              Reads the line from one two channel reflectance sensor
+    '''
+    import QTRSensorAnalog
+    qtr = QTRSensorAnalog.QTRSensorAnalog()
+    qtr.init(pyb.ADC(pyb.Pin(pyb.Pin.cpu.B0, mode = pyb.Pin.ANALOG)),
+             pyb.ADC(pyb.Pin(pyb.Pin.cpu.B1, mode = pyb.Pin.ANALOG)))
+    def op(i):
+        qtr.readLine()
+    return op
+
+
+def _qtr_array_read():
+    '''!@brief              Reads all six reflectance channels, as QTR_Task does
+    '''
+    import QTRSensorArray
+    names = ("B1", "B0", "C5", "C4", "A5", "A4")
+    adcs = tuple(pyb.ADC(pyb.Pin(getattr(pyb.Pin.cpu, n), mode = pyb.Pin.ANALOG)) for n in names)
+    qtr = QTRSensorArray.QTRSensorArray(adcs, samples = 8)
+    def op(i):
+        qtr.read()
+    return op
+
+
+def _line_follower():
+    '''!@brief              Runs the line follower's controller with QTR_Task's gains
+    '''
+    import LineFollowerPID
+    lf = LineFollowerPID.LineFollowerPID(.1, 2, Kp = 1.25, Ki = 0.2, Kd = 0.01, dt = 0.06, i_limit = 10)
+    def op(i):
+        lf.error = (i % 9) - 4
+        lf.get_wheel_speed(0.06)
+    return op
+
+
+def _line_follower_fixed():
+    '''!@brief              Runs the fixed point line follower's controller with QTR_Task's gains
+    '''
+    import array
+    import LineFollowerPID
+    import fixed_point as fp
+    lf = LineFollowerPID.LineFollowerPID(.1, 2, Kp = 1.25, Ki = 0.2, Kd = 0.01, dt = 0.06, i_limit = 10,
+                                         fixed = True)
+    dest = array.array('i', [0, 0])
+    def op(i):
+        lf.error = ((i % 9) - 4) << fp.SHIFT
+        lf.get_wheel_speed_into(dest, 60_000)
+    return op
+
+
+def _closed_loop():
+    '''!@brief              Runs a wheel speed controller
+    '''
+    import ClosedLoop
+    loop = ClosedLoop.ClosedLoop(0.5, 60.0, kI = 2.0, kD = 0.01, dt = 0.005,
+                                 out_min = -100, out_max = 100, i_min = -50, i_max = 50)
+    def op(i):
+        loop.update(55.0 + (i & 7), 0.005)
+    return op
+
+
+def _fixed_pid():
+    '''!@brief              Runs the fixed point wheel speed controller
+    '''
+    import fixed_point as fp
+    loop = fp.PID(0.5, 60.0, kI = 2.0, kD = 0.01, dt = 0.005,
+                  out_min = -100, out_max = 100, i_min = -50, i_max = 50)
+    dt = fp.from_float(0.005)
+    base = fp.from_int(55)
+    def op(i):
+        loop.update(base + ((i & 7) << fp.SHIFT), dt)
+    return op
+
+
+## Benchmarks as (name, function making the call to time, calls to make by default)
+BENCHMARKS = (("queue_put_get", _queue_put_get, 5000),
+              ("share_get", _share_get, 5000),
+              ("encoder_update", lambda: _encoder(False), 5000),
+              ("encoder_update_fixed", lambda: _encoder(True), 5000),
+              ("qtr_analog_read_line", _qtr_analog_read_line, 200),
+              ("qtr_array_read", _qtr_array_read, 500),
+              ("line_follower", _line_follower, 5000),
+              ("line_follower_fixed", _line_follower_fixed, 5000),
+              ("closed_loop_update", _closed_loop, 5000),
+              ("fixed_pid_update", _fixed_pid, 5000))
+
+
+def _batches(op, n):
+    '''!@brief              Times batches of calls
+        @param              op Function taking the call number
+        @param              n Number of calls, rounded down to whole batches
+        @returns            List of batch times in ticks
+    '''
+    times = []
+    for b in range(max(n // BATCH, 1)):
+        start = b * BATCH
+        t0 = _ticks()
+        for i in range(start, start + BATCH):
+            op(i)
+        times.append(_diff(_ticks(), t0))
+    return times
+
+
+def _alloc_bytes(op, n):
+    '''!@brief              Measures the memory allocated per call
+        @param              op Function taking the call number
+        @param              n Number of calls to average over
+        @returns            Bytes per call
+    '''
+    if _ON_ROBOT:
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        for i in range(n):
+            op(i)
+        used = gc.mem_alloc() - before
+        gc.enable()
+        return used / n
+    import tracemalloc
+    tracemalloc.start()
+    total = 0
+    for i in range(n):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        op(i)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / n
+
+
+def percentile(values, q):
+    '''!@brief              Gets a percentile of a list of numbers
+        @param              values The numbers, sorted
+        @param              q Fraction from 0 to 1
+        @returns            The nearest value at that fraction of the list
+    '''
+    return values[int(q * (len(values) - 1) + .5)]
+
+
+def measure(op, n):
+    '''!@brief              Benchmarks one call
+        @param              op Function taking the call number
+        @param              n Number of calls to time
+        @returns            Dictionary of n, ops_per_s, mean_us, p50_us, p90_us, p99_us and alloc_bytes
+    '''
+    # Warm up, and let one time setup such as the first encoder update happen
+    _batches(op, BATCH)
+    empty = percentile(sorted(_batches(_nop, n)), .5)
+    gc.collect()
+    times = _batches(op, n)
+    calls = len(times) * BATCH
+    scale = TICK_NS / 1000 / BATCH
+    per_call = sorted(max(t - empty, 0) * scale for t in times)
+    mean = sum(per_call) / len(per_call)
+    return {"n": calls,
+            "ops_per_s": 1e6 / mean if mean > 0 else 0.0,
+            "mean_us": mean,
+            "p50_us": percentile(per_call, .5),
+            "p90_us": percentile(per_call, .9),
+            "p99_us": percentile(per_call, .99),
+            "alloc_bytes": _alloc_bytes(op, min(n, 200))}
+
+
+def platform():
+    '''!@brief              Describes what the benchmarks ran on, so history is only compared like with like
+        @returns            String
+    '''
+    impl = sys.implementation
+    where = "robot" if _ON_ROBOT else "hostsim"
+    return "{} {} {} {}.{}".format(where, sys.platform, impl.name, impl.version[0], impl.version[1])
+
+
+def run(select = None, n = None):
+    '''!@brief              Runs benchmarks
+        @param              select Substring of the names to run, or None for all of them
+        @param              n Number of calls of each, or None for each one's default
+        @returns            Dictionary of results by benchmark name
+    '''
+    results = {}
+    for name, make, calls in BENCHMARKS:
+        if select and select not in name:
+            continue
+        if not _ON_ROBOT:
+            import hostsim
+            hostsim.reset()
+        results[name] = measure(make(), n or calls)
+    return results
+
+
+def report(results, flags = None):
+    '''!@brief              Formats a table of results
+        @param              results Dictionary of results by benchmark name
+        @param              flags Dictionary of notes by benchmark name, such as regressions
+        @returns            The table as a string
+    '''
+    flags = flags or {}
+    lines = ["{:<22}{:>12}{:>9}{:>9}{:>9}{:>9}{:>9}".format("benchmark", "ops/s", "mean us",
+                                                             "p50 us", "p90 us", "p99 us", "bytes")]
+    for name, r in results.items():
+        lines.append("{:<22}{:>12.0f}{:>9.2f}{:>9.2f}{:>9.2f}{:>9.2f}{:>9.0f}  {}".format(
+                     name, r["ops_per_s"], r["mean_us"], r["p50_us"], r["p90_us"], r["p99_us"],
+                     r["alloc_bytes"], flags.get(name, "")))
+    return "\n".join(lines)
+
+
+def compare(results, history, plat, threshold = THRESHOLD):
+    '''!@brief              Compares new results with the recent history of the same platform
+        @param              results Dictionary of results by benchmark name
+        @param              history List of earlier runs, oldest first
+        @param              plat Platform of the new results
+        @param              threshold Fraction by which a median may grow before it is flagged
+        @returns            Dictionary of notes by benchmark name
+    '''
+    flags = {}
+    runs = [h for h in history if h["platform"] == plat]
+    for name, r in results.items():
+        old = sorted(h["results"][name]["p50_us"] for h in runs[-HISTORY_RUNS:] if name in h["results"])
+        if not old:
+            continue
+        base = percentile(old, .5)
+        if base <= 0:
+            continue
+        change = r["p50_us"] / base - 1
+        if change > threshold:
+            flags[name] = "REGRESSION {:+.0f} %".format(change * 100)
+        elif change < -threshold:
+            flags[name] = "faster {:+.0f} %".format(change * 100)
+    return flags
+
+
+def main(select = None, n = None):
+    '''!@brief              Runs the benchmarks on the robot and prints the results
+        @param              select Substring of the names to run, or None for all of them
+        @param              n Number of calls of each, or None for each one's default
+    '''
+    import json
+    results = run(select, n)
+    print(report(results))
+    print("BENCH " + json.dumps({"platform": platform(), "results": results}))
+
+
+def _cli():
+    '''!@brief              Runs the benchmarks on the PC, keeping a history of the results
+    '''
+    import argparse
+    import json
+    import os
+    import time as host_time
+    parser = argparse.ArgumentParser(prog = "python bench.py",
+                                     description = "Benchmark the hot paths of the firmware")
+    parser.add_argument("-k", dest = "select", help = "run only benchmarks with this in their name")
+    parser.add_argument("--n", type = int, help = "calls per benchmark")
+    parser.add_argument("--history", default = "bench_history.json")
+    parser.add_argument("--threshold", type = float, default = THRESHOLD)
+    parser.add_argument("--no-save", action = "store_true", help = "do not add this run to the history")
+    parser.add_argument("--record", help = "file holding the BENCH line of a run on the robot")
+    args = parser.parse_args()
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as file:
+            history = json.load(file)
+
+    if args.record:
+        with open(args.record) as file:
+            line = [l for l in file if l.startswith("BENCH ")][-1]
+        entry = json.loads(line[len("BENCH "):])
+    else:
+        entry = {"platform": platform(), "results": run(args.select, args.n)}
+    entry["time"] = host_time.strftime("%Y-%m-%d %H:%M:%S")
+
+    flags = compare(entry["results"], history, entry["platform"], args.threshold)
+    print(entry["platform"])
+    print(report(entry["results"], flags))
+    if not args.no_save:
+        history.append(entry)
+        with open(args.history, "w") as file:
+            json.dump(history, file, indent = 1)
+    if any(f.startswith("REGRESSION") for f in flags.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,409 @@
+'''!@file                       fixed_point.py
+    @brief                      Q16.16 fixed point math written to avoid heap allocation on MicroPython
+    @details                    On MicroPython every float result is a new heap object, but integers
+                                which fit in 31 bits are stored in place. A Q16.16 number is an integer
+                                holding the value times 65536, so it has 16 bits of fraction and can
+                                hold magnitudes up to about 16383.99998 without leaving that range.
+
+                                The helpers here keep every intermediate result inside +/-2^30 and build
+                                no tuples or other objects, so that a control loop written with them
+                                need not allocate once it is running: mul() splits its operands into
+                                pieces whose partial products fit, and div() and ratio() do long
+                                division. This has not yet been measured on the robot, and each
+                                operation is a function call, so it is not faster than floats; on the
+                                PC bench.py shows it several times slower. Run bench.py on the robot
+                                before choosing it over floats. Results which would not fit are
+                                saturated to +/-MAX instead. Products and quotients are rounded toward
+                                zero. Everything gives the same bits on CPython, and
+                                tests/test_fixed_point.py checks each operation on the PC against
+                                exact rational arithmetic.
+
+                                The fixed point path is opt-in and untested on the robot: Encoder,
+                                Motor_Task and LineFollowerPID only use it when made with fixed=True,
+                                and main.py runs the control loops in floats.
+
+                                Converting to and from floats (from_float(), to_float()) allocates, so
+                                do it when setting gains and limits, not every update.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import math
+'''!@package              Import math
+'''
+
+## Number of fraction bits
+SHIFT = 16
+## The value 1.0
+ONE = 1 << SHIFT
+## Largest value, just under 16384.0
+MAX = (1 << 30) - 1
+## Smallest value; -2^30 itself is avoided so that -MIN also fits
+MIN = -MAX
+## Divisors at or above this are halved, with the dividend, before dividing
+DIV_LIMIT = 1 << 29
+
+
+def from_float(x):
+    '''!@brief              Converts a float to Q16.16, rounding to nearest and saturating
+        @param              x The value to convert
+        @returns            The Q16.16 value
+    '''
+    return sat(int(round(x * ONE)))
+
+
+def to_float(q):
+    '''!@brief              Converts a Q16.16 number to a float
+        @param              q The value to convert
+        @returns            The float value
+    '''
+    return q / ONE
+
+
+def from_int(n):
+    '''!@brief              Converts an integer to Q16.16, saturating
+        @param              n The integer to convert
+        @returns            The Q16.16 value
+    '''
+    if n > MAX >> SHIFT:
+        return MAX
+    if n < -(MAX >> SHIFT):
+        return MIN
+    return n << SHIFT
+
+
+def to_int(q):
+    '''!@brief              Converts a Q16.16 number to an integer, rounding toward zero
+        @param              q The value to convert
+        @returns            The integer part
+    '''
+    return q >> SHIFT if q >= 0 else -((-q) >> SHIFT)
+
+
+def sat(q, lo = MIN, hi = MAX):
+    '''!@brief              Limits a value to a range
+        @param              q The value to limit
+        @param              lo Lowest allowed value
+        @param              hi Highest allowed value
+        @returns            The limited value
+    '''
+    if q > hi:
+        return hi
+    if q < lo:
+        return lo
+    return q
+
+
+def add(a, b):
+    '''!@brief              Adds two Q16.16 numbers, saturating
+        @param              a First value
+        @param              b Second value
+        @returns            a + b
+    '''
+    if b > 0:
+        if a > MAX - b:
+            return MAX
+    elif a < MIN - b:
+        return MIN
+    return a + b
+
+
+def sub(a, b):
+    '''!@brief              Subtracts two Q16.16 numbers, saturating
+        @param              a First value
+        @param              b Value to subtract, within MIN to MAX
+        @returns            a - b
+    '''
+    return add(a, -b)
+
+
+def mul(a, b):
+    '''!@brief              Multiplies two Q16.16 numbers, rounding toward zero and saturating
+        @details            With a = ah*2^16 + al and b = bh*2^16 + bl, the product shifted down by
+                            16 bits is ah*bh*2^16 + ah*bl + al*bh + al*bl/2^16. Each of those is
+                            smaller than 2^30, al*bl is itself split in two, and the sum is checked
+                            against MAX before every addition.
+        @param              a First value
+        @param              b Second value
+        @returns            a * b
+    '''
+    neg = False
+    if a < 0:
+        a = -a
+        neg = True
+    if b < 0:
+        b = -b
+        neg = not neg
+
+    ah = a >> SHIFT
+    al = a & 0xFFFF
+    bh = b >> SHIFT
+    bl = b & 0xFFFF
+
+    # ah*bh*2^16 fits only if ah*bh < 2^14
+    if ah and bh and ah > (MAX >> SHIFT) // bh:
+        return MIN if neg else MAX
+    total = (ah * bh) << SHIFT
+
+    # al*bl/2^16, as (al_high*bl + al_low*bl/2^8)/2^8 so no partial product passes 2^24
+    low = ((al >> 8) * bl + (((al & 0xFF) * bl) >> 8)) >> 8
+
+    # Added one at a time rather than looped over, as a tuple of them would be allocated
+    part = ah * bl
+    if total > MAX - part:
+        return MIN if neg else MAX
+    total += part
+    part = al * bh
+    if total > MAX - part:
+        return MIN if neg else MAX
+    total += part
+    if total > MAX - low:
+        return MIN if neg else MAX
+    total += low
+    return -total if neg else total
+
+
+def div(a, b):
+    '''!@brief              Divides two Q16.16 numbers, rounding toward zero and saturating
+        @details            Exact when the size of b is below 2^29 (8192.0); larger divisors are
+                            halved along with the dividend, losing the dividend's last bit.
+                            Division by zero gives MAX or MIN with the sign of a.
+        @param              a Dividend
+        @param              b Divisor
+        @returns            a / b
+    '''
+    neg = False
+    if a < 0:
+        a = -a
+        neg = True
+    if b < 0:
+        b = -b
+        neg = not neg
+    if b >= DIV_LIMIT:
+        a >>= 1
+        b >>= 1
+    if b == 0:
+        return MIN if neg else MAX
+    q = _long_div(a, b, SHIFT)
+    return -q if neg else q
+
+
+def ratio(num, den):
+    '''!@brief              Makes the Q16.16 value of the ratio of two integers
+        @param              num Integer numerator, of size below 2^30
+        @param              den Integer denominator, of size below 2^29
+        @returns            num / den, rounded toward zero and saturated
+    '''
+    neg = False
+    if num < 0:
+        num = -num
+        neg = True
+    if den < 0:
+        den = -den
+        neg = not neg
+    if den == 0:
+        return MIN if neg else MAX
+    q = _long_div(num, den, SHIFT)
+    return -q if neg else q
+
+
+def _long_div(num, den, bits):
+    '''!@brief              Divides two non-negative integers, giving a result with fraction bits
+        @param              num Numerator, 0 to MAX
+        @param              den Denominator, 1 to DIV_LIMIT - 1
+        @param              bits Number of fraction bits in the result
+        @returns            floor(num * 2^bits / den), saturated to MAX
+    '''
+    q = num // den
+    r = num - q * den
+    if q > (MAX >> bits):
+        return MAX
+    # Take as many fraction bits per step as keep r << step below 2^30
+    while bits:
+        step = bits
+        while step > 1 and (r >> (30 - step)):
+            step -= 1
+        r <<= step
+        q = (q << step) + r // den
+        r %= den
+        bits -= step
+    return q
+
+
+def count_scale(units_per_count):
+    '''!@brief              Makes the scale used by count_rate() to turn counts per microsecond into units per second
+        @details            For example, count_scale(2*math.pi/cpr) gives wheel speeds in rad/s and
+                            count_scale(60/cpr) gives them in RPM. Uses floats, so call it once.
+        @param              units_per_count Output units for one count, such as radians or revolutions
+        @returns            The Q16.16 scale
+    '''
+    return from_float(units_per_count * 1_000_000 / 64)
+
+
+def count_rate(counts, dt_us, scale):
+    '''!@brief              Turns a count change over a time into a rate, without floats
+        @details            The counts are multiplied by 64 before dividing so that slow rates keep
+                            their precision, which count_scale() allows for
+        @param              counts Counts in the interval, of size below 2^24
+        @param              dt_us Length of the interval in microseconds
+        @param              scale Scale from count_scale()
+        @returns            The rate in Q16.16 units per second
+    '''
+    return mul(ratio(counts << 6, dt_us), scale)
+
+
+class PID:
+
+    def __init__(self, kP, setPoint, kI = 0.0, kD = 0.0, kF = 0.0, dt = 0.1,
+                 out_min = None, out_max = None, i_min = None, i_max = None, d_alpha = 1.0):
+        '''!@brief              Constructs a fixed point PID controller which works like ClosedLoop.ClosedLoop
+            @details            The constructor and the set_ methods take floats, the same as ClosedLoop,
+                                and convert them once; update() takes and gives Q16.16 values
+            @param              kP Proportional gain
+            @param              setPoint Initial setpoint
+            @param              kI Integral gain, per second
+            @param              kD Derivative gain, in seconds
+            @param              kF Feedforward gain applied to the setpoint
+            @param              dt Time step in seconds used when update() is not given one
+            @param              out_min Lowest output, or None for no limit
+            @param              out_max Highest output, or None for no limit
+            @param              i_min Lowest integral term, default out_min
+            @param              i_max Highest integral term, default out_max
+            @param              d_alpha Derivative filter coefficient from 0 to 1, 1 for no filtering
+        '''
+        self.kP = 0
+        self.kI = 0
+        self.kD = 0
+        self.kF = 0
+        self.set_gain(kP, kI, kD, kF)
+        self.set_sp(setPoint)
+        self.dt = from_float(dt)
+        self.d_alpha = from_float(d_alpha)
+        self.set_limits(out_min, out_max, i_min, i_max)
+        self.reset()
+
+    def set_gain(self, kP, kI = None, kD = None, kF = None):
+        '''!@brief              Changes the gains
+            @param              kP Proportional gain
+            @param              kI Integral gain, or None to keep the present one
+            @param              kD Derivative gain, or None to keep the present one
+            @param              kF Feedforward gain, or None to keep the present one
+        '''
+        self.kP = from_float(kP)
+        if kI is not None:
+            self.kI = from_float(kI)
+        if kD is not None:
+            self.kD = from_float(kD)
+        if kF is not None:
+            self.kF = from_float(kF)
+
+    def set_sp(self, sp):
+        '''!@brief              Changes the setpoint
+            @param              sp New setpoint as a float
+        '''
+        self.sp = from_float(sp)
+
+    def set_sp_q(self, sp):
+        '''!@brief              Changes the setpoint without allocating
+            @param              sp New setpoint in Q16.16
+        '''
+        self.sp = sp
+
+    def set_limits(self, out_min, out_max, i_min = None, i_max = None):
+        '''!@brief              Changes the output and integral limits
+            @param              out_min Lowest output, or None for no limit
+            @param              out_max Highest output, or None for no limit
+            @param              i_min Lowest integral term, default out_min
+            @param              i_max Highest integral term, default out_max
+        '''
+        self.out_min = MIN if out_min is None else from_float(out_min)
+        self.out_max = MAX if out_max is None else from_float(out_max)
+        self.i_min = self.out_min if i_min is None else from_float(i_min)
+        self.i_max = self.out_max if i_max is None else from_float(i_max)
+
+    def reset(self):
+        '''!@brief              Clears the integral, the derivative filter, and the last measurement
+        '''
+        self.integral = 0
+        self.deriv = 0
+        self.prev_measured = 0
+        self.first = True
+        self.output = 0
+
+    def update(self, measured, dt = None):
+        '''!@brief              Runs the controller for one time step
+            @param              measured The measured value in Q16.16
+            @param              dt Time since the last update in Q16.16 seconds, or None for the default
+            @returns            The controller output in Q16.16, within the output limits
+        '''
+        if dt is None or dt <= 0:
+            dt = self.dt
+
+        error = sub(self.sp, measured)
+
+        # Derivative of the measurement, low-pass filtered; none on the first update
+        if self.first:
+            self.first = False
+        else:
+            d_raw = div(sub(self.prev_measured, measured), dt)
+            self.deriv = add(self.deriv, mul(self.d_alpha, sub(d_raw, self.deriv)))
+        self.prev_measured = measured
+
+        base = add(add(mul(self.kF, self.sp), mul(self.kP, error)), mul(self.kD, self.deriv))
+
+        # Integrate unless the output is already saturated in the same direction
+        integral = sat(add(self.integral, mul(mul(self.kI, error), dt)), self.i_min, self.i_max)
+
+        output = add(base, integral)
+        if output > self.out_max:
+            if error < 0:
+                self.integral = integral
+            output = self.out_max
+        elif output < self.out_min:
+            if error > 0:
+                self.integral = integral
+            output = self.out_min
+        else:
+            self.integral = integral
+
+        self.output = output
+        return output
+
+
+class Kinematics:
+
+    def __init__(self, r, L):
+        '''!@brief              Constructs the fixed point kinematics of a differential drive
+            @param              r Wheel radius in m
+            @param              L Track width, the distance between the wheels, in m
+        '''
+        self.inv_r = from_float(1 / r)
+        self.half_L = from_float(L / 2)
+        self.r_half = from_float(r / 2)
+        self.r_over_L = from_float(r / L)
+
+    def wheel_speeds_into(self, dest, v, omega):
+        '''!@brief              Turns a body velocity and yaw rate into wheel speeds
+            @param              dest Array of at least 2 integers which gets the left then right
+                                wheel speeds in Q16.16 rad/s
+            @param              v Forward velocity in Q16.16 m/s
+            @param              omega Yaw rate, counterclockwise positive, in Q16.16 rad/s
+        '''
+        turn = mul(self.half_L, omega)
+        dest[0] = mul(sub(v, turn), self.inv_r)
+        dest[1] = mul(add(v, turn), self.inv_r)
+
+    def twist_into(self, dest, omega_l, omega_r):
+        '''!@brief              Turns wheel speeds into a body velocity and yaw rate
+            @param              dest Array of at least 2 integers which gets the Q16.16 velocity in m/s
+                                then the yaw rate in rad/s
+            @param              omega_l Left wheel speed in Q16.16 rad/s
+            @param              omega_r Right wheel speed in Q16.16 rad/s
+        '''
+        dest[0] = mul(add(omega_r, omega_l), self.r_half)
+        dest[1] = mul(sub(omega_r, omega_l), self.r_over_L)
+
+
+## Q16.16 value of pi
+PI = from_float(math.pi)
@@ -0,0 +1,105 @@
+'''!@file                       __init__.py
+    @brief                      Runs the robot's firmware on a PC
+    @details                    install() puts simulated pyb, machine and micropython modules in
+                                place of the real ones and gives the time module the ticks and sleep
+                                functions of the shared virtual clock in vclock. After that every file
+                                of the firmware, main.py included, imports and runs unchanged under
+                                CPython, faster than real time and with repeatable timing. For example:
+
+                                @code
+                                import hostsim
+                                hostsim.install()
+
+                                import Encoder
+                                from pyb import Timer, Pin
+                                tim = Timer(3, period=65535, prescaler=0)
+                                enc = Encoder.Encoder(Pin.cpu.B4, Pin.cpu.B5, tim)
+                                tim.add_counts(100)
+                                hostsim.clock.advance(10_000)
+                                enc.update()
+                                @endcode
+
+                                From the command line, @c python -m hostsim 5000 runs main.main()
+                                for 5 s of virtual time and prints what it wrote to the USB port.
+
+                                This package runs on the PC only.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import sys
+import time
+import vclock
+from hostsim import micropython, pyb, machine
+'''!@package              Import sys, time, vclock, and the simulated modules
+'''
+
+## The virtual clock all simulated hardware and the firmware's time functions use
+clock = vclock.clock
+
+## Functions of MicroPython's time module which CPython's does not have
+TIME_NAMES = ("ticks_us", "ticks_ms", "ticks_cpu", "ticks_diff", "ticks_add", "sleep_ms", "sleep_us")
+
+
+def install():
+    '''!@brief              Makes the firmware importable by putting the simulated modules in place
+        @details            The time module only gains the MicroPython functions it is missing, so
+                            time.sleep() and time.time() keep working for the rest of the program.
+                            Calling this again does nothing more.
+    '''
+    sys.modules["pyb"] = pyb
+    sys.modules["machine"] = machine
+    sys.modules["micropython"] = micropython
+    for name in TIME_NAMES:
+        setattr(time, name, getattr(clock, name))
+
+    # The scheduler would otherwise take the patched time module, which cannot jump ahead
+    import scheduler
+    scheduler.sys_clock = clock
+
+
+def reset(start_us = 0):
+    '''!@brief              Starts a new simulation in the same process
+        @details            Sets the clock back, forgets every peripheral and scheduled function,
+                            and empties the task list and share list
+        @param              start_us Absolute time in microseconds to start from
+    '''
+    install()
+    import scheduler
+    import task_share
+    clock.reset(start_us)
+    pyb.reset()
+    micropython.clear_scheduled()
+    scheduler.task_list.tasks.clear()
+    task_share.share_list.clear()
+
+
+def stop_after(ms):
+    '''!@brief              Interrupts whatever is running after a length of virtual time, as Ctrl-C would
+        @param              ms Milliseconds of virtual time from now
+        @returns            Handle which can be given to clock.cancel()
+    '''
+    return clock.call_after(int(ms * 1000), _interrupt)
+
+
+def _interrupt(arg):
+    '''!@brief              Raises KeyboardInterrupt from the clock
+        @param              arg Unused
+    '''
+    raise KeyboardInterrupt
+
+
+def run_main(ms):
+    '''!@brief              Runs main.main() for a length of virtual time
+        @details            main() stops at the KeyboardInterrupt and prints its statistics, as it
+                            does after Ctrl-C on the robot
+        @param              ms Milliseconds of virtual time to run for
+    '''
+    install()
+    import main
+    handle = stop_after(ms)
+    try:
+        main.main()
+    finally:
+        clock.cancel(handle)
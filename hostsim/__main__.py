@@ -0,0 +1,24 @@
+'''!@file                       __main__.py
+    @brief                      Runs main.main() on the PC for a length of virtual time
+    @details                    Usage: @c python -m hostsim [ms], from the folder holding main.py.
+                                Runs for 1000 ms of virtual time unless told otherwise, then prints
+                                how long that took in real time and what the firmware wrote to the
+                                USB serial port.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import sys
+import time
+import hostsim
+'''!@package              Import sys, time, and hostsim
+'''
+
+ms = float(sys.argv[1]) if len(sys.argv) > 1 else 1000
+hostsim.install()
+start = time.perf_counter()
+hostsim.run_main(ms)
+real = time.perf_counter() - start
+sys.stdout.write(hostsim.pyb.USB_VCP().take().decode(errors="replace"))
+print("\n{:.0f} ms of virtual time in {:.3f} s".format(ms, real))
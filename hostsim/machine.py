@@ -0,0 +1,59 @@
+'''!@file                       machine.py
+    @brief                      The machine module for running the firmware on a PC
+    @details                    Pin is the same class as the simulated pyb.Pin, as it is on the robot.
+                                time_pulse_us() waits on the virtual clock, so a simulated sensor must
+                                drive the pin from scheduled events for it to see a pulse.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+from hostsim import pyb
+from hostsim.pyb import Pin, disable_irq, enable_irq
+'''!@package              Import the simulated pyb module, Pin, disable_irq, and enable_irq
+'''
+
+
+def time_pulse_us(pin, pulse_level, timeout_us = 1_000_000):
+    '''!@brief              Times a pulse on a pin, as machine.time_pulse_us()
+        @details            Waits for the pin to reach pulse_level, then times how long it stays there
+        @param              pin Pin to watch
+        @param              pulse_level Level of the pulse, 0 or 1
+        @param              timeout_us Longest time to wait for each of the two edges
+        @returns            Pulse length in microseconds, -2 if the pulse never started, or -1 if it
+                            never ended
+    '''
+    clock = pyb.clock
+    deadline = clock.now_us() + timeout_us
+    while pin.value() != pulse_level:
+        if clock.now_us() >= deadline:
+            return -2
+        pyb.wait_event(deadline)
+
+    start = clock.now_us()
+    deadline = start + timeout_us
+    while pin.value() == pulse_level:
+        if clock.now_us() >= deadline:
+            return -1
+        pyb.wait_event(deadline)
+    return clock.now_us() - start
+
+
+def idle():
+    '''!@brief              Waits for the next interrupt, which is the next scheduled event
+    '''
+    pyb.wait_event()
+
+
+def freq():
+    '''!@brief              Gets the CPU frequency of the robot's STM32L476
+        @returns            Frequency in Hz
+    '''
+    return 80_000_000
+
+
+def unique_id():
+    '''!@brief              Gets the board's unique ID
+        @returns            Bytes which are the same for every simulated board
+    '''
+    return b"hostsim\x00\x00\x00\x00\x00"
@@ -0,0 +1,99 @@
+'''!@file                       micropython.py
+    @brief                      The micropython module for running the firmware on a PC
+    @details                    The code emitter decorators return the function unchanged and const()
+                                returns its argument. Functions passed to schedule() are queued and
+                                run by run_scheduled(), which the simulated interrupts call as soon
+                                as their handler returns, as MicroPython does on the robot.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+## Most functions waiting in the schedule queue, as in MicroPython's default build
+SCHEDULE_DEPTH = 8
+
+_scheduled = []
+
+
+def const(value):
+    '''!@brief              Declares a constant, which on a PC is just the value
+        @param              value The constant's value
+        @returns            The value
+    '''
+    return value
+
+
+def native(fun):
+    '''!@brief              Native code emitter decorator, which does nothing on a PC
+        @param              fun Function to compile
+        @returns            The same function
+    '''
+    return fun
+
+
+def viper(fun):
+    '''!@brief              Viper code emitter decorator, which does nothing on a PC
+        @param              fun Function to compile
+        @returns            The same function
+    '''
+    return fun
+
+
+def schedule(fun, arg):
+    '''!@brief              Queues a function to run soon, outside of the interrupt calling this
+        @param              fun Function taking one argument
+        @param              arg Argument passed to fun
+    '''
+    if len(_scheduled) >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    _scheduled.append((fun, arg))
+
+
+def run_scheduled():
+    '''!@brief              Runs every queued function, including ones they queue themselves
+    '''
+    while _scheduled:
+        fun, arg = _scheduled.pop(0)
+        fun(arg)
+
+
+def clear_scheduled():
+    '''!@brief              Forgets every queued function, for starting a new simulation
+    '''
+    del _scheduled[:]
+
+
+def alloc_emergency_exception_buf(size):
+    '''!@brief              Reserves memory for exceptions in interrupts, not needed on a PC
+        @param              size Number of bytes
+    '''
+    pass
+
+
+def opt_level(level = None):
+    '''!@brief              Gets or sets the compiler optimization level, which is always 0 on a PC
+        @param              level Ignored
+        @returns            0 when reading the level
+    '''
+    if level is None:
+        return 0
+
+
+def mem_info(verbose = False):
+    '''!@brief              Prints memory use, which a PC does not track the MicroPython way
+        @param              verbose Ignored
+    '''
+    print("mem: not available on the host")
+
+
+def heap_lock():
+    '''!@brief              Locks the heap, which does nothing on a PC
+    '''
+    pass
+
+
+def heap_unlock():
+    '''!@brief              Unlocks the heap, which does nothing on a PC
+        @returns            0, the lock depth
+    '''
+    return 0
@@ -0,0 +1,1006 @@
+'''!@file                       pyb.py
+    @brief                      Simulated pyb peripherals for running the firmware on a PC
+    @details                    Each class takes the same arguments and has the same methods as the
+                                pyb class the firmware uses, but works on plain Python state driven by
+                                the virtual clock in vclock. Peripherals are kept by name or number,
+                                so asking for Timer(3) or Pin.cpu.B4 twice gives the same object, as on
+                                the robot, and a simulation can find the objects the firmware made in
+                                the pins, timers, adcs, i2cs and uarts dictionaries.
+
+                                Simulations drive the inputs with a few extra methods which the real
+                                pyb does not have: Pin.drive() sets an input's level and fires its
+                                interrupt, Timer.add_counts() moves an encoder counter, ADC.set() and
+                                ADC.source set what an ADC reads, I2C.attach() puts a device such as a
+                                RegisterMap on the bus, and UART and USB_VCP have feed() for received
+                                bytes and take() for sent ones.
+
+                                Anything which blocks on the robot advances the virtual clock instead:
+                                timed ADC reads, I2C transfers, and UART writes take as long as they
+                                would at their sample rate or baud rate. Timer callbacks and pin
+                                interrupts run from the clock's scheduled events and are followed by
+                                the functions they passed to micropython.schedule().
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import errno
+import vclock
+from hostsim import micropython
+'''!@package              Import errno, vclock, and the simulated micropython module
+'''
+
+## Clock every peripheral runs on
+clock = vclock.clock
+
+## Every pin made so far, by name
+pins = {}
+## Every timer made so far, by number
+timers = {}
+## Every ADC made so far, by the name of its pin
+adcs = {}
+## Every I2C bus made so far, by number
+i2cs = {}
+## Every UART made so far, by number
+uarts = {}
+
+_irq_enabled = True
+_deferred = []          # interrupts which came while interrupts were disabled
+_repl = None
+
+
+def reset():
+    '''!@brief              Forgets every peripheral, for starting a new simulation
+    '''
+    global _irq_enabled, _repl, _usb
+    for tim in timers.values():
+        tim.callback(None)
+    for table in (pins, timers, adcs, i2cs, uarts):
+        table.clear()
+    del _deferred[:]
+    _irq_enabled = True
+    _repl = None
+    _usb = None
+
+
+def interrupt(handler, arg):
+    '''!@brief              Runs an interrupt handler, then the functions it scheduled
+        @details            While interrupts are disabled the handler waits for enable_irq()
+        @param              handler Interrupt handler taking one argument
+        @param              arg Argument for the handler, usually the peripheral which interrupted
+    '''
+    if not _irq_enabled:
+        _deferred.append((handler, arg))
+        return
+    handler(arg)
+    micropython.run_scheduled()
+
+
+def disable_irq():
+    '''!@brief              Disables interrupts
+        @returns            The previous state, for enable_irq()
+    '''
+    global _irq_enabled
+    state = _irq_enabled
+    _irq_enabled = False
+    return state
+
+
+def enable_irq(state = True):
+    '''!@brief              Restores interrupts, running any which came while they were disabled
+        @param              state State returned by disable_irq()
+    '''
+    global _irq_enabled
+    _irq_enabled = state
+    while _irq_enabled and _deferred:
+        interrupt(*_deferred.pop(0))
+
+
+def delay(ms):
+    '''!@brief              Waits, as pyb.delay()
+        @param              ms Milliseconds to wait
+    '''
+    clock.sleep_ms(ms)
+
+
+def udelay(us):
+    '''!@brief              Waits, as pyb.udelay()
+        @param              us Microseconds to wait
+    '''
+    clock.sleep_us(us)
+
+
+def millis():
+    '''!@brief              Gets the milliseconds since start
+        @returns            Milliseconds
+    '''
+    return clock.ticks_ms()
+
+
+def micros():
+    '''!@brief              Gets the microseconds since start
+        @returns            Microseconds
+    '''
+    return clock.ticks_us()
+
+
+def elapsed_millis(start):
+    '''!@brief              Gets the milliseconds since a time from millis()
+        @param              start Earlier value of millis()
+        @returns            Milliseconds
+    '''
+    return clock.ticks_diff(clock.ticks_ms(), start)
+
+
+def elapsed_micros(start):
+    '''!@brief              Gets the microseconds since a time from micros()
+        @param              start Earlier value of micros()
+        @returns            Microseconds
+    '''
+    return clock.ticks_diff(clock.ticks_us(), start)
+
+
+def wfi():
+    '''!@brief              Waits for the next interrupt, which is the next scheduled event
+    '''
+    wait_event()
+
+
+def wait_event(deadline_us = None):
+    '''!@brief              Advances the clock to the next scheduled event or a deadline, whichever is first
+        @param              deadline_us Absolute time in microseconds to stop at, or None for no limit
+    '''
+    target = clock.next_event_us()
+    if target is None or (deadline_us is not None and deadline_us < target):
+        target = deadline_us
+    if target is None:
+        return
+    clock.advance(max(target - clock.now_us(), 0))
+
+
+def repl_uart(uart = None):
+    '''!@brief              Gets or sets the UART the REPL is duplicated on
+        @param              uart UART to use, or None to stop duplicating the REPL
+        @returns            The present UART when called without an argument
+    '''
+    global _repl
+    _repl = uart
+    return _repl
+
+
+class _PinNames:
+
+    def __getattr__(self, name):
+        '''!@brief              Gets a pin by name, as Pin.cpu.A5 or Pin.board.X1 does
+            @param              name Name of the pin
+            @returns            The pin
+        '''
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return Pin(name)
+
+
+class Pin:
+
+    ## Input mode
+    IN = 0
+    ## Push-pull output mode
+    OUT_PP = 1
+    ## Push-pull output mode
+    OUT = 1
+    ## Open drain output mode
+    OUT_OD = 17
+    ## Alternate function mode
+    AF_PP = 2
+    ## Alternate function mode
+    ALT = 2
+    ## Open drain alternate function mode
+    AF_OD = 18
+    ## Analog mode
+    ANALOG = 3
+    ## No pull resistor
+    PULL_NONE = 0
+    ## Pull up resistor
+    PULL_UP = 1
+    ## Pull down resistor
+    PULL_DOWN = 2
+    ## Interrupt on the rising edge
+    IRQ_RISING = 1
+    ## Interrupt on the falling edge
+    IRQ_FALLING = 2
+
+    ## Pins by CPU name
+    cpu = _PinNames()
+    ## Pins by board name
+    board = _PinNames()
+
+    def __new__(cls, id, *args, **kwargs):
+        '''!@brief              Gets the one pin object for a pin name, making it the first time
+            @param              id Pin name or pin object
+        '''
+        if isinstance(id, Pin):
+            return id
+        pin = pins.get(id)
+        if pin is None:
+            pin = object.__new__(cls)
+            pin._name = id
+            pin._mode = cls.IN
+            pin._pull = cls.PULL_NONE
+            pin._value = 0
+            pin._handler = None
+            pin._trigger = 0
+            pin._watchers = []
+            pins[id] = pin
+        return pin
+
+    def __init__(self, id, mode = -1, pull = -1, *, value = None, alt = -1):
+        '''!@brief              Sets up a pin
+            @param              id Pin name or pin object
+            @param              mode Pin mode, or -1 to keep the present one
+            @param              pull Pull resistor, or -1 to keep the present one
+            @param              value Output level to start with, or None to keep the present one
+            @param              alt Alternate function, ignored
+        '''
+        self.init(mode, pull, value = value)
+
+    def init(self, mode = -1, pull = -1, *, value = None, alt = -1):
+        '''!@brief              Changes a pin's setup
+            @param              mode Pin mode, or -1 to keep the present one
+            @param              pull Pull resistor, or -1 to keep the present one
+            @param              value Output level, or None to keep the present one
+            @param              alt Alternate function, ignored
+        '''
+        if mode != -1:
+            self._mode = mode
+        if pull != -1 and pull is not None:
+            self._pull = pull
+            if self._mode == Pin.IN:
+                self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self.value(value)
+
+    def name(self):
+        '''!@brief              Gets the pin's name
+            @returns            The name
+        '''
+        return self._name
+
+    def mode(self, mode = None):
+        '''!@brief              Gets or sets the pin mode
+            @param              mode New mode, or None to read it
+            @returns            The mode when reading it
+        '''
+        if mode is None:
+            return self._mode
+        self._mode = mode
+
+    def value(self, value = None):
+        '''!@brief              Gets the pin's level or sets an output's level
+            @param              value New level, or None to read it
+            @returns            The level, 0 or 1, when reading it
+        '''
+        if value is None:
+            return self._value
+        level = 1 if value else 0
+        if level != self._value:
+            self._value = level
+            for watcher in self._watchers:
+                watcher(self)
+
+    def __call__(self, value = None):
+        '''!@brief              Same as value()
+        '''
+        return self.value(value)
+
+    def high(self):
+        '''!@brief              Sets the pin high
+        '''
+        self.value(1)
+
+    def low(self):
+        '''!@brief              Sets the pin low
+        '''
+        self.value(0)
+
+    def on(self):
+        '''!@brief              Sets the pin high
+        '''
+        self.value(1)
+
+    def off(self):
+        '''!@brief              Sets the pin low
+        '''
+        self.value(0)
+
+    def irq(self, handler = None, trigger = IRQ_RISING | IRQ_FALLING, priority = 1, wake = None, hard = False):
+        '''!@brief              Sets or removes the pin's interrupt handler
+            @param              handler Function taking the pin, or None to remove the handler
+            @param              trigger IRQ_RISING, IRQ_FALLING, or both
+            @param              priority Ignored
+            @param              wake Ignored
+            @param              hard Ignored, every simulated handler runs like a hard interrupt
+        '''
+        self._handler = handler
+        self._trigger = trigger if handler is not None else 0
+
+    def watch(self, fun):
+        '''!@brief              Calls a function whenever the firmware changes the pin's level
+            @details            Not in pyb; this is how a simulation sees outputs such as a trigger pulse
+            @param              fun Function taking the pin
+        '''
+        self._watchers.append(fun)
+
+    def drive(self, level):
+        '''!@brief              Sets the level seen on the pin from outside, firing its interrupt on an edge
+            @details            Not in pyb; used by simulations to drive inputs
+            @param              level New level, 0 or 1
+        '''
+        level = 1 if level else 0
+        if level == self._value:
+            return
+        self._value = level
+        edge = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+        if self._handler is not None and self._trigger & edge:
+            interrupt(self._handler, self)
+
+    def __repr__(self):
+        '''!@brief              Shows the pin's name
+        '''
+        return "Pin(Pin.cpu.{})".format(self._name)
+
+
+class TimerChannel:
+
+    def __init__(self, timer, num, mode, pin):
+        '''!@brief              Constructs one channel of a timer
+            @param              timer Timer the channel belongs to
+            @param              num Channel number
+            @param              mode Timer.PWM, Timer.ENC_AB, or another channel mode
+            @param              pin Pin the channel drives or reads, or None
+        '''
+        self.timer = timer
+        self.num = num
+        self.mode = mode
+        self.pin = None if pin is None else Pin(pin)
+        self._width = 0
+        self._callback = None
+
+    def pulse_width(self, value = None):
+        '''!@brief              Gets or sets the pulse width in timer counts
+            @param              value New pulse width, or None to read it
+            @returns            The pulse width when reading it
+        '''
+        if value is None:
+            return self._width
+        self._width = max(0, min(int(value), self.timer._period + 1))
+
+    def pulse_width_percent(self, value = None):
+        '''!@brief              Gets or sets the pulse width as a percentage of the period
+            @param              value New percentage from 0 to 100, or None to read it
+            @returns            The percentage when reading it
+        '''
+        if value is None:
+            return 100 * self._width / (self.timer._period + 1)
+        value = max(0, min(value, 100))
+        self._width = round(value * (self.timer._period + 1) / 100)
+
+    def compare(self, value = None):
+        '''!@brief              Gets or sets the compare value, the same as the pulse width here
+            @param              value New compare value, or None to read it
+            @returns            The compare value when reading it
+        '''
+        return self.pulse_width(value)
+
+    def capture(self, value = None):
+        '''!@brief              Gets or sets the capture value, the same as the pulse width here
+            @param              value New capture value, or None to read it
+            @returns            The capture value when reading it
+        '''
+        return self.pulse_width(value)
+
+    def callback(self, fun):
+        '''!@brief              Stores the channel's callback, which the simulation never calls
+            @param              fun Function taking the timer, or None
+        '''
+        self._callback = fun
+
+
+class Timer:
+
+    ## Channel mode: PWM output
+    PWM = 0
+    ## Channel mode: inverted PWM output
+    PWM_INVERTED = 1
+    ## Channel mode: output compare timing
+    OC_TIMING = 2
+    ## Channel mode: output compare active
+    OC_ACTIVE = 3
+    ## Channel mode: output compare inactive
+    OC_INACTIVE = 4
+    ## Channel mode: output compare toggle
+    OC_TOGGLE = 5
+    ## Channel mode: input capture
+    IC = 8
+    ## Channel mode: encoder counting on channel A
+    ENC_A = 9
+    ## Channel mode: encoder counting on channel B
+    ENC_B = 10
+    ## Channel mode: encoder counting on both channels
+    ENC_AB = 11
+    ## Counting up
+    UP = 0
+    ## Counting down
+    DOWN = 16
+    ## Counting up and down
+    CENTER = 32
+    ## Frequency of the clock feeding the timers, in Hz
+    SOURCE_FREQ = 80_000_000
+
+    def __new__(cls, num, *args, **kwargs):
+        '''!@brief              Gets the one timer object for a timer number, making it the first time
+            @param              num Timer number
+        '''
+        tim = timers.get(num)
+        if tim is None:
+            tim = object.__new__(cls)
+            tim._num = num
+            tim._prescaler = 0
+            tim._period = 0xFFFF
+            tim._counter = 0
+            tim._channels = {}
+            tim._callback = None
+            tim._event = None
+            tim._tick = 0
+            tim._start_us = 0
+            timers[num] = tim
+        return tim
+
+    def __init__(self, num, **kwargs):
+        '''!@brief              Sets up a timer, see init()
+            @param              num Timer number
+        '''
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, freq = None, prescaler = None, period = None, mode = UP, div = 1,
+             callback = None, deadtime = 0):
+        '''!@brief              Sets the timer's rate, by frequency or by prescaler and period
+            @param              freq Frequency in Hz
+            @param              prescaler Prescaler, used with period
+            @param              period Period in counts, used with prescaler
+            @param              mode Counting mode, ignored
+            @param              div Clock division, ignored
+            @param              callback Function called at every period, or None
+            @param              deadtime Ignored
+        '''
+        if freq is not None:
+            # Largest period which fits 16 bits, as pyb chooses
+            counts = max(1, round(self.SOURCE_FREQ / freq))
+            self._prescaler = (counts - 1) // 0x10000
+            self._period = max(0, counts // (self._prescaler + 1) - 1)
+        else:
+            if prescaler is not None:
+                self._prescaler = prescaler
+            if period is not None:
+                self._period = period
+        self._counter = 0
+        if callback is not None:
+            self.callback(callback)
+
+    def deinit(self):
+        '''!@brief              Stops the timer's callback and forgets its channels
+        '''
+        self.callback(None)
+        self._channels = {}
+
+    def freq(self, value = None):
+        '''!@brief              Gets or sets the timer's frequency
+            @param              value New frequency in Hz, or None to read it
+            @returns            The frequency in Hz when reading it
+        '''
+        if value is None:
+            return self.SOURCE_FREQ / ((self._prescaler + 1) * (self._period + 1))
+        self.init(freq = value)
+        if self._callback is not None:
+            self.callback(self._callback)
+
+    def prescaler(self, value = None):
+        '''!@brief              Gets or sets the prescaler
+            @param              value New prescaler, or None to read it
+            @returns            The prescaler when reading it
+        '''
+        if value is None:
+            return self._prescaler
+        self._prescaler = value
+
+    def period(self, value = None):
+        '''!@brief              Gets or sets the period in counts
+            @param              value New period, or None to read it
+            @returns            The period when reading it
+        '''
+        if value is None:
+            return self._period
+        self._period = value
+
+    def source_freq(self):
+        '''!@brief              Gets the frequency of the clock feeding the timer
+            @returns            Frequency in Hz
+        '''
+        return self.SOURCE_FREQ
+
+    def counter(self, value = None):
+        '''!@brief              Gets or sets the counter
+            @param              value New counter value, or None to read it
+            @returns            The counter value when reading it
+        '''
+        if value is None:
+            return self._counter
+        self._counter = value % (self._period + 1)
+
+    def add_counts(self, counts):
+        '''!@brief              Moves the counter, wrapping at the period, as encoder edges do
+            @details            Not in pyb; used by simulations to turn an encoder
+            @param              counts Signed number of counts
+        '''
+        self._counter = (self._counter + counts) % (self._period + 1)
+
+    def channel(self, num, mode = None, pin = None, **kwargs):
+        '''!@brief              Sets up or gets a channel of the timer
+            @param              num Channel number
+            @param              mode Channel mode, or None to get the channel as it is
+            @param              pin Pin the channel uses
+            @param              kwargs pulse_width or pulse_width_percent to start with; others are ignored
+            @returns            The channel
+        '''
+        if mode is None:
+            return self._channels.get(num)
+        ch = TimerChannel(self, num, mode, pin)
+        self._channels[num] = ch
+        if "pulse_width" in kwargs:
+            ch.pulse_width(kwargs["pulse_width"])
+        elif "pulse_width_percent" in kwargs:
+            ch.pulse_width_percent(kwargs["pulse_width_percent"])
+        return ch
+
+    def callback(self, fun):
+        '''!@brief              Sets a function to call at the timer's frequency, as an interrupt
+            @param              fun Function taking the timer, or None to stop calling it
+        '''
+        if self._event is not None:
+            clock.cancel(self._event)
+            self._event = None
+        self._callback = fun
+        if fun is not None:
+            self._tick = 0
+            self._start_us = clock.now_us()
+            self._schedule()
+
+    def _schedule(self):
+        '''!@brief              Schedules the next callback, without drifting from the timer's rate
+        '''
+        self._tick += 1
+        when = self._start_us + round(self._tick * 1_000_000 / self.freq())
+        self._event = clock.call_at(when, self._fire)
+
+    def _fire(self, arg):
+        '''!@brief              Runs the callback as an interrupt and schedules the next one
+            @param              arg Unused
+        '''
+        self._schedule()
+        interrupt(self._callback, self)
+
+    def __repr__(self):
+        '''!@brief              Shows the timer's number
+        '''
+        return "Timer({})".format(self._num)
+
+
+class ADC:
+
+    ## Largest reading
+    MAX = 4095
+
+    def __new__(cls, pin):
+        '''!@brief              Gets the one ADC object for a pin, making it the first time
+            @param              pin Pin or pin name
+        '''
+        pin = Pin(pin)
+        adc = adcs.get(pin.name())
+        if adc is None:
+            adc = object.__new__(cls)
+            adc.pin = pin
+            adc.level = 0
+            ## Function with no arguments giving the reading, used instead of level when set
+            adc.source = None
+            adcs[pin.name()] = adc
+        return adc
+
+    def __init__(self, pin):
+        '''!@brief              Sets up an ADC on a pin
+            @param              pin Pin or pin name
+        '''
+        pass
+
+    def set(self, level):
+        '''!@brief              Sets the reading
+            @details            Not in pyb; used by simulations
+            @param              level Reading from 0 to 4095
+        '''
+        self.level = level
+
+    def read(self):
+        '''!@brief              Takes one reading
+            @returns            Reading from 0 to 4095
+        '''
+        level = self.source() if self.source is not None else self.level
+        return max(0, min(int(level), self.MAX))
+
+    def read_timed(self, buf, timer):
+        '''!@brief              Fills a buffer with readings taken at the timer's frequency
+            @param              buf Buffer to fill
+            @param              timer Timer setting the sample rate, or a frequency in Hz
+            @returns            None
+        '''
+        ADC.read_timed_multi((self,), (buf,), timer)
+
+    @staticmethod
+    def read_timed_multi(adcs, bufs, timer):
+        '''!@brief              Fills one buffer per ADC with readings taken together at the timer's frequency
+            @details            Takes as long as the readings would on the robot
+            @param              adcs ADCs to read
+            @param              bufs One buffer per ADC, all the same length
+            @param              timer Timer setting the sample rate, or a frequency in Hz
+            @returns            True, as no sample was overrun
+        '''
+        freq = timer if isinstance(timer, (int, float)) else timer.freq()
+        start = clock.now_us()
+        for i in range(len(bufs[0])):
+            due = start + round((i + 1) * 1_000_000 / freq)
+            if due > clock.now_us():
+                clock.advance(due - clock.now_us())
+            for adc, buf in zip(adcs, bufs):
+                buf[i] = adc.read()
+        return True
+
+
+class RegisterMap:
+
+    def __init__(self, size = 256):
+        '''!@brief              Constructs a simulated I2C device whose registers are a byte array
+            @details            Reads and writes go through the registers with the address counting
+                                up, as most I2C sensors do. Subclasses can override on_read() and
+                                on_write() to act like a real device.
+            @param              size Number of registers
+        '''
+        self.regs = bytearray(size)
+
+    def read(self, memaddr, count):
+        '''!@brief              Reads registers
+            @param              memaddr First register
+            @param              count Number of registers
+            @returns            The register values as bytes
+        '''
+        self.on_read(memaddr, count)
+        return bytes(self.regs[memaddr:memaddr + count])
+
+    def write(self, memaddr, data):
+        '''!@brief              Writes registers
+            @param              memaddr First register
+            @param              data Bytes to write
+        '''
+        self.regs[memaddr:memaddr + len(data)] = data
+        self.on_write(memaddr, data)
+
+    def on_read(self, memaddr, count):
+        '''!@brief              Called before registers are read, to update them
+            @param              memaddr First register
+            @param              count Number of registers
+        '''
+        pass
+
+    def on_write(self, memaddr, data):
+        '''!@brief              Called after registers are written, to act on them
+            @param              memaddr First register
+            @param              data Bytes written
+        '''
+        pass
+
+
+class I2C:
+
+    ## Controller mode
+    CONTROLLER = 0
+    ## Controller mode, old name
+    MASTER = 0
+    ## Peripheral mode
+    PERIPHERAL = 1
+    ## Peripheral mode, old name
+    SLAVE = 1
+
+    def __new__(cls, bus, *args, **kwargs):
+        '''!@brief              Gets the one I2C object for a bus, making it the first time
+            @param              bus Bus number
+        '''
+        i2c = i2cs.get(bus)
+        if i2c is None:
+            i2c = object.__new__(cls)
+            i2c.bus = bus
+            ## Devices on the bus, by address
+            i2c.devices = {}
+            i2c.baudrate = 400_000
+            i2cs[bus] = i2c
+        return i2c
+
+    def __init__(self, bus, mode = None, **kwargs):
+        '''!@brief              Sets up an I2C bus, see init()
+            @param              bus Bus number
+            @param              mode CONTROLLER, or None to leave the bus as it is
+        '''
+        if mode is not None:
+            self.init(mode, **kwargs)
+
+    def init(self, mode = CONTROLLER, *, addr = 0x12, baudrate = 400_000, gencall = False, dma = False):
+        '''!@brief              Sets the bus speed
+            @param              mode CONTROLLER or PERIPHERAL, ignored
+            @param              addr Address in peripheral mode, ignored
+            @param              baudrate Bus speed in Hz
+            @param              gencall Ignored
+            @param              dma Ignored
+        '''
+        self.baudrate = baudrate
+
+    def deinit(self):
+        '''!@brief              Turns the bus off, which does nothing here
+        '''
+        pass
+
+    def attach(self, addr, device):
+        '''!@brief              Puts a device on the bus
+            @details            Not in pyb; used by simulations
+            @param              addr Device address
+            @param              device Object with read() and write() methods, such as a RegisterMap
+        '''
+        self.devices[addr] = device
+
+    def is_ready(self, addr):
+        '''!@brief              Checks whether a device answers at an address
+            @param              addr Device address
+            @returns            True if a device is attached there
+        '''
+        return addr in self.devices
+
+    def scan(self):
+        '''!@brief              Lists the addresses which answer
+            @returns            List of addresses
+        '''
+        return sorted(self.devices)
+
+    def _device(self, addr, count):
+        '''!@brief              Finds a device and lets time pass for a transfer
+            @param              addr Device address
+            @param              count Number of data bytes
+            @returns            The device
+        '''
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(errno.EIO)
+        # Address, register, and data bytes of 9 bits each
+        clock.advance((count + 3) * 9 * 1_000_000 // self.baudrate)
+        return device
+
+    def mem_read(self, data, addr, memaddr, *, timeout = 5000, addr_size = 8):
+        '''!@brief              Reads registers of a device
+            @param              data Buffer to fill, or the number of bytes to read
+            @param              addr Device address
+            @param              memaddr First register
+            @param              timeout Ignored
+            @param              addr_size Ignored
+            @returns            The bytes read if data was a number, else the buffer
+        '''
+        count = data if isinstance(data, int) else len(data)
+        raw = self._device(addr, count).read(memaddr, count)
+        if isinstance(data, int):
+            return bytes(raw)
+        data[:] = raw
+        return data
+
+    def mem_write(self, data, addr, memaddr, *, timeout = 5000, addr_size = 8):
+        '''!@brief              Writes registers of a device
+            @param              data Bytes to write, or one byte as a number
+            @param              addr Device address
+            @param              memaddr First register
+            @param              timeout Ignored
+            @param              addr_size Ignored
+        '''
+        if isinstance(data, int):
+            data = bytes((data & 0xFF,))
+        data = bytes(data)
+        self._device(addr, len(data)).write(memaddr, data)
+
+
+class _Serial:
+
+    def __init__(self):
+        '''!@brief              Sets up the receive and transmit buffers of a simulated serial port
+        '''
+        ## Bytes written by the firmware which the simulation has not taken yet
+        self.tx = bytearray()
+        self._rx = bytearray()
+
+    def feed(self, data):
+        '''!@brief              Adds bytes for the firmware to receive
+            @details            Not in pyb; used by simulations
+            @param              data Bytes or str
+        '''
+        self._rx += data.encode() if isinstance(data, str) else data
+
+    def take(self):
+        '''!@brief              Gets and clears the bytes the firmware has written
+            @details            Not in pyb; used by simulations
+            @returns            The bytes
+        '''
+        data = bytes(self.tx)
+        del self.tx[:]
+        return data
+
+    def any(self):
+        '''!@brief              Gets the number of bytes waiting to be read
+            @returns            Number of bytes
+        '''
+        return len(self._rx)
+
+    def read(self, nbytes = None):
+        '''!@brief              Reads waiting bytes without waiting for more
+            @param              nbytes Most bytes to read, or None for all of them
+            @returns            The bytes, or None if there were none
+        '''
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self._rx)
+        data = bytes(self._rx[:nbytes])
+        del self._rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes = None):
+        '''!@brief              Reads waiting bytes into a buffer
+            @param              buf Buffer to fill
+            @param              nbytes Most bytes to read, or None for the buffer's length
+            @returns            Number of bytes read, or None if there were none
+        '''
+        data = self.read(len(buf) if nbytes is None else nbytes)
+        if data is None:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        '''!@brief              Reads up to and including a newline
+            @returns            The bytes, or None if there were none
+        '''
+        end = self._rx.find(b"\n")
+        return self.read(None if end < 0 else end + 1)
+
+    def write(self, buf):
+        '''!@brief              Sends bytes
+            @param              buf Bytes, bytearray, memoryview, or str
+            @returns            Number of bytes sent
+        '''
+        data = buf.encode() if isinstance(buf, str) else bytes(buf)
+        self.tx += data
+        return len(data)
+
+
+class UART(_Serial):
+
+    def __new__(cls, bus, *args, **kwargs):
+        '''!@brief              Gets the one UART object for a bus, making it the first time
+            @param              bus UART number
+        '''
+        uart = uarts.get(bus)
+        if uart is None:
+            uart = object.__new__(cls)
+            _Serial.__init__(uart)
+            uart.bus = bus
+            uart.baudrate = 9600
+            uart._frame_bits = 10
+            uarts[bus] = uart
+        return uart
+
+    def __init__(self, bus, baudrate = None, **kwargs):
+        '''!@brief              Sets up a UART, see init()
+            @param              bus UART number
+            @param              baudrate Baud rate, or None to leave the UART as it is
+        '''
+        if baudrate is not None:
+            self.init(baudrate, **kwargs)
+
+    def init(self, baudrate, bits = 8, parity = None, stop = 1, **kwargs):
+        '''!@brief              Sets the baud rate and frame format
+            @param              baudrate Baud rate
+            @param              bits Data bits
+            @param              parity None, 0 or 1
+            @param              stop Stop bits
+            @param              kwargs Other settings, ignored
+        '''
+        self.baudrate = baudrate
+        self._frame_bits = 1 + bits + (parity is not None) + stop
+
+    def deinit(self):
+        '''!@brief              Turns the UART off, which does nothing here
+        '''
+        pass
+
+    def write(self, buf):
+        '''!@brief              Sends bytes, taking as long as they would at the baud rate
+            @param              buf Bytes, bytearray, memoryview, or str
+            @returns            Number of bytes sent
+        '''
+        count = _Serial.write(self, buf)
+        clock.advance(count * self._frame_bits * 1_000_000 // self.baudrate)
+        return count
+
+    def writechar(self, char):
+        '''!@brief              Sends one byte
+            @param              char The byte as a number
+        '''
+        self.write(bytes((char & 0xFF,)))
+
+
+_usb = None
+
+
+class USB_VCP(_Serial):
+
+    def __new__(cls, id = 0):
+        '''!@brief              Gets the one USB serial port object
+            @param              id Port number, ignored
+        '''
+        global _usb
+        if _usb is None:
+            _usb = object.__new__(cls)
+            _Serial.__init__(_usb)
+        return _usb
+
+    def __init__(self, id = 0):
+        '''!@brief              Gets the USB serial port
+            @param              id Port number, ignored
+        '''
+        pass
+
+    def isconnected(self):
+        '''!@brief              Checks whether a host is connected, which it always is here
+            @returns            True
+        '''
+        return True
+
+    def setinterrupt(self, char):
+        '''!@brief              Sets the character which interrupts a program, ignored here
+            @param              char Character code, or -1 for none
+        '''
+        pass
+
+
+class LED:
+
+    def __init__(self, num):
+        '''!@brief              Constructs a simulated LED
+            @param              num LED number
+        '''
+        self.num = num
+        self.lit = False
+
+    def on(self):
+        '''!@brief              Turns the LED on
+        '''
+        self.lit = True
+
+    def off(self):
+        '''!@brief              Turns the LED off
+        '''
+        self.lit = False
+
+    def toggle(self):
+        '''!@brief              Changes the LED between on and off
+        '''
+        self.lit = not self.lit
@@ -0,0 +1,483 @@
+'''!@file                       romi.py
+    @brief                      Simulates Romi driving on a line following course
+    @details                    Romi reads the duty cycles the firmware writes to the L6206 motor drivers
+                                from the simulated timer channels and direction pins, turns them into
+                                wheel speeds with a first order motor model, and integrates the
+                                differential drive kinematics with the wheel radius and track width in
+                                Drivetrain.py. Its wheels turn the simulated encoder counters, its six
+                                reflectance channels read the track from a raster image, and its
+                                ultrasonic sensor answers trigger pulses with an echo as long as the
+                                distance to the nearest wall. All of it runs from events on the virtual
+                                clock, so the unmodified firmware tasks can drive it. For example:
+
+                                @code
+                                import hostsim
+                                from hostsim import romi
+
+                                hostsim.reset()
+                                track, walls, start = romi.oval_course()
+                                bot = romi.Romi(track, walls, *start)
+                                qtr_task, drive = romi.make_qtr_task()
+                                task = qtr_task.run()
+                                while hostsim.clock.now_us() < 20_000_000:
+                                    next(task)
+                                    hostsim.clock.advance(30_000)
+                                print(bot.x, bot.y)
+                                @endcode
+
+                                This file runs on the PC only and needs NumPy.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import math
+import random
+import numpy as np
+import Drivetrain
+from hostsim import pyb
+'''!@package              Import math, random, numpy, Drivetrain, and the simulated pyb module
+'''
+
+## Reflectance channel pins, left to right across the robot, as wired in main.py
+QTR_PINS = ("B1", "B0", "C5", "C4", "A5", "A4")
+## Distance of the reflectance channels ahead of the axle, in m
+QTR_FORWARD = .075
+## Distance of each reflectance channel left of the center line, in m
+QTR_LATERAL = (.034, .026, .004, -.004, -.026, -.034)
+## Speed of sound in m/s
+SOUND_SPEED = 343.0
+## Shortest trigger pulse the HC-SR04 answers, in microseconds
+TRIGGER_US = 10
+## Echo length of the HC-SR04 when nothing is in range, in microseconds
+NO_ECHO_US = 38_000
+
+
+class RasterTrack:
+
+    def __init__(self, darkness, resolution, origin = (0.0, 0.0), blur = 0.0):
+        '''!@brief              Constructs a track from an image of how dark each spot of the floor is
+            @param              darkness 2D array, 0 for white floor and 1 for black line; row 0 is
+                                the lowest y and column 0 the lowest x
+            @param              resolution Size of one pixel in m
+            @param              origin x and y in m of the corner of pixel (0, 0)
+            @param              blur Width in m of the spot each reflectance channel sees; the image
+                                is averaged over it once here so every reading is a single lookup
+        '''
+        image = np.asarray(darkness, dtype = np.float32)
+        size = int(round(blur / resolution))
+        if size > 1:
+            image = _box_blur(image, size)
+        self.image = np.ascontiguousarray(image)
+        self.resolution = resolution
+        self.origin = origin
+
+    @classmethod
+    def load(cls, path, resolution, origin = (0.0, 0.0), blur = 0.0, invert = True):
+        '''!@brief              Loads a track from a .npy array or a binary PGM image
+            @param              path File name
+            @param              resolution Size of one pixel in m
+            @param              origin x and y in m of the image's lower left corner
+            @param              blur Width in m of the spot each reflectance channel sees
+            @param              invert True if the image is dark where the line is, as a photo or
+                                drawing of the course is; ignored for .npy files, which hold darkness
+            @returns            The track
+        '''
+        if path.endswith(".npy"):
+            return cls(np.load(path), resolution, origin, blur)
+        with open(path, "rb") as file:
+            data = file.read()
+        fields = []
+        pos = 0
+        while len(fields) < 4:
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":
+                pos = data.index(b"\n", pos)
+                continue
+            end = pos
+            while not data[end:end + 1].isspace():
+                end += 1
+            fields.append(data[pos:end])
+            pos = end
+        if fields[0] != b"P5":
+            raise ValueError("Only binary PGM (P5) images are supported")
+        width, height, maxval = int(fields[1]), int(fields[2]), int(fields[3])
+        dtype = np.uint8 if maxval < 256 else np.dtype(">u2")
+        pixels = np.frombuffer(data, dtype, width * height, pos + 1).reshape(height, width)
+        level = pixels.astype(np.float32) / maxval
+        # Images are stored top row first
+        level = level[::-1]
+        return cls(1.0 - level if invert else level, resolution, origin, blur)
+
+    @classmethod
+    def from_polyline(cls, points, width = .019, resolution = .002, margin = .2, closed = False, blur = .004):
+        '''!@brief              Draws a track of a line of constant width along a list of points
+            @param              points Sequence of (x, y) in m
+            @param              width Width of the line in m, 19 mm for electrical tape
+            @param              resolution Size of one pixel in m
+            @param              margin White floor around the line, in m
+            @param              closed True to join the last point to the first
+            @param              blur Width in m of the spot each reflectance channel sees
+            @returns            The track
+        '''
+        pts = np.asarray(points, dtype = np.float64)
+        if closed:
+            pts = np.vstack((pts, pts[:1]))
+        lo = pts.min(axis = 0) - margin
+        hi = pts.max(axis = 0) + margin
+        nx = int(math.ceil((hi[0] - lo[0]) / resolution))
+        ny = int(math.ceil((hi[1] - lo[1]) / resolution))
+        dist = _segment_distance(pts, (lo[0], lo[1]), resolution, (ny, nx), width)
+        return cls((dist <= width / 2).astype(np.float32), resolution, (lo[0], lo[1]), blur)
+
+    def sample(self, xs, ys):
+        '''!@brief              Looks up the darkness at many points at once, interpolating between pixels
+            @param              xs Array of x in m
+            @param              ys Array of y in m
+            @returns            Array of darkness from 0 to 1; points off the image are white
+        '''
+        res = self.resolution
+        fx = (np.asarray(xs) - self.origin[0]) / res - .5
+        fy = (np.asarray(ys) - self.origin[1]) / res - .5
+        x0 = np.floor(fx).astype(np.intp)
+        y0 = np.floor(fy).astype(np.intp)
+        tx = fx - x0
+        ty = fy - y0
+        h, w = self.image.shape
+        out = np.zeros(np.shape(fx), dtype = np.float64)
+        for dy, wy in ((0, 1 - ty), (1, ty)):
+            for dx, wx in ((0, 1 - tx), (1, tx)):
+                xi = x0 + dx
+                yi = y0 + dy
+                inside = (xi >= 0) & (xi < w) & (yi >= 0) & (yi < h)
+                vals = self.image[np.clip(yi, 0, h - 1), np.clip(xi, 0, w - 1)]
+                out += np.where(inside, vals, 0.0) * wx * wy
+        return out
+
+
+def _box_blur(image, size):
+    '''!@brief              Averages an image over a square of pixels, with summed area tables
+        @param              image 2D float array
+        @param              size Side of the square in pixels
+        @returns            The blurred image, the same shape
+    '''
+    lo = size // 2
+    hi = size - lo
+    padded = np.pad(image, ((lo, hi), (lo, hi)), mode = "constant")
+    table = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype = np.float64)
+    table[1:, 1:] = padded.cumsum(axis = 0).cumsum(axis = 1)
+    h, w = image.shape
+    total = (table[size:size + h, size:size + w] - table[:h, size:size + w]
+             - table[size:size + h, :w] + table[:h, :w])
+    return (total / (size * size)).astype(np.float32)
+
+
+def _segment_distance(pts, origin, resolution, shape, reach):
+    '''!@brief              Finds the distance from the pixels of a grid to a polyline
+        @details            Each segment only looks at the pixels in its own bounding box grown by
+                            reach, so drawing a long line costs about as much as its length
+        @param              pts Array of the polyline's points, shape (n, 2)
+        @param              origin x and y in m of the corner of pixel (0, 0)
+        @param              resolution Size of one pixel in m
+        @param              shape Rows and columns of the grid
+        @param              reach Farthest distance in m that must be right; pixels farther from
+                            every segment are left at infinity
+        @returns            Array of distances in m
+    '''
+    best = np.full(shape, np.inf)
+    for (ax, ay), (bx, by) in zip(pts[:-1], pts[1:]):
+        c0 = max(int((min(ax, bx) - reach - origin[0]) / resolution), 0)
+        c1 = min(int((max(ax, bx) + reach - origin[0]) / resolution) + 2, shape[1])
+        r0 = max(int((min(ay, by) - reach - origin[1]) / resolution), 0)
+        r1 = min(int((max(ay, by) + reach - origin[1]) / resolution) + 2, shape[0])
+        if c0 >= c1 or r0 >= r1:
+            continue
+        px = origin[0] + (np.arange(c0, c1) + .5) * resolution
+        py = origin[1] + (np.arange(r0, r1) + .5)[:, None] * resolution
+        ex = bx - ax
+        ey = by - ay
+        length2 = ex * ex + ey * ey
+        if length2 == 0:
+            t = 0.0
+        else:
+            t = np.clip(((px - ax) * ex + (py - ay) * ey) / length2, 0.0, 1.0)
+        window = best[r0:r1, c0:c1]
+        np.minimum(window, np.hypot(px - ax - t * ex, py - ay - t * ey), out = window)
+    return best
+
+
+def ray_range(walls, x, y, heading, max_range = 4.0):
+    '''!@brief              Finds how far a ray goes before it hits a wall
+        @param              walls Array of wall segments, shape (n, 4) as x0, y0, x1, y1 in m
+        @param              x Ray start x in m
+        @param              y Ray start y in m
+        @param              heading Ray direction in rad from the x axis
+        @param              max_range Longest distance to look, in m
+        @returns            Distance in m, or max_range if nothing is hit
+    '''
+    if len(walls) == 0:
+        return max_range
+    dx = math.cos(heading)
+    dy = math.sin(heading)
+    ax = walls[:, 0] - x
+    ay = walls[:, 1] - y
+    ex = walls[:, 2] - walls[:, 0]
+    ey = walls[:, 3] - walls[:, 1]
+    denom = dx * ey - dy * ex
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        t = (ax * ey - ay * ex) / denom
+        u = (ax * dy - ay * dx) / denom
+    hit = (denom != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+    if not hit.any():
+        return max_range
+    return min(float(t[hit].min()), max_range)
+
+
+def oval_course(straight = 1.0, radius = .3, wall = True, resolution = .002):
+    '''!@brief              Makes a simple oval line course, with a wall box across the far straight
+        @param              straight Length of each straight in m
+        @param              radius Radius of each end in m
+        @param              wall True to put a box on the line for the robot to find
+        @param              resolution Size of one pixel in m
+        @returns            Tuple of the track, the wall segments, and the start pose (x, y, heading)
+    '''
+    pts = []
+    half = straight / 2
+    for k in range(41):
+        a = -math.pi / 2 + math.pi * k / 40
+        pts.append((half + radius * math.cos(a), radius * math.sin(a)))
+    for k in range(41):
+        a = math.pi / 2 + math.pi * k / 40
+        pts.append((-half + radius * math.cos(a), radius * math.sin(a)))
+    track = RasterTrack.from_polyline(pts, resolution = resolution, closed = True)
+
+    walls = np.zeros((0, 4))
+    if wall:
+        # A 10 cm box centered on the far straight
+        cx, cy, s = 0.0, radius, .05
+        walls = np.array([(cx - s, cy - s, cx + s, cy - s), (cx + s, cy - s, cx + s, cy + s),
+                          (cx + s, cy + s, cx - s, cy + s), (cx - s, cy + s, cx - s, cy - s)])
+    return track, walls, (-half / 2, -radius, 0.0)
+
+
+class Romi:
+
+    def __init__(self, track, walls = (), x = 0.0, y = 0.0, heading = 0.0, dt_us = 1000, seed = 0,
+                 max_speed = 15.0, deadband = 5.0, gains = (1.0, 1.0), tau = .05, cpr = 16384,
+                 r = Drivetrain.R_WHEEL, L = Drivetrain.TRACK, white = 300, black = 3000, noise = 20,
+                 motors = (("A8", 4, 1), ("C2", 4, 2)), encoders = (3, 8), qtr_pins = QTR_PINS,
+                 sonar = ("A6", "A7"), record_every = 10):
+        '''!@brief              Constructs a simulated Romi and connects it to the simulated hardware
+            @details            Call hostsim.reset() first to start from a clean clock and board.
+                                The robot starts moving with the clock at once, whether the firmware
+                                objects are made before or after it.
+            @param              track RasterTrack of the floor
+            @param              walls Wall segments as an array of (x0, y0, x1, y1) in m, or None to
+                                ask the track, as a CompiledTrack can answer range queries itself
+            @param              x Start x of the axle center in m
+            @param              y Start y of the axle center in m
+            @param              heading Start heading in rad from the x axis
+            @param              dt_us Simulation step in microseconds
+            @param              seed Seed for the sensor noise
+            @param              max_speed Wheel speed in rad/s at 100 % duty
+            @param              deadband Duty cycle in % below which the wheels do not turn
+            @param              gains Speed of the left and right motors relative to max_speed, to
+                                model the mismatch the duty offsets in main.py make up for
+            @param              tau Time constant of the motors in s
+            @param              cpr Encoder counts per wheel revolution, as given to Encoder
+            @param              r Wheel radius in m
+            @param              L Track width in m
+            @param              white ADC reading of white floor
+            @param              black ADC reading of black line
+            @param              noise Standard deviation of the ADC noise
+            @param              motors Direction pin, timer, and channel of the left then right motor
+            @param              encoders Timer numbers of the left then right encoder
+            @param              qtr_pins Pins of the reflectance channels, left to right
+            @param              sonar Trigger and echo pins of the ultrasonic sensor
+            @param              record_every Store the pose in path every this many steps, or 0 not to
+        '''
+        self.track = track
+        self.walls = None if walls is None else np.asarray(walls, dtype = np.float64).reshape(-1, 4)
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.dt_us = dt_us
+        self.max_speed = max_speed
+        self.deadband = deadband
+        self.gains = gains
+        self.alpha = 1 - math.exp(-dt_us / 1e6 / tau)
+        self.r = r
+        self.L = L
+        self.counts_per_rad = cpr / (2 * math.pi)
+        self.white = white
+        self.black = black
+        self.noise = noise
+        self.record_every = record_every
+
+        ## Wheel speeds in rad/s, left then right
+        self.omega = [0.0, 0.0]
+        ## Distance travelled by the axle center in m
+        self.distance = 0.0
+        ## Poses (time in us, x, y, heading) stored while driving
+        self.path = []
+        self.steps = 0
+        self._frac = [0.0, 0.0]
+        self._rng = random.Random(seed)
+        self._dirty = True
+        self._levels = np.zeros(len(qtr_pins))
+        self._fwd = np.full(len(qtr_pins), QTR_FORWARD)
+        self._lat = np.asarray(QTR_LATERAL[:len(qtr_pins)], dtype = np.float64)
+
+        self._dir_pins = tuple(pyb.Pin(name) for name, tim, ch in motors)
+        self._pwm = tuple((tim, ch) for name, tim, ch in motors)
+        self._enc = tuple(pyb.Timer(num) for num in encoders)
+        for idx, name in enumerate(qtr_pins):
+            pyb.ADC(pyb.Pin(name)).source = self._reader(idx)
+
+        self._trigger = pyb.Pin(sonar[0])
+        self._echo = pyb.Pin(sonar[1])
+        self._echo_busy = False
+        self._trigger.watch(self._on_trigger)
+
+        self._clock = pyb.clock
+        self._clock.call_after(dt_us, self._step)
+
+    def duty(self, idx):
+        '''!@brief              Gets the duty cycle the firmware has set for one motor
+            @param              idx 0 for the left motor, 1 for the right
+            @returns            Signed duty cycle in %, negative when the direction pin is high
+        '''
+        tim = pyb.timers.get(self._pwm[idx][0])
+        ch = None if tim is None else tim.channel(self._pwm[idx][1])
+        if ch is None:
+            return 0.0
+        width = ch.pulse_width_percent()
+        return -width if self._dir_pins[idx].value() else width
+
+    def _step(self, arg):
+        '''!@brief              Moves the robot forward one step and turns the encoders
+            @param              arg Unused
+        '''
+        self._clock.call_after(self.dt_us, self._step)
+        dt = self.dt_us / 1e6
+        for idx in range(2):
+            duty = self.duty(idx)
+            size = abs(duty)
+            if size <= self.deadband:
+                target = 0.0
+            else:
+                target = math.copysign(self.max_speed * self.gains[idx]
+                                       * (min(size, 100) - self.deadband) / (100 - self.deadband), duty)
+            self.omega[idx] += (target - self.omega[idx]) * self.alpha
+
+            counts = self.omega[idx] * dt * self.counts_per_rad + self._frac[idx]
+            whole = math.floor(counts)
+            self._frac[idx] = counts - whole
+            if whole:
+                self._enc[idx].add_counts(whole)
+
+        v = self.r * (self.omega[0] + self.omega[1]) / 2
+        w = self.r * (self.omega[1] - self.omega[0]) / self.L
+        mid = self.heading + w * dt / 2
+        self.x += v * math.cos(mid) * dt
+        self.y += v * math.sin(mid) * dt
+        self.heading += w * dt
+        self.distance += abs(v) * dt
+        self._dirty = True
+
+        self.steps += 1
+        if self.record_every and self.steps % self.record_every == 0:
+            self.path.append((self._clock.now_us(), self.x, self.y, self.heading))
+
+    def qtr_levels(self):
+        '''!@brief              Finds the noiseless ADC reading of every reflectance channel
+            @details            Worked out for all channels at once, and only once per step
+            @returns            Array of readings, left to right
+        '''
+        if self._dirty:
+            c = math.cos(self.heading)
+            s = math.sin(self.heading)
+            xs = self.x + self._fwd * c - self._lat * s
+            ys = self.y + self._fwd * s + self._lat * c
+            dark = self.track.sample(xs, ys)
+            self._levels = self.white + (self.black - self.white) * dark
+            self._dirty = False
+        return self._levels
+
+    def _reader(self, idx):
+        '''!@brief              Makes the function an ADC calls for each reading of one channel
+            @param              idx Index of the channel, left to right
+            @returns            Function with no arguments giving a noisy reading
+        '''
+        def read():
+            return self.qtr_levels()[idx] + self._rng.gauss(0.0, self.noise)
+        return read
+
+    def range_m(self):
+        '''!@brief              Finds the distance from the ultrasonic sensor to the wall ahead
+            @returns            Distance in m, 4 m if nothing is closer
+        '''
+        c = math.cos(self.heading)
+        s = math.sin(self.heading)
+        x = self.x + QTR_FORWARD * c
+        y = self.y + QTR_FORWARD * s
+        if self.walls is None:
+            return self.track.range(x, y, self.heading)
+        return ray_range(self.walls, x, y, self.heading)
+
+    def _on_trigger(self, pin):
+        '''!@brief              Watches the trigger pin for the start of a pulse
+            @param              pin The trigger pin
+        '''
+        if pin.value() and not self._echo_busy:
+            self._clock.call_after(TRIGGER_US, self._start_ranging)
+
+    def _start_ranging(self, arg):
+        '''!@brief              Starts an echo once the trigger has been high for 10 us
+            @details            The blocking HCSR04.distance_cm() leaves the trigger high while it
+                                waits, so ranging does not wait for the falling edge
+            @param              arg Unused
+        '''
+        if not self._trigger.value() or self._echo_busy:
+            return
+        dist = self.range_m()
+        width = NO_ECHO_US if dist >= 4.0 else int(2 * dist / SOUND_SPEED * 1e6)
+        self._echo_busy = True
+        # The burst takes about 460 us before the echo line rises
+        self._clock.call_after(460, self._echo_edge, 1)
+        self._clock.call_after(460 + max(width, 1), self._echo_edge, 0)
+
+    def _echo_edge(self, level):
+        '''!@brief              Drives the echo pin
+            @param              level New level
+        '''
+        self._echo.drive(level)
+        if not level:
+            self._echo_busy = False
+
+
+def make_qtr_task(offsets = (15, 8), continuous = False, log = None, **kwargs):
+    '''!@brief              Makes the line following task and its hardware the way main.py does
+        @param              offsets Duty offsets of the left and right wheels
+        @param              continuous Passed to QTR_Task
+        @param              log Logger, or None
+        @param              kwargs Other arguments for QTR_Task
+        @returns            Tuple of the QTR_Task and its Drivetrain
+    '''
+    import L6206
+    import HCSR04
+    import QTRSensorArray
+    import QTR_Task
+    Pin = pyb.Pin
+    tim_4 = pyb.Timer(4, freq = 20_000)
+    mot_A = L6206.L6206(tim_4, Pin.cpu.B6, Pin.cpu.A8, Pin.cpu.A9, 1)
+    mot_B = L6206.L6206(tim_4, Pin.cpu.B7, Pin.cpu.C2, Pin.cpu.C3, 2)
+    mot_A.enable()
+    mot_B.enable()
+    drive = Drivetrain.Drivetrain(mot_A, mot_B, offset_L = offsets[0], offset_R = offsets[1])
+    adcs = tuple(pyb.ADC(Pin(Pin(name), mode = Pin.ANALOG)) for name in QTR_PINS)
+    qtr = QTRSensorArray.QTRSensorArray(adcs, samples = 8)
+    hcr = HCSR04.HCSR04(Pin(Pin.cpu.A6, mode = Pin.OUT_PP), Pin(Pin.cpu.A7, mode = Pin.IN))
+    hcr.enable_async()
+    return QTR_Task.QTR_Task(qtr, drive, hcr, continuous = continuous, log = log, **kwargs), drive
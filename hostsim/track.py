@@ -0,0 +1,345 @@
+'''!@file                       track.py
+    @brief                      Course maps for the simulated Romi, compiled for constant time sensor queries
+    @details                    A TrackMap describes a course the way it is laid out on the floor: the
+                                center line of the tape as a list of points, the walls as segments, the
+                                start box and the finish line. It is kept as a small JSON file, e.g.
+
+                                @code
+                                {"line": [[0, 0], [1, 0], [1, 1]], "closed": false, "line_width": 0.019,
+                                 "walls": [[0.4, 0.9, 0.6, 0.9]],
+                                 "start": [0, 0, 0], "start_size": [0.2, 0.15],
+                                 "finish": [1.1, 0.9, 0.9, 0.9]}
+                                @endcode
+
+                                compile() turns a map into two grids saved as .npy files next to it. The
+                                first holds the distance from every point of the floor to the center of
+                                the line, which gives both what a reflectance channel sees and how far the
+                                robot is off the line. The second is the obstacle index: for every 1 cm
+                                cell and every 5 degrees of heading, the distance the ultrasonic sensor's
+                                cone would measure to the nearest wall. CompiledTrack opens both memory
+                                mapped, so every reading is one array lookup whatever the size of the
+                                course, and many processes share one copy of the grids. A compiled track
+                                is used by Romi in place of a RasterTrack:
+
+                                @code
+                                import hostsim
+                                from hostsim import romi, track
+
+                                hostsim.reset()
+                                course = track.open_map("oval.json")
+                                bot = romi.Romi(course, None, *course.start)
+                                @endcode
+
+                                This file runs on the PC only and needs NumPy.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import json
+import math
+import os
+import numpy as np
+'''!@package              Import json, math, os, and numpy
+'''
+
+## Version of the compiled files; files of another version are compiled again
+VERSION = 1
+## Width of 3/4 in electrical tape in m
+TAPE_WIDTH = .019
+## Farthest distance the ultrasonic sensor reports, in m
+MAX_RANGE = 4.0
+## Full width of the ultrasonic sensor's beam in rad
+CONE = math.radians(15)
+
+
+class TrackMap:
+
+    def __init__(self, line, walls = (), start = (0.0, 0.0, 0.0), start_size = (.2, .15),
+                 finish = None, closed = True, line_width = TAPE_WIDTH):
+        '''!@brief              Constructs a course map
+            @param              line Points (x, y) in m along the center of the tape
+            @param              walls Wall segments (x0, y0, x1, y1) in m
+            @param              start Start pose (x, y, heading) of the robot's axle center
+            @param              start_size Length along the start heading and width of the start box in m
+            @param              finish Finish line segment (x0, y0, x1, y1), crossed forward from its right
+                                side to its left, or None if the course has none
+            @param              closed True if the line joins its last point to its first
+            @param              line_width Width of the tape in m
+        '''
+        self.line = [tuple(map(float, p)) for p in line]
+        self.walls = [tuple(map(float, w)) for w in walls]
+        self.start = tuple(map(float, start))
+        self.start_size = tuple(map(float, start_size))
+        self.finish = None if finish is None else tuple(map(float, finish))
+        self.closed = closed
+        self.line_width = float(line_width)
+
+    @classmethod
+    def load(cls, path):
+        '''!@brief              Reads a map from a JSON file
+            @param              path File name
+            @returns            The map
+        '''
+        with open(path) as file:
+            return cls(**json.load(file))
+
+    def save(self, path):
+        '''!@brief              Writes the map to a JSON file
+            @param              path File name
+        '''
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent = 1)
+
+    def to_dict(self):
+        '''!@brief              Gets the map as a dictionary of the JSON fields
+            @returns            The dictionary
+        '''
+        return {"line": self.line, "walls": self.walls, "start": self.start,
+                "start_size": self.start_size, "finish": self.finish, "closed": self.closed,
+                "line_width": self.line_width}
+
+    def bounds(self, margin):
+        '''!@brief              Gets the rectangle holding the whole course
+            @param              margin Floor to add around everything, in m
+            @returns            Tuple of the lowest x and y and the highest x and y
+        '''
+        xs = [p[0] for p in self.line] + [self.start[0]]
+        ys = [p[1] for p in self.line] + [self.start[1]]
+        for wall in self.walls:
+            xs += [wall[0], wall[2]]
+            ys += [wall[1], wall[3]]
+        return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+    def compile(self, prefix, resolution = .002, margin = .3, max_dist = .5, cell = .01,
+                headings = 72, cone = CONE):
+        '''!@brief              Builds the distance field and obstacle index and saves them
+            @details            Writes prefix.dist.npy, prefix.range.npy and prefix.grid.json
+            @param              prefix File name without extension
+            @param              resolution Pixel size of the distance field in m
+            @param              margin Floor to add around the course, in m
+            @param              max_dist Distances from the line are stored up to this, in m
+            @param              cell Cell size of the obstacle index in m
+            @param              headings Number of headings in the obstacle index
+            @param              cone Full width of the ultrasonic beam in rad
+            @returns            The CompiledTrack
+        '''
+        x0, y0, x1, y1 = self.bounds(margin)
+        pts = np.asarray(self.line, dtype = np.float64)
+        if self.closed:
+            pts = np.vstack((pts, pts[:1]))
+
+        shape = (int(math.ceil((y1 - y0) / resolution)), int(math.ceil((x1 - x0) / resolution)))
+        dist = np.full(shape, max_dist, dtype = np.float32)
+        ys = y0 + (np.arange(shape[0]) + .5) * resolution
+        xs = x0 + (np.arange(shape[1]) + .5) * resolution
+        # A band of rows at a time keeps the temporary arrays small
+        for r0 in range(0, shape[0], 64):
+            px = xs[None, :]
+            py = ys[r0:r0 + 64, None]
+            band = dist[r0:r0 + 64]
+            for (ax, ay), (bx, by) in zip(pts[:-1], pts[1:]):
+                ex = bx - ax
+                ey = by - ay
+                length2 = ex * ex + ey * ey
+                t = 0.0 if length2 == 0 else np.clip(((px - ax) * ex + (py - ay) * ey) / length2, 0, 1)
+                np.minimum(band, np.hypot(px - ax - t * ex, py - ay - t * ey), out = band)
+        np.save(prefix + ".dist.npy", dist)
+
+        walls = np.asarray(self.walls, dtype = np.float64).reshape(-1, 4)
+        rows = int(math.ceil((y1 - y0) / cell))
+        cols = int(math.ceil((x1 - x0) / cell))
+        cx = x0 + (np.arange(cols) + .5) * cell
+        cy = y0 + (np.arange(rows) + .5) * cell
+        gx, gy = np.meshgrid(cx, cy)
+        step = 2 * math.pi / headings
+        spread = max(int(cone / 2 / step), 0)
+        ray = np.empty((headings, rows, cols), dtype = np.float32)
+        for h in range(headings):
+            ray[h] = ray_ranges(walls, gx, gy, h * step)
+        # The sensor reports the nearest thing anywhere in its beam
+        ranges = ray.copy()
+        for k in range(1, spread + 1):
+            np.minimum(ranges, np.roll(ray, k, axis = 0), out = ranges)
+            np.minimum(ranges, np.roll(ray, -k, axis = 0), out = ranges)
+        np.save(prefix + ".range.npy", ranges)
+
+        grid = {"version": VERSION, "map": self.to_dict(), "origin": [x0, y0],
+                "resolution": resolution, "max_dist": max_dist, "cell": cell, "headings": headings}
+        with open(prefix + ".grid.json", "w") as file:
+            json.dump(grid, file)
+        return CompiledTrack(prefix)
+
+    @classmethod
+    def oval(cls, straight = 1.0, radius = .3, wall = True):
+        '''!@brief              Makes a simple oval course, with a box on the far straight
+            @param              straight Length of each straight in m
+            @param              radius Radius of each end in m
+            @param              wall True to put a 10 cm box on the line for the robot to find
+            @returns            The map
+        '''
+        half = straight / 2
+        line = []
+        for k in range(40):
+            a = -math.pi / 2 + math.pi * k / 40
+            line.append((half + radius * math.cos(a), radius * math.sin(a)))
+        for k in range(40):
+            a = math.pi / 2 + math.pi * k / 40
+            line.append((-half + radius * math.cos(a), radius * math.sin(a)))
+        walls = []
+        if wall:
+            s = .05
+            walls = [(-s, radius - s, s, radius - s), (s, radius - s, s, radius + s),
+                     (s, radius + s, -s, radius + s), (-s, radius + s, -s, radius - s)]
+        start = (-half / 2, -radius, 0.0)
+        # Across the near straight just behind the start, so a lap ends back at the start box
+        finish = (-half / 2 - .1, -radius + .1, -half / 2 - .1, -radius - .1)
+        return cls(line, walls, start, finish = finish)
+
+
+def ray_ranges(walls, xs, ys, heading, max_range = MAX_RANGE):
+    '''!@brief              Finds how far rays from many points go before hitting a wall
+        @param              walls Array of wall segments, shape (n, 4) as x0, y0, x1, y1 in m
+        @param              xs Array of ray start x in m
+        @param              ys Array of ray start y in m, the same shape
+        @param              heading Direction of every ray in rad from the x axis
+        @param              max_range Longest distance to look, in m
+        @returns            Array of distances in m, max_range where nothing is hit
+    '''
+    dx = math.cos(heading)
+    dy = math.sin(heading)
+    best = np.full(np.shape(xs), max_range)
+    for wx0, wy0, wx1, wy1 in walls:
+        ex = wx1 - wx0
+        ey = wy1 - wy0
+        denom = dx * ey - dy * ex
+        if denom == 0:
+            continue
+        ax = wx0 - xs
+        ay = wy0 - ys
+        t = (ax * ey - ay * ex) / denom
+        u = (ax * dy - ay * dx) / denom
+        hit = (t >= 0) & (u >= 0) & (u <= 1)
+        np.minimum(best, np.where(hit, t, max_range), out = best)
+    return best
+
+
+class CompiledTrack:
+
+    def __init__(self, prefix):
+        '''!@brief              Opens a compiled course
+            @param              prefix File name given to TrackMap.compile(), without extension
+        '''
+        with open(prefix + ".grid.json") as file:
+            grid = json.load(file)
+        ## The TrackMap the grids were made from
+        self.map = TrackMap(**grid["map"])
+        self.dist = np.load(prefix + ".dist.npy", mmap_mode = "r")
+        self.ranges = np.load(prefix + ".range.npy", mmap_mode = "r")
+        self.origin = tuple(grid["origin"])
+        self.resolution = grid["resolution"]
+        self.max_dist = grid["max_dist"]
+        self.cell = grid["cell"]
+        self.headings = grid["headings"]
+        self.start = self.map.start
+        self.half_width = self.map.line_width / 2
+        ## Width in m over which a reflectance channel goes from white to black at the tape's edge
+        self.spot = .004
+
+    def line_distance(self, x, y):
+        '''!@brief              Gets how far a point is from the center of the line
+            @param              x x in m
+            @param              y y in m
+            @returns            Distance in m, at most the max_dist the track was compiled with
+        '''
+        col = int((x - self.origin[0]) / self.resolution)
+        row = int((y - self.origin[1]) / self.resolution)
+        h, w = self.dist.shape
+        if 0 <= row < h and 0 <= col < w:
+            return float(self.dist[row, col])
+        return self.max_dist
+
+    def sample(self, xs, ys):
+        '''!@brief              Looks up the darkness at many points at once, as RasterTrack.sample()
+            @param              xs Array of x in m
+            @param              ys Array of y in m
+            @returns            Array of darkness from 0 to 1; points off the grid are white
+        '''
+        cols = ((np.asarray(xs) - self.origin[0]) / self.resolution).astype(np.intp)
+        rows = ((np.asarray(ys) - self.origin[1]) / self.resolution).astype(np.intp)
+        h, w = self.dist.shape
+        inside = (rows >= 0) & (rows < h) & (cols >= 0) & (cols < w)
+        dist = np.where(inside, self.dist[np.clip(rows, 0, h - 1), np.clip(cols, 0, w - 1)], self.max_dist)
+        return np.clip((self.half_width - dist) / self.spot + .5, 0.0, 1.0)
+
+    def range(self, x, y, heading):
+        '''!@brief              Gets the distance the ultrasonic sensor would measure
+            @param              x Sensor x in m
+            @param              y Sensor y in m
+            @param              heading Direction the sensor faces, in rad from the x axis
+            @returns            Distance in m, MAX_RANGE if nothing is in range
+        '''
+        col = int((x - self.origin[0]) / self.cell)
+        row = int((y - self.origin[1]) / self.cell)
+        _, h, w = self.ranges.shape
+        if not (0 <= row < h and 0 <= col < w):
+            return MAX_RANGE
+        idx = int(round(heading * self.headings / (2 * math.pi))) % self.headings
+        return float(self.ranges[idx, row, col])
+
+    def in_start(self, x, y):
+        '''!@brief              Checks whether a point is inside the start box
+            @param              x x in m
+            @param              y y in m
+            @returns            True if it is
+        '''
+        sx, sy, heading = self.start
+        dx = x - sx
+        dy = y - sy
+        along = dx * math.cos(heading) + dy * math.sin(heading)
+        across = -dx * math.sin(heading) + dy * math.cos(heading)
+        length, width = self.map.start_size
+        return abs(along) <= length / 2 and abs(across) <= width / 2
+
+    def crossed_finish(self, x0, y0, x1, y1):
+        '''!@brief              Checks whether a move crossed the finish line
+            @param              x0 x at the start of the move in m
+            @param              y0 y at the start of the move in m
+            @param              x1 x at the end of the move in m
+            @param              y1 y at the end of the move in m
+            @returns            1 if it crossed forward, -1 if backward, and 0 if it did not cross
+        '''
+        finish = self.map.finish
+        if finish is None:
+            return 0
+        fx0, fy0, fx1, fy1 = finish
+        ex = fx1 - fx0
+        ey = fy1 - fy0
+        side0 = ex * (y0 - fy0) - ey * (x0 - fx0)
+        side1 = ex * (y1 - fy0) - ey * (x1 - fx0)
+        if (side0 > 0) == (side1 > 0):
+            return 0
+        mx = x1 - x0
+        my = y1 - y0
+        end0 = mx * (fy0 - y0) - my * (fx0 - x0)
+        end1 = mx * (fy1 - y0) - my * (fx1 - x0)
+        if (end0 > 0) == (end1 > 0):
+            return 0
+        return 1 if side1 > 0 else -1
+
+
+def open_map(path, **kwargs):
+    '''!@brief              Opens a course map, compiling it first if it has changed since it was last compiled
+        @param              path Name of the map's JSON file
+        @param              kwargs Arguments for TrackMap.compile()
+        @returns            The CompiledTrack
+    '''
+    prefix = os.path.splitext(path)[0]
+    files = [prefix + ext for ext in (".dist.npy", ".range.npy", ".grid.json")]
+    if all(os.path.exists(f) for f in files):
+        newest = os.path.getmtime(path)
+        if all(os.path.getmtime(f) >= newest for f in files):
+            with open(prefix + ".grid.json") as file:
+                if json.load(file).get("version") == VERSION:
+                    return CompiledTrack(prefix)
+    return TrackMap.load(path).compile(prefix, **kwargs)
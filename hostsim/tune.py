@@ -0,0 +1,327 @@
+'''!@file                       tune.py
+    @brief                      Searches for line follower gains and speeds with the simulated Romi
+    @details                    Each trial builds the firmware's QTR_Task, LineFollowerPID and
+                                Drivetrain exactly as main.py does, with one set of gains, speeds and
+                                duty offsets, and lets the unmodified task drive a simulated Romi around
+                                a compiled course until it finishes a lap or runs out of time. Trials
+                                are scored by lap time plus a penalty for the mean distance from the
+                                line, and run across a pool of processes, one per core by default.
+                                The compiled course is memory mapped, so every process shares one copy.
+
+                                Two searches are offered. Random search samples every parameter
+                                uniformly between its bounds. The cross-entropy method starts from a
+                                normal distribution around the hand tuned values, and after each
+                                generation fits the distribution again to its best trials, which
+                                homes in on good settings with far fewer trials. From the command line:
+
+                                @code
+                                python -m hostsim.tune --method cem --generations 10 --population 200
+                                python -m hostsim.tune --course course.json --method random -n 3000
+                                @endcode
+
+                                On the oval course, the hand tuned values finish a lap in about 74 s
+                                of virtual time with a mean distance from the line of 1.6 cm, a score
+                                of about 75, of which over 8 s go to driving around the wall. A trial
+                                which does not finish scores over 900, so any finished lap beats it.
+                                Keep the time limit well above the hand tuned lap time: with a limit
+                                under 74 s even the hand tuned values do not finish, and with scores
+                                all near DNF_SCORE the search has little to go on.
+
+                                The results are saved to tune_results.json, which is kept out of git.
+
+                                This file runs on the PC only and needs NumPy.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+import hostsim
+from hostsim import romi, track
+'''!@package              Import argparse, json, multiprocessing, os, tempfile, time, numpy, hostsim, romi, and track
+'''
+
+## Parameters searched, as name: (lowest, highest, hand tuned value)
+SPACE = {"Kp": (0.0, 5.0, 1.25),
+         "Ki": (0.0, 1.0, 0.2),
+         "Kd": (0.0, 0.2, 0.01),
+         "V": (.05, .3, .1),
+         "target_w": (.5, 6.0, 2.0),
+         "offset_L": (5.0, 40.0, 15.0),
+         "offset_R": (5.0, 40.0, 8.0)}
+## Period of QTR_Task in main.py, in microseconds
+TASK_PERIOD_US = 30_000
+## Score added per meter of mean distance from the line; 100 makes 1 cm cost as much as 1 s
+XTE_WEIGHT = 100.0
+## Score of a trial which does not finish, less 10 per meter it drove on the line
+DNF_SCORE = 1000.0
+
+# The course and robot model of this process, set by _init()
+_course = None
+_model = {}
+
+
+def default_course():
+    '''!@brief              Gets the oval course, writing its map to the temporary folder the first time
+        @returns            File name of the map
+    '''
+    path = os.path.join(tempfile.gettempdir(), "hostsim_oval.json")
+    if not os.path.exists(path):
+        track.TrackMap.oval().save(path)
+    return path
+
+
+def evaluate(params, course, time_limit = 120.0, seed = 0, model = None):
+    '''!@brief              Runs one trial of the line follower on a course
+        @param              params Dictionary of values for some or all of the names in SPACE; the
+                            rest keep their hand tuned values
+        @param              course CompiledTrack to drive on
+        @param              time_limit Longest virtual time to drive for, in s; the hand tuned
+                            values take about 74 s for a lap of the oval
+        @param              seed Seed for the sensor noise, the same for every trial by default so
+                            trials are compared on equal terms
+        @param              model Other arguments for Romi, such as motor gains or dt_us
+        @returns            Dictionary of the parameters, finished, lap_time in s, xte_mean and
+                            xte_max in m, on_line in m, and score, lower being better
+    '''
+    values = {name: float(params.get(name, spec[2])) for name, spec in SPACE.items()}
+    hostsim.reset()
+    bot = romi.Romi(course, None, *course.start, seed = seed, record_every = 0, **(model or {}))
+    task, drive = romi.make_qtr_task(offsets = (values["offset_L"], values["offset_R"]),
+                                     Kp = values["Kp"], Ki = values["Ki"], Kd = values["Kd"],
+                                     V = values["V"], target_w = values["target_w"])
+    gen = task.run()
+
+    clock = hostsim.clock
+    end_us = int(time_limit * 1e6)
+    limit = course.max_dist
+    tolerance = 2 * course.map.line_width
+    # A lap only counts once the robot has left the start box
+    left_start = False
+    lap_time = None
+    xte_sum = 0.0
+    xte_max = 0.0
+    on_line = 0.0
+    samples = 0
+    lost_us = 0
+    x, y, dist = bot.x, bot.y, bot.distance
+    while clock.now_us() < end_us:
+        next(gen)
+        clock.advance(TASK_PERIOD_US - clock.now_us() % TASK_PERIOD_US)
+
+        xte = course.line_distance(bot.x, bot.y)
+        xte_sum += xte
+        xte_max = max(xte_max, xte)
+        samples += 1
+        if xte <= tolerance:
+            on_line += bot.distance - dist
+        if not left_start:
+            left_start = not course.in_start(bot.x, bot.y)
+        elif course.crossed_finish(x, y, bot.x, bot.y) > 0:
+            lap_time = clock.now_us() / 1e6
+            break
+        # Give up on a robot which has been far from the line for 5 s
+        lost_us = lost_us + TASK_PERIOD_US if xte >= limit else 0
+        if lost_us >= 5_000_000:
+            break
+        x, y, dist = bot.x, bot.y, bot.distance
+
+    xte_mean = xte_sum / max(samples, 1)
+    if lap_time is None:
+        score = DNF_SCORE - 10 * on_line + XTE_WEIGHT * xte_mean
+    else:
+        score = lap_time + XTE_WEIGHT * xte_mean
+    return {"params": values, "finished": lap_time is not None, "lap_time": lap_time,
+            "xte_mean": xte_mean, "xte_max": xte_max, "on_line": on_line, "score": score}
+
+
+def _init(course_path, time_limit, seed, model):
+    '''!@brief              Sets up a worker process with its course and robot model
+        @param              course_path File name of the course map, already compiled
+        @param              time_limit Longest virtual time of a trial, in s
+        @param              seed Seed for the sensor noise
+        @param              model Other arguments for Romi
+    '''
+    global _course, _model
+    hostsim.install()
+    _course = track.open_map(course_path)
+    _model = {"time_limit": time_limit, "seed": seed, "model": model}
+
+
+def _run(params):
+    '''!@brief              Runs one trial in a worker process
+        @param              params Dictionary of parameter values
+        @returns            The result from evaluate()
+    '''
+    return evaluate(params, _course, **_model)
+
+
+def sample_uniform(rng, n, names = None):
+    '''!@brief              Draws parameter sets uniformly between the bounds in SPACE
+        @param              rng NumPy random Generator
+        @param              n Number of sets
+        @param              names Names of the parameters to vary, or None for all of them
+        @returns            List of dictionaries
+    '''
+    names = list(SPACE) if names is None else names
+    lo = np.array([SPACE[k][0] for k in names])
+    hi = np.array([SPACE[k][1] for k in names])
+    draws = rng.uniform(lo, hi, (n, len(names)))
+    return [dict(zip(names, row.tolist())) for row in draws]
+
+
+class Tuner:
+
+    def __init__(self, course_path = None, workers = None, time_limit = 120.0, seed = 0, model = None):
+        '''!@brief              Constructs a tuner with a pool of worker processes
+            @param              course_path File name of the course map, or None for the oval
+            @param              workers Number of processes, or None for one per core
+            @param              time_limit Longest virtual time of a trial, in s
+            @param              seed Seed for the sensor noise and the searches
+            @param              model Other arguments for Romi
+        '''
+        self.course_path = course_path or default_course()
+        # Compile once here so the workers only open the grids
+        track.open_map(self.course_path)
+        self.workers = workers or os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+        ## Every result so far
+        self.results = []
+        self.trials = 0
+        self.seconds = 0.0
+        self._pool = multiprocessing.Pool(self.workers, _init,
+                                          (self.course_path, time_limit, seed, model))
+
+    def close(self):
+        '''!@brief              Stops the worker processes
+        '''
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        '''!@brief              Lets the tuner be used in a with statement
+            @returns            The tuner
+        '''
+        return self
+
+    def __exit__(self, *exc):
+        '''!@brief              Stops the worker processes at the end of a with statement
+        '''
+        self.close()
+
+    def run(self, param_sets):
+        '''!@brief              Runs a batch of trials across the pool
+            @param              param_sets List of parameter dictionaries
+            @returns            List of results, in the same order
+        '''
+        start = time.perf_counter()
+        chunk = max(1, len(param_sets) // (self.workers * 8))
+        results = self._pool.map(_run, param_sets, chunksize = chunk)
+        self.seconds += time.perf_counter() - start
+        self.trials += len(param_sets)
+        self.results.extend(results)
+        return results
+
+    def random_search(self, n, names = None):
+        '''!@brief              Tries parameter sets drawn uniformly between the bounds
+            @param              n Number of trials
+            @param              names Names of the parameters to vary, or None for all of them
+            @returns            The results, best first
+        '''
+        results = self.run(sample_uniform(self.rng, n, names))
+        return sorted(results, key = _score)
+
+    def cem(self, generations = 10, population = 200, elite = .1, names = None, spread = .25):
+        '''!@brief              Searches with the cross-entropy method
+            @details            Each generation is drawn from a normal distribution per parameter,
+                                clipped to its bounds. The distribution is then fitted to the best
+                                fraction of the generation, and the best trial so far is always kept.
+            @param              generations Number of generations
+            @param              population Trials per generation
+            @param              elite Fraction of each generation the next one is fitted to
+            @param              names Names of the parameters to vary, or None for all of them
+            @param              spread Starting standard deviation as a fraction of each range
+            @returns            The results, best first
+        '''
+        names = list(SPACE) if names is None else names
+        lo = np.array([SPACE[k][0] for k in names])
+        hi = np.array([SPACE[k][1] for k in names])
+        mean = np.array([SPACE[k][2] for k in names])
+        std = (hi - lo) * spread
+        keep = max(2, int(population * elite))
+        best = []
+        for gen in range(generations):
+            draws = np.clip(self.rng.normal(mean, std, (population, len(names))), lo, hi)
+            if gen == 0:
+                draws[0] = mean
+            results = self.run([dict(zip(names, row.tolist())) for row in draws])
+            best = sorted(best + results, key = _score)[:keep]
+            elites = np.array([[r["params"][k] for k in names] for r in best])
+            mean = elites.mean(axis = 0)
+            # A small floor stops the search from collapsing early
+            std = np.maximum(elites.std(axis = 0), (hi - lo) * .01)
+            print("generation {}: best {:.2f}, {} of {} finished".format(
+                  gen, best[0]["score"], sum(r["finished"] for r in results), population))
+        return sorted(self.results, key = _score)
+
+
+def _score(result):
+    '''!@brief              Gets the sort key of a result
+        @param              result Result from evaluate()
+        @returns            The score
+    '''
+    return result["score"]
+
+
+def report(results, count = 10):
+    '''!@brief              Formats a table of the best results
+        @param              results Results, best first
+        @param              count Number of rows
+        @returns            The table as a string
+    '''
+    names = list(SPACE)
+    lines = ["{:>8} {:>8} {:>8} ".format("score", "lap s", "xte cm")
+             + " ".join("{:>8}".format(k) for k in names)]
+    for r in results[:count]:
+        lap = "DNF" if r["lap_time"] is None else "{:.2f}".format(r["lap_time"])
+        lines.append("{:>8.2f} {:>8} {:>8.2f} ".format(r["score"], lap, r["xte_mean"] * 100)
+                     + " ".join("{:>8.3g}".format(r["params"][k]) for k in names))
+    return "\n".join(lines)
+
+
+def main():
+    '''!@brief              Runs a search from the command line and saves the results
+    '''
+    parser = argparse.ArgumentParser(prog = "python -m hostsim.tune", description = "Tune the line follower on a simulated course")
+    parser.add_argument("--course", help = "course map JSON file, the oval if not given")
+    parser.add_argument("--method", choices = ("random", "cem"), default = "cem")
+    parser.add_argument("-n", type = int, default = 1000, help = "trials of random search")
+    parser.add_argument("--generations", type = int, default = 10)
+    parser.add_argument("--population", type = int, default = 200)
+    parser.add_argument("--params", help = "comma separated names to vary, all if not given")
+    parser.add_argument("--workers", type = int, help = "processes, one per core if not given")
+    parser.add_argument("--time-limit", type = float, default = 120.0, help = "virtual s per trial, well above the 74 s lap of the hand tuned values")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--out", default = "tune_results.json")
+    args = parser.parse_args()
+    names = args.params.split(",") if args.params else None
+
+    with Tuner(args.course, args.workers, args.time_limit, args.seed) as tuner:
+        if args.method == "random":
+            results = tuner.random_search(args.n, names)
+        else:
+            results = tuner.cem(args.generations, args.population, names = names)
+        print(report(results))
+        print("{} trials in {:.1f} s on {} processes".format(tuner.trials, tuner.seconds, tuner.workers))
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent = 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+'''!@file                       log_decode.py
+    @brief                      Turns the binary log records sent by Logger.py back into text on the PC
+    @details                    Log frames are picked out of everything else on the link by their stream
+                                ID, and each record's message code is looked up in MESSAGES to format
+                                its two arguments. For example:
+
+                                @code
+                                import serial
+                                import log_decode as ld
+
+                                port = serial.Serial('COM5', 115200, timeout=1)
+                                for line in ld.read_log(port):
+                                    print(line)
+                                @endcode
+
+                                This file runs on the PC only.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import Logger
+import telemetry_decode as td
+'''!@package              Import Logger and telemetry_decode
+'''
+
+## Name of each task ID
+TASKS = {Logger.TASK_QTR: "QTR",
+         Logger.TASK_IMU: "IMU",
+         Logger.TASK_MOTOR: "Motor",
+         Logger.TASK_UI: "UI"}
+
+## Name of each level
+LEVELS = {Logger.DEBUG: "DEBUG",
+          Logger.INFO: "INFO",
+          Logger.WARN: "WARN",
+          Logger.ERROR: "ERROR"}
+
+## Name of each calibration file status, as in BNO055.py
+CAL_STATUS = {0: "loaded", 1: "missing", 2: "invalid", 3: "stale"}
+
+## Text of each message code, formatted with the record's arguments a and b
+MESSAGES = {Logger.STATE: "state {a}",
+            Logger.WALL_FLAGS: "PREV: {a} Wall: {b}",
+            Logger.RANGE: "range {a} mm",
+            Logger.IMU_STATUS: "MAG: {mag} ACC: {acc} GYR: {gyr} SYS: {sys}",
+            Logger.IMU_CALIB_FILE: "calibration file {cal}",
+            Logger.IMU_COEFFS_SAVED: "calibration coefficients saved",
+            Logger.IMU_NORTH: "FACING NORTH (kinda), mag y {a}",
+            Logger.IMU_MODE: "mode {a}"}
+
+
+def format_record(task, level, code, a, b):
+    '''!@brief              Makes the text of one record, without its timestamp
+        @param              task ID of the task which logged the record
+        @param              level Level of the record
+        @param              code Message code
+        @param              a First argument
+        @param              b Second argument
+        @returns            A line of text; unknown codes show their raw numbers
+    '''
+    template = MESSAGES.get(code)
+    if template is None:
+        text = "code {} ({}, {})".format(code, a, b)
+    else:
+        # Calibration status is packed two bits per part, as in the CALIB_STAT register
+        text = template.format(a = a, b = b, mag = a & 3, acc = (a >> 2) & 3,
+                               gyr = (a >> 4) & 3, sys = (a >> 6) & 3,
+                               cal = CAL_STATUS.get(a, a))
+    return "{:5} {:5} {}".format(LEVELS.get(level, str(level)), TASKS.get(task, str(task)), text)
+
+
+def read_log(stream, chunk = 4096):
+    '''!@brief              Reads log records from a file or serial port until it runs dry
+        @details            Frames of other streams on the same link are skipped
+        @param              stream Object with a read() method returning bytes
+        @param              chunk Number of bytes to ask for on each read
+        @returns            Generator of lines of text, each starting with its time in seconds
+    '''
+    start = None
+    for sid, _, records in td.read_frames(stream, None, chunk, {Logger.STREAM_ID: Logger.FMT}):
+        if sid != Logger.STREAM_ID or records is None:
+            continue
+        for rec in records:
+            t = int(rec['t'])
+            if start is None:
+                start = t
+            secs = ((t - start) % td.TICKS_PERIOD) / 1e6
+            yield "{:10.6f} {}".format(secs, format_record(int(rec['c0']), int(rec['c1']),
+                                                           int(rec['c2']), int(rec['c3']),
+                                                           int(rec['c4'])))
@@ -7,19 +7,24 @@
 '''
 
 from pyb import UART, repl_uart, Timer, Pin, I2C, ADC
-from task_share import Queue, Share
-import cotask
-import Motor_A_Task as MAT
-import Motor_B_Task as MBT
+from task_share import Queue, Share, RecordShare
+import scheduler
+import Motor_Task as MT
+import Encoder
 import user_input_data_transfer as UI
-import QTRSensorAnalog as QTR
+import QTRSensorArray as QTRA
 import QTR_Task as QTRT
 import gc
 import L6206
+import Drivetrain
 import BNO055
 import IMU_Task as IMUT
 import HCSR04 as HCR
-'''!@package              Import Tasks, devices, gc, cotask, and pyb
+import Logger
+import RateGroup
+import Output_Task as OT
+import micropython
+'''!@package              Import Tasks, devices, gc, scheduler, Logger, RateGroup, micropython, and pyb
 '''
 
 def main():
@@ -29,6 +34,9 @@ def main():
     # Disable REPL on UART2
     repl_uart(None)
     
+    # Lets errors in interrupts be reported
+    micropython.alloc_emergency_exception_buf(100)
+    
     # Create i2c object for the IMU
     # i2c = I2C(3)
     # imu = BNO055.BNO055(i2c)
@@ -43,92 +51,125 @@ def main():
     EA = Share('f', name="euler_angle_share")
     cc = Share('f', name="calib_coeff_share")
     mode = Share('i', name="mode_ID_share")
+    imu_snap = RecordShare('f', BNO055.NUM_FIELDS, name="imu_snapshot_share")
+    wheel_sp = RecordShare('f', 2, name="wheel_setpoint_share") # RPM, A then B
+    motor_cmds = Queue('B', 8, name="motor_command_queue") # completed UI commands
     # Create an object of the data transfer task
     oc.put(0) #init at open loop
     
+    # All serial output goes through queues which one task writes out, so no
+    # task ever waits on USB or UART 2
+    output = OT.Output_Task()
     
-    # Create Queues needed for data transfer to Jupyter
-    mot_A_pos = Queue('H', 1, name="mot_A_pos")
-    mot_A_spd = Queue('H', 1, name="mot_A_spd")
-    mot_B_pos = Queue('H', 1, name="mot_B_pos")
-    mot_B_spd = Queue('H', 1, name="mot_B_spd")
-
+    # Tasks log binary records which are sent over UART2 when nothing else
+    # needs to run; decode them on the PC with log_decode.py
+    log = Logger.Logger(output.uart, depth=64, level=Logger.INFO)
     
     # Create motor objects and Timer for them
     tim_4 = Timer(4, freq=20_000)
     mot_A = L6206.L6206(tim_4, Pin.cpu.B6, Pin.cpu.A8, Pin.cpu.A9, 1)
     mot_B = L6206.L6206(tim_4, Pin.cpu.B7, Pin.cpu.C2, Pin.cpu.C3, 2)
-    # Create objects of the required Tasks
-    user_input = UI.user_input_data_transfer(let, oc, dc, gn, sp)
-    mot_A_obj = MAT.Motor_A_Task(mot_A, dc, oc, sp, gn, let, mot_A_pos, mot_A_spd)
-    mot_B_obj = MBT.Motor_B_Task(mot_B, dc, oc, sp, gn, let, mot_B_pos, mot_B_spd)
     
-    # Create Line Sensor objects, front
-    C4 = Pin(Pin.cpu.C4, mode=Pin.ANALOG)
-    C5 = Pin(Pin.cpu.C5, mode=Pin.ANALOG)
-    adc0 = ADC(C4) #define ADCs with the pins
-    adc1 = ADC(C5) #Channel 2 on the sensor
-    QTR_F = QTR.QTRSensorAnalog(adc0, adc1)
+    # The line follower drives both wheels through one drivetrain; the
+    # offsets make up for Motor A needing more duty to turn as fast
+    drive = Drivetrain.Drivetrain(mot_A, mot_B, offset_L=15, offset_R=8)
     
-    # Create Line Sensor objects, left
-    B0 = Pin(Pin.cpu.B0, mode=Pin.ANALOG)
-    B1 = Pin(Pin.cpu.B1, mode=Pin.ANALOG)
-    adc2 = ADC(B0) #define ADCs with the pins
-    adc3 = ADC(B1) #Channel 2 on the sensor
-    QTR_L = QTR.QTRSensorAnalog(adc2, adc3)
+    # Create encoder objects, each on its own timer in encoder mode, with
+    # their velocities smoothed by a low-pass filter. They and Motor_Task run
+    # in floats; fixed=True switches them to fixed_point.py, which is opt-in
+    # and untested on the robot until bench.py shows it allocates nothing there
+    tim_3 = Timer(3, period = 65535, prescaler = 0)
+    enc_A = Encoder.Encoder(Pin.cpu.B4, Pin.cpu.B5, tim_3, filter=Encoder.LOW_PASS, alpha=0.5)
+    tim_8 = Timer(8, period = 65535, prescaler = 0)
+    enc_B = Encoder.Encoder(Pin.cpu.C6, Pin.cpu.C7, tim_8, filter=Encoder.LOW_PASS, alpha=0.5)
     
-    # Create Line Sensor objects, right
-    A4 = Pin(Pin.cpu.A4, mode=Pin.ANALOG)
+    # Create objects of the required Tasks
+    user_input = UI.user_input_data_transfer(let, oc, dc, gn, sp, events=motor_cmds, out=output.usb)
+    mot_obj = MT.Motor_Task(mot_A, mot_B, enc_A, enc_B, dc, oc, sp, gn, motor_cmds,
+                            ser=output.usb, uart=output.uart)
+    
+    # The encoders and wheel speed loops run at a fixed 200 Hz from Timer 6,
+    # whatever the cooperative tasks are doing; pass wheel_sp to Motor_Task
+    # to have an outer task set the wheel speeds
+    inner = RateGroup.RateGroup(6, 200, name="Wheel loops")
+    mot_obj.attach(inner)
+    
+    # Create Line Sensor ADCs, left to right across the robot; on each
+    # sensor, channel 2 is the left channel and channel 1 the right
+    B0 = Pin(Pin.cpu.B0, mode=Pin.ANALOG) # left sensor
+    B1 = Pin(Pin.cpu.B1, mode=Pin.ANALOG)
+    C4 = Pin(Pin.cpu.C4, mode=Pin.ANALOG) # front sensor
+    C5 = Pin(Pin.cpu.C5, mode=Pin.ANALOG)
+    A4 = Pin(Pin.cpu.A4, mode=Pin.ANALOG) # right sensor
     A5 = Pin(Pin.cpu.A5, mode=Pin.ANALOG)
-    adc4 = ADC(A4) #define ADCs with the pins
-    adc5 = ADC(A5) #Channel 2 on the sensor
-    QTR_R = QTR.QTRSensorAnalog(adc4, adc5)
+    
+    # One array samples all six channels in a single timed capture
+    qtr = QTRA.QTRSensorArray((ADC(B1), ADC(B0), ADC(C5), ADC(C4), ADC(A5), ADC(A4)),
+                              samples=8)
     
     # Create Ultrasonic Sensor
     A6 = Pin(Pin.cpu.A6, mode=Pin.OUT_PP)
     A7 = Pin(Pin.cpu.A7, mode=Pin.IN)
     
     hcr = HCR.HCSR04(A6,A7)
+    hcr.enable_async() # Echo edges are timed by interrupt, never waited for
     
     
-    qtr_obj = QTRT.QTR_Task(QTR_F,QTR_L, QTR_R, mot_A, mot_B, hcr)
-    # imu_obj = IMUT.IMU_Task(imu, mode, EA, AV, cc, let, mot_A, mot_B)
+    qtr_obj = QTRT.QTR_Task(qtr, drive, hcr, log=log)
+    # imu_obj = IMUT.IMU_Task(imu, mode, EA, AV, cc, let, mot_A, mot_B, log=log,
+                           # snapshot=imu_snap, ser=output.usb)
     
     
     
     # Create a task object using the run method from the data transfer object
-    task1 = cotask.Task(user_input.run, name="UI Out",
-                        priority = 1, period=10)
-    task2 = cotask.Task(mot_A_obj.run, name="Motor_A_Driver",
-                        priority = 2, period=100)
-    task3 = cotask.Task(mot_B_obj.run, name="Motor_B_Driver",
-                        priority = 2, period=100)
-    task4 = cotask.Task(qtr_obj.run, name="QTR Sensor",
-                        priority=2, period=30)
-    # task5 = cotask.Task(imu_obj.run, name="IMU_Sensor",
-                        # priority = 2, period=100)
+    task1 = scheduler.Task(user_input.run, name="UI Out",
+                           priority = 1, period=10)
+    task2 = scheduler.Task(mot_obj.run, name="Motor_Driver",
+                           priority = 2, period=100)
+    task4 = scheduler.Task(qtr_obj.run, name="QTR Sensor",
+                           priority=2, period=30)
+    # task5 = scheduler.Task(imu_obj.run, name="IMU_Sensor",
+                           # priority = 2, period=100)
+    task6 = scheduler.Task(log.run, name="Log Flush",
+                           priority = 0, period=50)
+    task7 = scheduler.Task(output.run, name="Serial Out",
+                           priority = 1, period=10)
 
     
     # Append the newly created task to the task list
-    #cotask.task_list.append(task1)
-    #cotask.task_list.append(task2)
-    #cotask.task_list.append(task3)
-    cotask.task_list.append(task4)
-    #cotask.task_list.append(task5)
+    #scheduler.task_list.append(task1)
+    #scheduler.task_list.append(task2)
+    scheduler.task_list.append(task4)
+    #scheduler.task_list.append(task5)
+    scheduler.task_list.append(task6)
+    scheduler.task_list.append(task7)
     
     
     gc.collect()
+    inner.start()
     
-    # Run the scheduler
+    # Run the scheduler; idle() only does anything on a PC, where it moves
+    # the virtual clock to the next release
     while True:
         try:
-            cotask.task_list.pri_sched()
+            if not scheduler.task_list.pri_sched():
+                scheduler.task_list.idle()
         
     # Trying to catch the "Ctrl-C" keystroke to break out
     # of the program cleanly
         except KeyboardInterrupt:
             break
 
+    # Send what is left of the log and show how well each task kept to its period
+    inner.stop()
+    log.flush()
+    for channel in output.channels:
+        while channel.pending() and channel.drain():
+            pass
+    print(scheduler.task_list)
+    print(inner)
+    print(output)
+
 # Once the program is over, do any sort of cleanup as needed
 print('Program terminated')
     
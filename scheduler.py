@@ -0,0 +1,331 @@
+'''!@file                       scheduler.py
+    @brief                      A cooperative scheduler which measures how well deadlines are met
+    @details                    Drop-in replacement for cotask.Task and cotask.task_list. Every task
+                                keeps fixed counters of how many times it ran, how long it ran, how
+                                late it started after its release time (release jitter), how long
+                                it took from release to finishing (latency) and how many times it
+                                finished after its next release was already due (missed deadline).
+                                The counters live in a preallocated array, so keeping them does not
+                                allocate memory while the scheduler runs.
+
+                                On the robot the scheduler uses MicroPython's time module. On a PC,
+                                where time has no ticks functions, it uses the virtual clock in
+                                vclock, and TaskList.run_for() jumps the clock ahead to the next
+                                release whenever no task is ready.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import array
+import gc
+import time
+
+# MicroPython's time module has the ticks functions; CPython's does not
+if hasattr(time, "ticks_us"):
+    sys_clock = time
+else:
+    import vclock
+    sys_clock = vclock.clock
+'''!@package              Import array, gc, time, and vclock when not on the robot
+'''
+
+## Index of the number of times a task has run in Task.stats
+RUNS = 0
+## Index of the total run time in microseconds in Task.stats
+TOTAL_US = 1
+## Index of the longest single run in microseconds in Task.stats
+MAX_RUN_US = 2
+## Index of the total release jitter in microseconds in Task.stats
+TOTAL_JITTER_US = 3
+## Index of the largest release jitter in microseconds in Task.stats
+MAX_JITTER_US = 4
+## Index of the largest release-to-finish latency in microseconds in Task.stats
+MAX_LATENCY_US = 5
+## Index of the number of missed deadlines in Task.stats
+MISSES = 6
+## Number of counters in Task.stats
+NUM_STATS = 7
+
+
+class Task:
+    '''!@brief                  A task run by the scheduler, with its deadline statistics
+        @details                The body of a task is a generator which does a little work and then
+                                yields, so that other tasks can run. A task with a period is released
+                                every period; one without runs only when go() is called. Either way
+                                it runs when TaskList.pri_sched() finds it ready, and each run updates
+                                the counters in stats.
+    '''
+
+    def __init__(self, run_fun, name = "NoName", priority = 0, period = None,
+                 profile = False, trace = False, shares = (), clock = None):
+        '''!@brief              Constructs a task object
+            @details            Takes the same arguments as cotask.Task. Run time statistics are always
+                                kept; @c profile is accepted for compatibility
+            @param              run_fun Generator function which is the body of the task
+            @param              name Name of the task, used in printouts
+            @param              priority Larger numbers run first when several tasks are ready
+            @param              period Time between runs in milliseconds, or None if the task only
+                                runs after go() is called
+            @param              profile Accepted for compatibility with cotask; statistics are always kept
+            @param              trace True to record the time and state of every run
+            @param              shares Accepted for compatibility with cotask
+            @param              clock Object with the ticks functions of the time module, default sys_clock
+        '''
+        self._run_gen = run_fun()
+        self.name = name
+        self.priority = int(priority)
+        self._clock = clock if clock is not None else sys_clock
+
+        if period is None:
+            self.period = None
+            self._interval = 0
+        else:
+            self.period = period
+            self._interval = int(period * 1000)
+
+        self.go_flag = False
+        self._release = self._clock.ticks_us()
+        self._next_run = self._release
+
+        ## Statistics counters, indexed by RUNS, TOTAL_US and the other constants
+        self.stats = array.array('q', [0] * NUM_STATS)
+
+        self._trace = [] if trace else None
+
+    def schedule(self):
+        '''!@brief              Runs the task once if it is ready
+            @details            Records the release jitter, run time, latency and any missed deadline
+            @returns            True if the task ran, False if it was not ready
+        '''
+        if not self.ready():
+            return False
+
+        self.go_flag = False
+        clk = self._clock
+        start = clk.ticks_us()
+        state = next(self._run_gen)
+        finish = clk.ticks_us()
+
+        stats = self.stats
+        run_us = clk.ticks_diff(finish, start)
+        jitter = clk.ticks_diff(start, self._release)
+        latency = clk.ticks_diff(finish, self._release)
+
+        stats[RUNS] += 1
+        stats[TOTAL_US] += run_us
+        if run_us > stats[MAX_RUN_US]:
+            stats[MAX_RUN_US] = run_us
+        stats[TOTAL_JITTER_US] += jitter
+        if jitter > stats[MAX_JITTER_US]:
+            stats[MAX_JITTER_US] = jitter
+        if latency > stats[MAX_LATENCY_US]:
+            stats[MAX_LATENCY_US] = latency
+
+        if self._interval:
+            # The deadline is the next release; like cotask, late releases
+            # are not skipped, so a late task runs again right away
+            if latency > self._interval:
+                stats[MISSES] += 1
+            self._next_run = clk.ticks_add(self._next_run, self._interval)
+
+        if self._trace is not None:
+            self._trace.append((start, state))
+
+        return True
+
+    def ready(self):
+        '''!@brief              Checks whether the task should run now
+            @details            A periodic task becomes ready when its next release time has passed
+            @returns            True if the task is ready to run
+        '''
+        if self._interval and not self.go_flag:
+            if self._clock.ticks_diff(self._clock.ticks_us(), self._next_run) >= 0:
+                self.go_flag = True
+                self._release = self._next_run
+        return self.go_flag
+
+    def go(self):
+        '''!@brief              Makes a task ready to run, usually one with no period
+            @details            The release time used for jitter and latency is the time of this call
+        '''
+        if not self.go_flag:
+            self._release = self._clock.ticks_us()
+        self.go_flag = True
+
+    def until_release(self):
+        '''!@brief              Finds how long until the task is next released
+            @returns            Microseconds until release, zero or less if already due,
+                                or None for a task with no period which is not ready
+        '''
+        if self.go_flag:
+            return 0
+        if not self._interval:
+            return None
+        return self._clock.ticks_diff(self._next_run, self._clock.ticks_us())
+
+    def set_period(self, period):
+        '''!@brief              Changes the time between runs
+            @param              period New period in milliseconds, or None to stop periodic runs
+        '''
+        if period is None:
+            self.period = None
+            self._interval = 0
+        else:
+            self.period = period
+            self._interval = int(period * 1000)
+
+    def reset_profile(self):
+        '''!@brief              Clears the statistics counters and the trace
+        '''
+        for idx in range(NUM_STATS):
+            self.stats[idx] = 0
+        if self._trace is not None:
+            self._trace = []
+
+    def get_trace(self):
+        '''!@brief              Makes a printout of the recorded run times and states
+            @returns            A string with one line per recorded run
+        '''
+        if self._trace is None:
+            return self.name + ": not traced"
+        return '\n'.join('{:s}: {:d} us state {:}'.format(self.name, t, s)
+                         for t, s in self._trace)
+
+    def __repr__(self):
+        '''!@brief              Puts the task's statistics into a string
+        '''
+        s = self.stats
+        runs = s[RUNS]
+        avg_us = s[TOTAL_US] // runs if runs else 0
+        avg_jit = s[TOTAL_JITTER_US] // runs if runs else 0
+        period = '-' if self.period is None else str(self.period)
+        return '{:<16s}{:>4d}{:>8s}{:>9d}{:>9d}{:>9d}{:>9d}{:>9d}{:>9d}{:>7d}'.format(
+            self.name, self.priority, period, runs, avg_us, s[MAX_RUN_US],
+            avg_jit, s[MAX_JITTER_US], s[MAX_LATENCY_US], s[MISSES])
+
+
+class TaskList:
+    '''!@brief                  A list of tasks, kept in priority order, which the scheduler runs
+    '''
+
+    def __init__(self):
+        '''!@brief              Constructs an empty task list
+        '''
+        ## Tasks in order of decreasing priority
+        self.tasks = []
+        # Where the search for a ready task starts within each priority level
+        self._rr_idx = {}
+
+    def append(self, task):
+        '''!@brief              Adds a task to the list
+            @details            Tasks are kept sorted by priority; tasks of equal priority keep
+                                the order in which they were added
+            @param              task The task to add
+        '''
+        idx = 0
+        while idx < len(self.tasks) and self.tasks[idx].priority >= task.priority:
+            idx += 1
+        self.tasks.insert(idx, task)
+        self._rr_idx[task.priority] = 0
+        gc.collect()
+
+    def pri_sched(self):
+        '''!@brief              Runs the highest priority task which is ready
+            @details            Tasks of equal priority take turns, as in cotask
+            @returns            True if a task ran
+        '''
+        tasks = self.tasks
+        num = len(tasks)
+        idx = 0
+        while idx < num:
+            pri = tasks[idx].priority
+            end = idx
+            while end < num and tasks[end].priority == pri:
+                end += 1
+
+            # Start the search within this priority after the last task run
+            # there; each priority keeps its own place, wrapped to its size
+            group = end - idx
+            start = self._rr_idx.get(pri, 0) % group
+            for k in range(group):
+                pos = (start + k) % group
+                if tasks[idx + pos].schedule():
+                    self._rr_idx[pri] = (pos + 1) % group
+                    return True
+            idx = end
+        return False
+
+    def rr_sched(self):
+        '''!@brief              Gives every ready task one run, regardless of priority
+            @returns            True if any task ran
+        '''
+        ran = False
+        for task in self.tasks:
+            if task.schedule():
+                ran = True
+        return ran
+
+    def until_release(self):
+        '''!@brief              Finds how long until the next task is released
+            @returns            Microseconds until the soonest release, or None if no task has a period
+        '''
+        soonest = None
+        for task in self.tasks:
+            wait = task.until_release()
+            if wait is not None and (soonest is None or wait < soonest):
+                soonest = wait
+        return soonest
+
+    def idle(self, max_us = None, clock = None):
+        '''!@brief              Lets time pass when no task is ready
+            @details            With a virtual clock, jumps the clock to the next release, or to the
+                                next scheduled event if no task has a period. With a real clock this
+                                does nothing, as time passes by itself.
+            @param              max_us Longest jump in microseconds, or None for no limit
+            @param              clock The clock the tasks use, default sys_clock
+        '''
+        clk = clock if clock is not None else sys_clock
+        if not hasattr(clk, "advance"):
+            return
+        wait = self.until_release()
+        if wait is None:
+            event = clk.next_event_us() if hasattr(clk, "next_event_us") else None
+            wait = 1000 if event is None else event - clk.now_us()
+        if max_us is not None and wait > max_us:
+            wait = max_us
+        clk.advance(wait if wait > 0 else 1)
+
+    def run_for(self, ms, clock = None):
+        '''!@brief              Runs the scheduler for a length of time
+            @details            With a virtual clock, time is jumped forward to the next release
+                                whenever nothing is ready, so simulated time runs as fast as the
+                                tasks allow. With a real clock this just calls pri_sched() in a loop.
+            @param              ms How long to run, in milliseconds
+            @param              clock The clock the tasks use, default sys_clock
+        '''
+        clk = clock if clock is not None else sys_clock
+        end = clk.ticks_add(clk.ticks_us(), int(ms * 1000))
+        while clk.ticks_diff(end, clk.ticks_us()) > 0:
+            if not self.pri_sched():
+                self.idle(clk.ticks_diff(end, clk.ticks_us()), clk)
+
+    def reset_profile(self):
+        '''!@brief              Clears the statistics of every task
+        '''
+        for task in self.tasks:
+            task.reset_profile()
+
+    def __repr__(self):
+        '''!@brief              Makes a table of every task's statistics, times in microseconds
+        '''
+        lines = ['{:<16s}{:>4s}{:>8s}{:>9s}{:>9s}{:>9s}{:>9s}{:>9s}{:>9s}{:>7s}'.format(
+                     'Task', 'Pri', 'Per(ms)', 'Runs', 'AvgRun', 'MaxRun',
+                     'AvgJit', 'MaxJit', 'MaxLat', 'Miss')]
+        for task in self.tasks:
+            lines.append(str(task))
+        return '\n'.join(lines)
+
+
+## The system-wide list of tasks, as in cotask
+task_list = TaskList()
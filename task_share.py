@@ -40,6 +40,10 @@ type_code_strings = {'b' : "int8",   'B' : "uint8",
                      'q' : "int64",  'Q' : "uint64",
                      'f' : "float",  'd' : "double"}
 
+## Mask which keeps record share counters within MicroPython's small integers,
+#  so that incrementing them never allocates, even in an ISR
+COUNTER_MASK = 0x3FFFFFFF
+
 
 def show_all ():
     """!
@@ -100,6 +104,19 @@ class Queue (BaseShare):
     # In another task, read data from the queue
     something = my_queue.get ()
     @endcode
+
+    Because @c put() and @c get() wait for room or data, tasks running under
+    a cooperative scheduler should use the non-blocking @c try_put() and
+    @c try_get() instead. When one producer and one consumer move blocks of
+    samples, @c put_many() and @c get_into() copy whole slices of the
+    queue's buffer with a single interrupt lock:
+    @code
+    samples = array.array ('H', range (32))
+    sent = my_queue.put_many (samples)          # May be fewer than 32
+
+    block = array.array ('H', range (32))
+    got = my_queue.get_into (block)             # block[0:got] is valid
+    @endcode
     """
     ## A counter used to give serial numbers to queues for diagnostic use.
     ser_num = 0
@@ -145,7 +162,7 @@ class Queue (BaseShare):
 
         # Allocate memory in which the queue's data will be stored
         try:
-            self._buffer = array.array (type_code, range (size))
+            self._buffer = array.array (type_code, [0] * size)
         except MemoryError:
             self._buffer = None
             raise
@@ -153,6 +170,9 @@ class Queue (BaseShare):
             self._buffer = None
             raise
 
+        # A view of the buffer lets bulk transfers copy slices in place
+        self._view = memoryview (self._buffer)
+
         # Initialize pointers to be used for reading and writing data
         self.clear ()
 
@@ -196,7 +216,7 @@ class Queue (BaseShare):
 
         # Prevent data corruption by blocking interrupts during data transfer
         if self._thread_protect and not in_ISR:
-            _irq_state = pyb.disable_irq ()
+            irq_state = pyb.disable_irq ()
 
         # Write the data and advance the counts and pointers
         self._buffer[self._wr_idx] = item
@@ -211,7 +231,7 @@ class Queue (BaseShare):
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
-            pyb.enable_irq (_irq_state)
+            pyb.enable_irq (irq_state)
 
 
     @micropython.native
@@ -261,6 +281,188 @@ class Queue (BaseShare):
         return (to_return)
 
 
+    @micropython.native
+    def try_put (self, item, in_ISR = False):
+        """!
+        Put an item into the queue without ever waiting for room.
+
+        This is the non-blocking counterpart of @c put() for use in the
+        cooperative scheduler, where spinning on a full queue would hang every
+        task. If the queue is full and the @c overwrite constructor parameter
+        is @c True, the oldest item is discarded to make room; otherwise the
+        new item is dropped.
+        @code
+        |   def some_task ():
+        |       while True:
+        |           if not my_queue.try_put (create_something_to_put ()):
+        |               dropped += 1
+        |           yield 0
+        @endcode
+        @param item The item to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return @c True if the item was stored, @c False if it was dropped
+        """
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        stored = True
+        if self._num_items >= self._size:
+            if self._overwrite:
+                # Discard the oldest item so the reader stays in order
+                self._rd_idx += 1
+                if self._rd_idx >= self._size:
+                    self._rd_idx = 0
+                self._num_items -= 1
+            else:
+                stored = False
+
+        if stored:
+            self._buffer[self._wr_idx] = item
+            self._wr_idx += 1
+            if self._wr_idx >= self._size:
+                self._wr_idx = 0
+            self._num_items += 1
+            if self._num_items > self._max_full:
+                self._max_full = self._num_items
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return stored
+
+
+    @micropython.native
+    def try_get (self, default = None, in_ISR = False):
+        """!
+        Read an item from the queue without waiting for one to arrive.
+
+        This is the non-blocking counterpart of @c get(). The emptiness check
+        and the read happen inside one critical section, so an ISR cannot
+        empty the queue between them.
+        @param default The value returned if the queue is empty
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return The oldest item in the queue, or @c default if it is empty
+        """
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        if self._num_items > 0:
+            to_return = self._buffer[self._rd_idx]
+            self._rd_idx += 1
+            if self._rd_idx >= self._size:
+                self._rd_idx = 0
+            self._num_items -= 1
+        else:
+            to_return = default
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return to_return
+
+
+    @micropython.native
+    def put_many (self, buffer, in_ISR = False):
+        """!
+        Copy a block of items into the queue in one operation.
+
+        The items are moved as at most two slice copies (one on each side of
+        the wrap-around point) with interrupts disabled only once, which is
+        much cheaper than calling @c put() for every item. The source must be
+        an @c array.array, @c bytearray or @c memoryview whose items have the
+        same type code as the queue. This method never waits: if there isn't
+        room for the whole block, the oldest data is overwritten when the
+        @c overwrite constructor parameter is @c True, otherwise only as many
+        items as fit are copied.
+        @param buffer The block of items to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return The number of items copied from the start of @c buffer
+        """
+        src = memoryview (buffer)
+        count = len (src)
+
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        room = self._size - self._num_items
+        if count > room:
+            if self._overwrite:
+                # Only the newest 'size' items can survive; drop the rest of
+                # the old data to make room for them
+                if count > self._size:
+                    src = src[count - self._size:]
+                    count = self._size
+                drop = count - room
+                self._rd_idx += drop
+                if self._rd_idx >= self._size:
+                    self._rd_idx -= self._size
+                self._num_items -= drop
+            else:
+                count = room
+
+        # Copy up to the end of the buffer, then wrap around to the start
+        first = self._size - self._wr_idx
+        if first > count:
+            first = count
+        self._view[self._wr_idx:self._wr_idx + first] = src[0:first]
+        if count > first:
+            self._view[0:count - first] = src[first:count]
+
+        self._wr_idx += count
+        if self._wr_idx >= self._size:
+            self._wr_idx -= self._size
+        self._num_items += count
+        if self._num_items > self._max_full:
+            self._max_full = self._num_items
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return count
+
+
+    @micropython.native
+    def get_into (self, buffer, in_ISR = False):
+        """!
+        Move as many items as are available, up to the size of a buffer, out
+        of the queue in one operation.
+
+        This is the bulk counterpart of @c try_get(). Items are copied as at
+        most two slices with interrupts disabled only once. The destination
+        must be a writable @c array.array, @c bytearray or @c memoryview with
+        the same type code as the queue; to fill only part of a buffer, pass
+        a @c memoryview slice of it.
+        @param buffer The buffer into which items are copied, oldest first
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return The number of items copied into the start of @c buffer
+        """
+        dst = memoryview (buffer)
+
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        count = len (dst)
+        if count > self._num_items:
+            count = self._num_items
+
+        first = self._size - self._rd_idx
+        if first > count:
+            first = count
+        dst[0:first] = self._view[self._rd_idx:self._rd_idx + first]
+        if count > first:
+            dst[first:count] = self._view[0:count - first]
+
+        self._rd_idx += count
+        if self._rd_idx >= self._size:
+            self._rd_idx -= self._size
+        self._num_items -= count
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return count
+
+
     @micropython.native
     def any (self):
         """!
@@ -450,3 +652,164 @@ class Share (BaseShare):
                 type_code_strings[self._type_code]))
 
 
+
+
+# ============================================================================
+
+class RecordShare (BaseShare):
+    """!
+    A share which holds a record of several related values of one type.
+
+    A single writer updates all of the fields together and many readers can
+    take a consistent snapshot of them without disabling interrupts. Each
+    write is bracketed by two increments of a sequence counter, so the counter
+    is odd while a write is in progress; a reader copies the fields, and if
+    the counter was odd or changed during the copy, it tries again. Readers
+    only pay for a retry when they actually collide with the writer.
+
+    Only one task or ISR may write a given record. A reader which can run in
+    the middle of a write (for example an ISR reading a record written by a
+    task) must not retry forever, because the write cannot finish until the
+    ISR returns; such readers should give a small @c retries count and keep
+    their previous snapshot when @c get_into() returns @c False.
+
+    An example of the creation and use of a record share is as follows:
+    @code
+    import array
+    import task_share
+
+    # This record holds x, y and heading as floats
+    pose = task_share.RecordShare ('f', 3, name="Pose")
+
+    # In the writing task, publish all three values at once
+    pose.put ((x, y, theta))
+
+    # In another task, take a snapshot into a preallocated array
+    snapshot = array.array ('f', [0.0] * 3)
+    pose.get_into (snapshot)
+    @endcode
+    """
+    ## A counter used to give serial numbers to record shares for diagnostics.
+    ser_num = 0
+
+
+    def __init__ (self, type_code, num_fields, name = None):
+        """!
+        Create a record share with a fixed number of fields.
+
+        The fields are stored in one @c array.array of the given type code,
+        which can be any of those accepted by @c Share. Thread protection is
+        provided by the sequence counter, so there is no @c thread_protect
+        parameter.
+        @param type_code The type of data held in every field of the record
+        @param num_fields The number of fields in the record
+        @param name A short name for the record, default @c RecordN where
+               @c N is a serial number for the record
+        """
+        # The sequence counter replaces interrupt locking
+        super ().__init__ (type_code, False, name)
+
+        self._num_fields = num_fields
+        self._buffer = array.array (type_code, [0] * num_fields)
+        self._seq = 0
+        self._collisions = 0
+
+        self._name = str (name) if name != None \
+            else 'Record' + str (RecordShare.ser_num)
+        RecordShare.ser_num += 1
+
+
+    @micropython.native
+    def put (self, values):
+        """!
+        Write every field of the record in one operation.
+
+        Readers which overlap this write will see the sequence counter change
+        and retry, so they never see a mix of old and new fields.
+        @param values A sequence holding at least @c num_fields values, such
+               as a tuple or an @c array.array
+        """
+        self._seq = (self._seq + 1) & COUNTER_MASK  # Odd: write in progress
+        for idx in range (self._num_fields):
+            self._buffer[idx] = values[idx]
+        self._seq = (self._seq + 1) & COUNTER_MASK  # Even: record is consistent
+
+
+    @micropython.native
+    def put_field (self, index, value):
+        """!
+        Write a single field of the record.
+
+        This is useful when only one value of a record changes; it is still
+        seen atomically with respect to the other fields by readers.
+        @param index The index of the field to be written
+        @param value The new value of the field
+        """
+        self._seq = (self._seq + 1) & COUNTER_MASK
+        self._buffer[index] = value
+        self._seq = (self._seq + 1) & COUNTER_MASK
+
+
+    @micropython.native
+    def get_into (self, dest, retries = -1):
+        """!
+        Copy a consistent snapshot of every field into a buffer.
+
+        No interrupts are disabled. If a write is in progress or completes
+        during the copy, the copy is repeated.
+        @param dest An @c array.array of the same type code and at least
+               @c num_fields items long, which receives the fields
+        @param retries The number of times to retry after a collision with a
+               writer, or a negative number to retry until successful
+        @return @c True if @c dest holds a consistent snapshot, @c False if
+                the retries were used up; @c dest may then be torn
+        """
+        while True:
+            seq = self._seq
+            if not seq & 1:
+                dest[0:self._num_fields] = self._buffer
+                if seq == self._seq:
+                    return True
+
+            self._collisions = (self._collisions + 1) & COUNTER_MASK
+            if retries == 0:
+                return False
+            retries -= 1
+
+
+    @micropython.native
+    def get (self, index):
+        """!
+        Read a single field of the record.
+
+        A single field is always read atomically, so no retry is needed; use
+        @c get_into() when several fields must be consistent with each other.
+        @param index The index of the field to be read
+        @return The current value of the field
+        """
+        return self._buffer[index]
+
+
+    def sequence (self):
+        """!
+        Get the record's sequence counter.
+
+        The counter advances by two with every write, so a reader can tell
+        whether a record has been updated since it last looked. It wraps
+        around to zero after @c COUNTER_MASK, staying even between writes.
+        @return The current value of the sequence counter
+        """
+        return self._seq
+
+
+    def __repr__ (self):
+        """!
+        Puts diagnostic information about the record share into a string.
+
+        This shows the name, type and number of fields as well as how many
+        times readers have had to retry because they collided with a writer.
+        Both counts wrap around, as described under @c COUNTER_MASK.
+        """
+        return ("{:<12s} Record<{:s}>[{:d}] Writes {:d} Retries {:d}".format (
+                self._name, type_code_strings[self._type_code],
+                self._num_fields, self._seq // 2, self._collisions))
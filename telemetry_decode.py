@@ -0,0 +1,198 @@
+'''!@file                       telemetry_decode.py
+    @brief                      Decodes binary telemetry frames on the PC into NumPy arrays
+    @details                    Reads the frames written by Telemetry.py, checks their CRCs, resyncs
+                                after garbage or dropped bytes, and gives back each frame's records
+                                as a NumPy structured array with a field @c t for the timestamp and
+                                fields @c c0, @c c1, ... for the channels. For example:
+
+                                @code
+                                import serial
+                                import telemetry_decode as td
+
+                                port = serial.Serial('COM5', 115200, timeout=1)
+                                data = td.capture(port, fmt='if', stream_id=1)
+                                plot(data['t'], data['c1'])
+                                @endcode
+
+                                This file runs on the PC only.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import struct
+import binascii
+import numpy as np
+'''!@package              Import struct, binascii, and numpy
+'''
+
+## First sync byte of every frame
+SYNC0 = 0xA5
+## Second sync byte of every frame
+SYNC1 = 0x5A
+## Frame header layout, as in Telemetry.py
+HEADER_FMT = '<BBBBHH'
+## Number of bytes in the frame header
+HEADER_SIZE = 8
+## Number of bytes in the CRC after the records
+CRC_SIZE = 4
+## Timestamps are MicroPython ticks_us() values, which wrap at this value
+TICKS_PERIOD = 1 << 30
+
+## NumPy types matching single-letter struct codes
+_DTYPES = {'b': 'i1', 'B': 'u1', 'h': '<i2', 'H': '<u2',
+           'i': '<i4', 'I': '<u4', 'l': '<i4', 'L': '<u4',
+           'q': '<i8', 'Q': '<u8', 'f': '<f4', 'd': '<f8'}
+
+
+def record_dtype(fmt):
+    '''!@brief              Makes the NumPy type of one record
+        @param              fmt struct format of the channels, as given to Telemetry
+        @returns            A structured dtype with fields t, c0, c1, ...
+    '''
+    fields = [('t', '<u4')]
+    for idx, code in enumerate(fmt):
+        fields.append(('c' + str(idx), _DTYPES[code]))
+    return np.dtype(fields)
+
+
+class FrameDecoder:
+
+    def __init__(self, fmt = 'ii', formats = None):
+        '''!@brief              Constructs a frame decoder
+            @details            Several streams with different record layouts can share one link;
+                                give the layout of each in @c formats. Frames of a stream with no
+                                layout at all are checked and counted but not given back.
+            @param              fmt struct format of the channels, as given to Telemetry, used for
+                                streams not in @c formats, or None to skip those streams
+            @param              formats Dictionary of stream ID to struct format, or None
+        '''
+        self.dtype = None if fmt is None else record_dtype(fmt)
+        self.dtypes = {}
+        if formats is not None:
+            for sid, sfmt in formats.items():
+                self.dtypes[sid] = record_dtype(sfmt)
+        self._buf = bytearray()
+        self._next_seq = {}
+
+        ## Frames whose CRC was correct
+        self.frames = 0
+        ## Frames thrown away because their CRC was wrong
+        self.crc_errors = 0
+        ## Frames missing from the sequence numbers
+        self.lost = 0
+        ## Bytes skipped while looking for the sync bytes
+        self.skipped = 0
+
+    def feed(self, data):
+        '''!@brief              Adds received bytes and decodes every complete frame in them
+            @details            A frame with no records marks the end of a stream and is given back
+                                with @c records set to None
+            @param              data Bytes received from the link
+            @returns            Generator of (stream_id, seq, records) for each good frame
+        '''
+        buf = self._buf
+        buf.extend(data)
+        pos = 0
+        while True:
+            start = buf.find(bytes((SYNC0, SYNC1)), pos)
+            if start < 0:
+                # Keep a trailing first sync byte, it may start the next frame
+                keep = 1 if buf and buf[-1] == SYNC0 else 0
+                self.skipped += len(buf) - pos - keep
+                pos = len(buf) - keep
+                break
+            self.skipped += start - pos
+            if len(buf) - start < HEADER_SIZE:
+                pos = start
+                break
+
+            _, _, sid, num, seq, length = struct.unpack_from(HEADER_FMT, buf, start)
+            end = start + HEADER_SIZE + length
+            if len(buf) < end + CRC_SIZE:
+                pos = start
+                break
+
+            crc, = struct.unpack_from('<I', buf, end)
+            dtype = self.dtypes.get(sid, self.dtype)
+            if ((dtype is not None and length != num * dtype.itemsize)
+                    or binascii.crc32(buf[start + 2:end]) != crc):
+                # Not a real frame, look for the next sync after this one
+                self.crc_errors += 1
+                pos = start + 1
+                continue
+
+            self.frames += 1
+            expected = self._next_seq.get(sid)
+            if expected is not None:
+                self.lost += (seq - expected) & 0xFFFF
+            self._next_seq[sid] = (seq + 1) & 0xFFFF
+            pos = end + CRC_SIZE
+            if dtype is None:
+                continue
+
+            if num:
+                records = np.frombuffer(bytes(buf[start + HEADER_SIZE:end]), dtype = dtype)
+            else:
+                records = None
+            yield sid, seq, records
+
+        del buf[:pos]
+
+
+def unwrap_ticks(t, start = 0):
+    '''!@brief              Turns wrapping ticks_us() timestamps into seconds since the first sample
+        @param              t Array of timestamps
+        @param              start Tick value to count from, default the first timestamp
+        @returns            Array of times in seconds
+    '''
+    t = np.asarray(t, dtype = np.int64)
+    if t.size == 0:
+        return t.astype(np.float64)
+    steps = np.diff(t, prepend = t[0] if start == 0 else start)
+    steps = ((steps + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+    return np.cumsum(steps) / 1e6
+
+
+def read_frames(stream, fmt = 'ii', chunk = 4096, formats = None):
+    '''!@brief              Decodes every frame from a file or serial port until it runs dry
+        @param              stream Object with a read() method returning bytes
+        @param              fmt struct format of the channels, as given to Telemetry
+        @param              chunk Number of bytes to ask for on each read
+        @param              formats Dictionary of stream ID to struct format, see FrameDecoder
+        @returns            Generator of (stream_id, seq, records) for each good frame
+    '''
+    decoder = FrameDecoder(fmt, formats)
+    while True:
+        data = stream.read(chunk)
+        if not data:
+            return
+        yield from decoder.feed(data)
+
+
+def capture(stream, fmt = 'ii', stream_id = 1, chunk = 4096):
+    '''!@brief              Collects one stream's records until its end frame arrives
+        @details            Frames from other streams are ignored. Timestamps are unwrapped and
+                                replaced by seconds since the first record.
+        @param              stream Object with a read() method returning bytes
+        @param              fmt struct format of the channels, as given to Telemetry
+        @param              stream_id The stream to collect
+        @param              chunk Number of bytes to ask for on each read
+        @returns            Structured array of every record, with field @c t in seconds
+    '''
+    parts = []
+    for sid, _, records in read_frames(stream, None, chunk, {stream_id: fmt}):
+        if sid != stream_id:
+            continue
+        if records is None:
+            break
+        parts.append(records)
+
+    dtype = record_dtype(fmt)
+    data = np.concatenate(parts) if parts else np.zeros(0, dtype = dtype)
+    out_dtype = np.dtype([('t', '<f8')] + [(name, dtype[name]) for name in dtype.names[1:]])
+    out = np.zeros(data.shape, dtype = out_dtype)
+    out['t'] = unwrap_ticks(data['t'])
+    for name in dtype.names[1:]:
+        out[name] = data[name]
+    return out
@@ -0,0 +1,27 @@
+'''!@file                       conftest.py
+    @brief                      Sets up the PC tests of the firmware
+    @details                    Puts the folder holding main.py on the import path and installs the
+                                simulated modules from hostsim, so every test imports the firmware's
+                                files unchanged. Each test starts from a fresh simulation. Run the
+                                tests with @c python -m pytest from the folder holding main.py.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hostsim
+'''!@package              Import os, sys, pytest, and hostsim
+'''
+
+hostsim.install()
+
+
+@pytest.fixture(autouse = True)
+def sim():
+    '''!@brief              Starts every test with the clock at zero and no peripherals, tasks or shares
+    '''
+    hostsim.reset()
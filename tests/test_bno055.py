@@ -0,0 +1,140 @@
+'''!@file                       test_bno055.py
+    @brief                      Tests of the IMU driver's mode changes against a simulated BNO055
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import pyb
+import hostsim
+import BNO055
+'''!@package              Import pyb, hostsim, and BNO055
+'''
+
+
+class _Chip(pyb.RegisterMap):
+
+    def __init__(self, mode = BNO055.MODES["NDOF"]):
+        '''!@brief              Constructs a simulated BNO055 which only takes its axis map in CONFIG
+            @param              mode Operating mode it is left in, as after a soft reboot
+        '''
+        super().__init__()
+        self.regs[0x3D] = mode
+        self.modes = []
+
+    def write(self, memaddr, data):
+        '''!@brief              Writes registers, ignoring the axis map outside CONFIG
+            @param              memaddr First register
+            @param              data Bytes written
+        '''
+        if memaddr in (0x41, 0x42) and self.regs[0x3D] != BNO055.MODES["CONFIG"]:
+            return
+        super().write(memaddr, data)
+        if memaddr == 0x3D:
+            self.modes.append(data[0])
+
+
+def _imu(chip):
+    '''!@brief              Puts a simulated chip on I2C bus 3 and makes the driver for it
+        @param              chip The chip
+        @returns            The driver
+    '''
+    i2c = pyb.I2C(3)
+    i2c.attach(0x28, chip)
+    return BNO055.BNO055(i2c)
+
+
+def test_starts_in_config_after_soft_reboot():
+    chip = _Chip(BNO055.MODES["NDOF"])
+    imu = _imu(chip)
+    assert imu.mode == "CONFIG"
+    assert chip.regs[0x3D] == BNO055.MODES["CONFIG"]
+    assert chip.regs[0x41] == BNO055.AXIS_MAP_CONFIG
+    assert chip.regs[0x42] == BNO055.AXIS_MAP_SIGN
+
+
+def test_get_status_does_not_wait():
+    chip = _Chip(BNO055.MODES["CONFIG"])
+    imu = _imu(chip)
+    chip.regs[0x35] = 0xFF
+    now = hostsim.clock.now_us()
+    # The first call only starts the change to NDOF
+    assert imu.get_status() == 0
+    assert hostsim.clock.now_us() - now < 1000
+    assert chip.modes[-1] == BNO055.MODES["NDOF"]
+    while imu.get_status() == 0:
+        assert hostsim.clock.now_us() - now < 1_000_000
+        hostsim.clock.advance(1000)
+    assert imu.status == 0xFF and imu.calibrated == 1
+    assert hostsim.clock.now_us() - now >= BNO055.OPR_SETTLE_MS * 1000
+
+
+def test_change_between_operating_modes_goes_through_config():
+    chip = _Chip()
+    imu = _imu(chip)
+    imu.change_mode("NDOF")
+    del chip.modes[:]
+    imu.request_mode("COMPASS")
+    while not imu.service():
+        hostsim.clock.advance(1000)
+    assert chip.modes == [BNO055.MODES["CONFIG"], BNO055.MODES["COMPASS"]]
+    assert imu.ready()
+
+
+def _calibrated(offsets):
+    '''!@brief              Makes a calibrated simulated chip in NDOF and its driver
+        @param              offsets The 22 bytes in the offset registers
+        @returns            The chip and the driver
+    '''
+    chip = _Chip(BNO055.MODES["CONFIG"])
+    imu = _imu(chip)
+    imu.change_mode("NDOF")
+    chip.regs[0x35] = 0xFF
+    chip.regs[0x55:0x6B] = offsets
+    while not imu.get_status():
+        hostsim.clock.advance(1000)
+    return chip, imu
+
+
+def test_calibration_round_trip(tmp_path):
+    path = str(tmp_path / "cal.bin")
+    chip, imu = _calibrated(bytes(range(22)))
+    assert imu.load_calibration(path) == BNO055.CAL_MISSING
+    assert imu.save_calibration(path)
+    chip.regs[0x55:0x6B] = bytes(22)
+    assert imu.load_calibration(path) == BNO055.CAL_OK
+    assert chip.regs[0x55:0x6B] == bytes(range(22))
+    assert not (tmp_path / "cal.bin.tmp").exists()
+
+
+def test_calibration_falls_back_to_backup(tmp_path, monkeypatch):
+    path = str(tmp_path / "cal.bin")
+    chip, imu = _calibrated(bytes(range(22)))
+    assert imu.save_calibration(path)
+    chip.regs[0x55:0x6B] = bytes(range(100, 122))
+    assert imu.save_calibration(path)
+    assert (tmp_path / "cal.bin.bak").read_bytes()[BNO055.CAL_OFFSETS:BNO055.CAL_OFFSETS + 22] == bytes(range(22))
+
+    # A reset after the old file became the backup but before the new one took its place
+    real_rename = BNO055.os.rename
+    def rename(src, dst):
+        if src.endswith(".tmp"):
+            raise OSError("reset")
+        real_rename(src, dst)
+    monkeypatch.setattr(BNO055.os, "rename", rename)
+    chip.regs[0x55:0x6B] = bytes(range(50, 72))
+    try:
+        imu.save_calibration(path)
+    except OSError:
+        pass
+    monkeypatch.undo()
+    assert not (tmp_path / "cal.bin").exists()
+    chip.regs[0x55:0x6B] = bytes(22)
+    assert imu.load_calibration(path) == BNO055.CAL_OK
+    assert chip.regs[0x55:0x6B] == bytes(range(100, 122))
+
+    # A damaged file is passed over for the backup too
+    (tmp_path / "cal.bin").write_bytes(b"BNOC" + bytes(BNO055.CAL_SIZE - 4))
+    assert imu.load_calibration(path) == BNO055.CAL_OK
+    (tmp_path / "cal.bin.bak").unlink()
+    assert imu.load_calibration(path) == BNO055.CAL_INVALID
@@ -0,0 +1,196 @@
+'''!@file                       test_fixed_point.py
+    @brief                      Tests of fixed_point.py against exact rational arithmetic
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import array
+import math
+import random
+from fractions import Fraction
+import pytest
+import ClosedLoop
+import fixed_point as fp
+'''!@package              Import array, math, random, Fraction, pytest, ClosedLoop, and fixed_point
+'''
+
+## Values which sit on the edges of the pieces mul() splits its operands into
+EDGES = (0, 1, 2, 0xFF, 0x100, 0xFFFF, 0x10000, 0x10001, 0x1FFFF, 0x7FFF0000,
+         fp.ONE, 3 * fp.ONE // 2, 100 * fp.ONE, 128 * fp.ONE, 16383 * fp.ONE,
+         fp.DIV_LIMIT - 1, fp.DIV_LIMIT, fp.MAX - 1, fp.MAX)
+
+
+def _values(n = 2000, seed = 1):
+    '''!@brief              Makes the edge values, their negatives, and random values across the whole range
+        @param              n Number of random values
+        @param              seed Seed for the random values
+        @returns            List of Q16.16 values
+    '''
+    rng = random.Random(seed)
+    values = [v for e in EDGES if e <= fp.MAX for v in (e, -e)]
+    # Both small values and ones near the limits, with every size in between
+    values += [rng.choice((-1, 1)) * (rng.getrandbits(rng.randint(1, 30)) & fp.MAX) for _ in range(n)]
+    return values
+
+
+def _exact(value):
+    '''!@brief              Rounds an exact result toward zero and saturates it, as fixed_point does
+        @param              value Fraction in Q16.16 units
+        @returns            The expected Q16.16 integer
+    '''
+    q = math.trunc(value)
+    return max(fp.MIN, min(fp.MAX, q))
+
+
+def test_add_sub():
+    values = _values(300)
+    for a in values:
+        for b in values[::7]:
+            assert fp.add(a, b) == _exact(Fraction(a + b))
+            assert fp.sub(a, b) == _exact(Fraction(a - b))
+
+
+def test_mul():
+    values = _values()
+    rng = random.Random(2)
+    for a in values:
+        for b in rng.sample(values, 40) + list(EDGES):
+            assert fp.mul(a, b) == _exact(Fraction(a * b, fp.ONE)), (a, b)
+
+
+def test_mul_saturates():
+    assert fp.mul(fp.MAX, fp.MAX) == fp.MAX
+    assert fp.mul(fp.MIN, fp.MAX) == fp.MIN
+    assert fp.mul(fp.MIN, fp.MIN) == fp.MAX
+    # 128 * 128 is exactly 16384, one past the largest value
+    assert fp.mul(128 * fp.ONE, 128 * fp.ONE) == fp.MAX
+    assert fp.mul(-128 * fp.ONE, 128 * fp.ONE) == fp.MIN
+    assert fp.mul(128 * fp.ONE, 128 * fp.ONE - 1) == 128 * (128 * fp.ONE - 1)
+
+
+def test_mul_rounds_toward_zero():
+    # 1.5 * 2^-16 is 1.5 units, which rounds to 1 and -1, not 1 and -2
+    assert fp.mul(3 * fp.ONE // 2, 1) == 1
+    assert fp.mul(-3 * fp.ONE // 2, 1) == -1
+    assert fp.mul(1, -3 * fp.ONE // 2) == -1
+    assert fp.mul(-1, 1) == 0
+
+
+def test_div():
+    values = _values()
+    rng = random.Random(3)
+    for a in values:
+        for b in rng.sample(values, 40) + [e for e in EDGES if e < fp.DIV_LIMIT]:
+            if b == 0 or abs(b) >= fp.DIV_LIMIT:
+                continue
+            assert fp.div(a, b) == _exact(Fraction(a * fp.ONE, b)), (a, b)
+
+
+def test_div_large_divisor():
+    # Divisors of 8192.0 and more are halved with the dividend, as documented
+    for a in _values(300):
+        for b in (fp.DIV_LIMIT, fp.DIV_LIMIT + 3, fp.MAX, -fp.MAX):
+            expected = Fraction((abs(a) >> 1) * fp.ONE, abs(b) >> 1)
+            assert fp.div(a, b) == _exact(expected if (a < 0) == (b < 0) else -expected), (a, b)
+
+
+def test_div_saturates_and_rounds():
+    assert fp.div(fp.MAX, 1) == fp.MAX
+    assert fp.div(fp.MAX, -1) == fp.MIN
+    assert fp.div(fp.ONE, 3 * fp.ONE) == 21845
+    # 1.0 divided by 3 * 2^-16 is far past MAX
+    assert fp.div(fp.ONE, 3) == fp.MAX
+    assert fp.div(-fp.ONE, 3) == fp.MIN
+    assert fp.div(-fp.ONE, 3 * fp.ONE) == -21845
+    assert fp.div(fp.ONE, -3 * fp.ONE) == -21845
+
+
+def test_div_by_zero():
+    assert fp.div(fp.ONE, 0) == fp.MAX
+    assert fp.div(-fp.ONE, 0) == fp.MIN
+    assert fp.div(0, 0) == fp.MAX
+    assert fp.ratio(5, 0) == fp.MAX
+    assert fp.ratio(-5, 0) == fp.MIN
+
+
+def test_ratio():
+    rng = random.Random(4)
+    for _ in range(20000):
+        num = rng.choice((-1, 1)) * (rng.getrandbits(rng.randint(1, 30)) & fp.MAX)
+        den = rng.choice((-1, 1)) * rng.randint(1, fp.DIV_LIMIT - 1)
+        assert fp.ratio(num, den) == _exact(Fraction(num * fp.ONE, den)), (num, den)
+    assert fp.ratio(-1, 3) == -21845
+    assert fp.ratio(-4, 3) == -(fp.ONE + 21845)
+
+
+def test_count_rate():
+    scale = fp.count_scale(60 / 16384)
+    # 1638 counts in 5 ms of a 16384 count per turn encoder is 1199.7 RPM
+    assert fp.count_rate(1638, 5000, scale) == _exact(Fraction(fp.ratio(1638 << 6, 5000) * scale, fp.ONE))
+    assert abs(fp.to_float(fp.count_rate(1638, 5000, scale)) - 1638 / 16384 * 60 / .005) < .01
+    assert fp.count_rate(-1638, 5000, scale) == -fp.count_rate(1638, 5000, scale)
+
+
+def test_conversions():
+    assert fp.from_float(1e9) == fp.MAX
+    assert fp.from_float(-1e9) == fp.MIN
+    assert fp.from_int(20000) == fp.MAX
+    assert fp.from_int(-3) == -3 * fp.ONE
+    assert fp.to_int(-3 * fp.ONE // 2) == -1
+    assert fp.to_int(3 * fp.ONE // 2) == 1
+    assert fp.to_float(fp.from_float(-2.25)) == -2.25
+
+
+def test_pid_proportional():
+    pid = fp.PID(2.5, 10.0)
+    assert pid.update(fp.from_float(4.0)) == fp.mul(fp.from_float(2.5), fp.from_float(6.0)) == fp.from_float(15.0)
+
+
+def test_pid_integral_and_anti_windup():
+    pid = fp.PID(1.0, 10.0, kI = 1.0, dt = 0.5, out_min = -3, out_max = 3)
+    # An error of 10 saturates the output, so the integral does not take it in
+    assert pid.update(0) == 3 * fp.ONE
+    assert pid.integral == 0
+    # Once the error changes sign the integral may move away from the limit again
+    assert pid.update(fp.from_int(12)) == -3 * fp.ONE
+    assert pid.integral == -fp.ONE
+    # The integral itself stops at its own limits
+    pid = fp.PID(0.0, 10.0, kI = 1.0, dt = 0.5, out_min = -3, out_max = 3)
+    assert pid.update(0) == 3 * fp.ONE
+    assert pid.integral == 3 * fp.ONE
+
+
+def test_pid_tracks_closed_loop():
+    args = dict(kI = 2.0, kD = 0.01, dt = 0.005, out_min = -100, out_max = 100, i_min = -50, i_max = 50,
+                d_alpha = 0.5)
+    ref = ClosedLoop.ClosedLoop(0.5, 60.0, **args)
+    pid = fp.PID(0.5, 60.0, **args)
+    rng = random.Random(5)
+    # A wheel speed which wanders smoothly, as a real one does, so the derivative stays in range
+    measured = 0.0
+    for _ in range(500):
+        measured += rng.uniform(-.5, .5)
+        out = fp.to_float(pid.update(fp.from_float(measured), fp.from_float(0.005)))
+        assert abs(out - ref.update(measured, 0.005)) < .05
+
+
+def test_kinematics():
+    r, L = .035, .141
+    kin = fp.Kinematics(r, L)
+    dest = array.array('i', [0, 0])
+    rng = random.Random(6)
+    for _ in range(2000):
+        v = fp.from_float(rng.uniform(-.5, .5))
+        omega = fp.from_float(rng.uniform(-6, 6))
+        kin.wheel_speeds_into(dest, v, omega)
+        turn = _exact(Fraction(kin.half_L * omega, fp.ONE))
+        assert dest[0] == _exact(Fraction((v - turn) * kin.inv_r, fp.ONE))
+        assert dest[1] == _exact(Fraction((v + turn) * kin.inv_r, fp.ONE))
+        assert abs(fp.to_float(dest[0]) - (fp.to_float(v) - L / 2 * fp.to_float(omega)) / r) < .01
+
+        omega_l, omega_r = dest[0], dest[1]
+        kin.twist_into(dest, omega_l, omega_r)
+        assert dest[0] == _exact(Fraction((omega_r + omega_l) * kin.r_half, fp.ONE))
+        assert dest[1] == _exact(Fraction((omega_r - omega_l) * kin.r_over_L, fp.ONE))
+        assert abs(fp.to_float(dest[0] - v)) < 1e-4 and abs(fp.to_float(dest[1] - omega)) < 1e-3
@@ -0,0 +1,88 @@
+'''!@file                       test_logger.py
+    @brief                      Tests of the binary log, from Logger through log_decode
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import io
+import struct
+import pytest
+import Logger
+import log_decode
+'''!@package              Import io, struct, pytest, Logger, and log_decode
+'''
+
+## One record of every message code, as task, a and b, then the text it should decode to; the
+## range is worked out the way QTR_Task does from HCSR04.last_cm(), which is a float
+RECORDS = {Logger.STATE: (Logger.TASK_QTR, 3, 0, "state 3"),
+           Logger.WALL_FLAGS: (Logger.TASK_QTR, 1, 2, "PREV: 1 Wall: 2"),
+           Logger.RANGE: (Logger.TASK_QTR, int((1020 / 2) / 29.1 * 10), 0, "range 175 mm"),
+           Logger.IMU_STATUS: (Logger.TASK_IMU, 0b11100111, 0, "MAG: 3 ACC: 1 GYR: 2 SYS: 3"),
+           Logger.IMU_CALIB_FILE: (Logger.TASK_IMU, 3, 0, "calibration file stale"),
+           Logger.IMU_COEFFS_SAVED: (Logger.TASK_IMU, 0, 0, "calibration coefficients saved"),
+           Logger.IMU_NORTH: (Logger.TASK_IMU, -2, 0, "FACING NORTH (kinda), mag y -2"),
+           Logger.IMU_MODE: (Logger.TASK_IMU, 12, 0, "mode 12")}
+
+
+def _decode(out):
+    '''!@brief              Decodes everything a logger wrote
+        @param              out BytesIO the logger wrote to
+        @returns            List of lines, each without its timestamp
+    '''
+    out.seek(0)
+    return [line.split(None, 1)[1] for line in log_decode.read_log(out)]
+
+
+def test_every_message_has_a_record():
+    assert set(RECORDS) == set(log_decode.MESSAGES)
+
+
+@pytest.mark.parametrize("code", sorted(RECORDS))
+def test_message_round_trip(code):
+    task, a, b, text = RECORDS[code]
+    out = io.BytesIO()
+    log = Logger.Logger(out, level = Logger.DEBUG)
+    log.debug(task, code, a, b)
+    log.flush()
+    assert _decode(out) == ["{:5} {:5} {}".format("DEBUG", log_decode.TASKS[task], text)]
+
+
+def test_all_messages_in_one_log():
+    out = io.BytesIO()
+    log = Logger.Logger(out, depth = len(RECORDS), level = Logger.DEBUG)
+    for code, (task, a, b, text) in RECORDS.items():
+        log.debug(task, code, a, b)
+    assert log.flush() == len(RECORDS)
+    assert _decode(out) == ["{:5} {:5} {}".format("DEBUG", log_decode.TASKS[task], text)
+                            for task, a, b, text in RECORDS.values()]
+
+
+def test_float_argument_is_refused():
+    log = Logger.Logger(io.BytesIO(), level = Logger.DEBUG)
+    # Arguments are packed as integers, so a float from a sensor must be scaled first
+    with pytest.raises(struct.error):
+        log.debug(Logger.TASK_QTR, Logger.RANGE, 17.5)
+
+
+def test_run_flushes_one_batch_per_run():
+    out = io.BytesIO()
+    log = Logger.Logger(out, depth = 16, level = Logger.INFO, batch = 4)
+    for i in range(10):
+        log.info(Logger.TASK_QTR, Logger.STATE, i)
+    log.debug(Logger.TASK_QTR, Logger.STATE, 99)
+    task = log.run()
+    assert next(task) == 6
+    assert next(task) == 2
+    assert next(task) == 0
+    assert _decode(out) == ["INFO  QTR   state {}".format(i) for i in range(10)]
+
+
+def test_ring_overwrites_oldest():
+    out = io.BytesIO()
+    log = Logger.Logger(out, depth = 4)
+    for i in range(6):
+        log.info(Logger.TASK_UI, Logger.STATE, i)
+    assert log.dropped == 2 and log.pending() == 4
+    log.flush()
+    assert _decode(out) == ["INFO  UI    state {}".format(i) for i in range(2, 6)]
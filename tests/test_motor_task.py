@@ -0,0 +1,87 @@
+'''!@file                       test_motor_task.py
+    @brief                      Tests of the motor task's command handling
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import io
+from task_share import Queue, Share
+import Motor_Task
+'''!@package              Import io, Queue, Share, and Motor_Task
+'''
+
+
+class _Motor:
+
+    def __init__(self):
+        '''!@brief              Constructs a motor which remembers its duty cycle
+        '''
+        self.duty = 0
+
+    def set_duty(self, duty):
+        '''!@brief              Sets the duty cycle
+            @param              duty Duty cycle in percent
+        '''
+        self.duty = duty
+
+    def enable(self):
+        '''!@brief              Enables the motor, which does nothing here
+        '''
+        pass
+
+
+class _Encoder:
+
+    def update(self, now_us = None):
+        '''!@brief              Takes a sample, which does nothing here
+            @param              now_us Time of the sample
+        '''
+        pass
+
+
+def _task():
+    '''!@brief              Makes a motor task with its shares and command queue
+        @returns            The task, its run generator, the gain and setpoint shares, and the queue
+    '''
+    gain = Share('f')
+    sp = Share('f')
+    gain.put(0.5)
+    sp.put(0.0)
+    commands = Queue('B', 8)
+    task = Motor_Task.Motor_Task(_Motor(), _Motor(), _Encoder(), _Encoder(), Share('f'), Share('h'),
+                                 sp, gain, commands, ser = io.BytesIO(), uart = io.BytesIO())
+    return task, task.run(), gain, sp, commands
+
+
+def test_gain_and_setpoint_entered_in_open_loop_apply_on_closing():
+    task, run, gain, sp, commands = _task()
+    # 'k' and 's' are only taken in closed loop, so these are not acted on yet
+    gain.put(2.0)
+    sp.put(60.0)
+    commands.try_put(ord('k'))
+    assert next(run) == 11
+    commands.try_put(ord('s'))
+    next(run)
+    assert task.closedloops[0].kP == 0.5
+
+    commands.try_put(ord('c'))
+    assert next(run) == 31
+    assert task.closedloops[0].kP == 2.0
+    assert task.closedloops[0].sp == 60.0
+    # Motor B is still in open loop with its old gain
+    assert task.closedloops[1].kP == 0.5
+
+
+def test_gain_and_setpoint_commands_in_closed_loop():
+    task, run, gain, sp, commands = _task()
+    commands.try_put(ord('C'))
+    assert next(run) == 13
+    gain.put(1.5)
+    commands.try_put(ord('K'))
+    next(run)
+    sp.put(-30.0)
+    commands.try_put(ord('S'))
+    next(run)
+    assert task.closedloops[1].kP == 1.5
+    assert task.closedloops[1].sp == -30.0
@@ -0,0 +1,116 @@
+'''!@file                       test_qtr_task.py
+    @brief                      Tests of the timed maneuvers of the line following state machine
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import hostsim
+import QTRSensorArray as QTRA
+import QTR_Task
+'''!@package              Import hostsim, QTRSensorArray, and QTR_Task
+'''
+
+
+class _Sensors:
+
+    def __init__(self):
+        '''!@brief              Constructs line sensors whose readings the test sets
+        '''
+        self.states = {QTRA.LEFT: 3, QTRA.FRONT: 3, QTRA.RIGHT: 3}
+
+    def see(self, state):
+        '''!@brief              Makes every sensor read the same
+            @param              state 0 for all black, 3 for all white
+        '''
+        for side in self.states:
+            self.states[side] = state
+
+    def read(self):
+        '''!@brief              Takes a reading, which here does nothing
+        '''
+        pass
+
+    def line_state(self, side):
+        '''!@brief              Gets the line state of one sensor
+            @param              side LEFT, FRONT or RIGHT
+            @returns            The line state set by see()
+        '''
+        return self.states[side]
+
+
+class _Drive:
+
+    def __init__(self):
+        '''!@brief              Constructs a drivetrain which remembers its last command
+        '''
+        self.duty = None
+
+    def set_wheels(self, omega_l, omega_r):
+        '''!@brief              Takes wheel speeds from the line follower
+            @param              omega_l Left wheel speed
+            @param              omega_r Right wheel speed
+        '''
+        self.duty = None
+
+    def set_duty(self, left, right):
+        '''!@brief              Takes duty cycles from a maneuver
+            @param              left Left duty cycle
+            @param              right Right duty cycle
+        '''
+        self.duty = (left, right)
+
+    def disable(self):
+        '''!@brief              Stops the wheels
+        '''
+        self.duty = (0, 0)
+
+
+class _Sonar:
+
+    def trigger_pulse(self):
+        '''!@brief              Starts a ranging, which never finds a wall here
+        '''
+        pass
+
+    def valid(self):
+        '''!@brief              Checks for an echo
+            @returns            False, as nothing is in range
+        '''
+        return False
+
+
+def test_finish_after_wall_drives_into_the_box():
+    sensors = _Sensors()
+    drive = _Drive()
+    task = QTR_Task.QTR_Task(sensors, drive, _Sonar())
+    gen = task.run()
+    task.wall = 1
+
+    # Cross the black finish line once the wall is behind
+    sensors.see(0)
+    assert next(gen) == 1
+    assert next(gen) == 0
+    hostsim.clock.advance(5_000_000)
+    # The box is timed from the moment the finish is seen
+    assert next(gen) == 7
+    assert drive.duty == (12, 12)
+    hostsim.clock.advance(1_900_000)
+    assert next(gen) == 7
+    hostsim.clock.advance(200_000)
+    assert next(gen) == 8
+    assert drive.duty == (0, 0)
+    hostsim.clock.advance(4_300_000)
+    assert next(gen) == 0
+
+
+def test_timed_state_has_a_start_time():
+    drive = _Drive()
+    task = QTR_Task.QTR_Task(_Sensors(), drive, _Sonar())
+    gen = task.run()
+    # A timed state reached before any other has set its start runs from construction
+    task.state = 9
+    assert next(gen) == 9
+    assert drive.duty == (-20, 20)
+    hostsim.clock.advance(2_000_000)
+    assert next(gen) == 10
@@ -0,0 +1,87 @@
+'''!@file                       test_scheduler.py
+    @brief                      Tests of the scheduler's priorities and deadline statistics on the virtual clock
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import hostsim
+import scheduler
+'''!@package              Import hostsim and scheduler
+'''
+
+
+def _body(log, name, run_us = 0):
+    '''!@brief              Makes the body of a task which notes each run and takes a set time
+        @param              log List which gets the name of the task at each run
+        @param              name Name to note
+        @param              run_us Virtual time each run takes, in microseconds
+        @returns            Generator function for scheduler.Task
+    '''
+    def run():
+        while True:
+            log.append(name)
+            hostsim.clock.advance(run_us)
+            yield 0
+    return run
+
+
+def test_missed_deadlines():
+    log = []
+    tasks = scheduler.TaskList()
+    # Every third run takes 15 ms of a 10 ms period
+    slow = scheduler.Task(_body(log, "slow"), period = 10)
+    tasks.append(slow)
+    def run():
+        n = 0
+        while True:
+            n += 1
+            hostsim.clock.advance(15_000 if n % 3 == 0 else 1_000)
+            yield 0
+    task = scheduler.Task(run, name = "late", period = 10)
+    tasks.append(task)
+    tasks.run_for(300)
+
+    stats = task.stats
+    assert stats[scheduler.MISSES] == stats[scheduler.RUNS] // 3
+    assert stats[scheduler.MAX_RUN_US] == 15_000
+    assert stats[scheduler.MAX_LATENCY_US] > 10_000
+    assert slow.stats[scheduler.MISSES] == 0
+    assert "late" in repr(tasks)
+
+    tasks.reset_profile()
+    assert task.stats[scheduler.RUNS] == 0 and task.stats[scheduler.MISSES] == 0
+
+
+def test_on_time_task_misses_nothing():
+    log = []
+    tasks = scheduler.TaskList()
+    task = scheduler.Task(_body(log, "a", 2_000), period = 10)
+    tasks.append(task)
+    tasks.run_for(1000)
+    assert task.stats[scheduler.RUNS] == 100
+    assert task.stats[scheduler.MISSES] == 0
+    assert task.stats[scheduler.MAX_JITTER_US] == 0
+
+
+def test_priority_groups_take_turns_independently():
+    log = []
+    tasks = scheduler.TaskList()
+    high = [scheduler.Task(_body(log, n), priority = 2) for n in "XY"]
+    low = [scheduler.Task(_body(log, n), priority = 1) for n in "abc"]
+    for task in high + low:
+        tasks.append(task)
+
+    for step in range(12):
+        for task in low:
+            task.go()
+        # Now and then one high priority task is ready, and runs first
+        if step % 4 == 0:
+            high[step // 4 % 2].go()
+            assert tasks.pri_sched()
+        assert tasks.pri_sched()
+
+    # Runs of the high priority group do not move the low priority group's turn
+    assert [n for n in log if n in "abc"] == list("abc" * 4)
+    assert [n for n in log if n in "XY"] == list("XYX")
+    assert all(0 <= i < 3 for i in tasks._rr_idx.values())
@@ -0,0 +1,266 @@
+'''!@file                       test_task_share.py
+    @brief                      Tests of the queues and shares in task_share.py
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import array
+import pytest
+import pyb
+import Output_Task
+import task_share
+'''!@package              Import array, pytest, pyb, Output_Task, and task_share
+'''
+
+
+def _contents(q):
+    '''!@brief              Empties a queue one item at a time
+        @param              q The queue
+        @returns            List of the items, oldest first
+    '''
+    items = []
+    while q.any():
+        items.append(q.try_get())
+    return items
+
+
+def test_try_put_and_try_get():
+    q = task_share.Queue('h', 3, thread_protect = True)
+    assert q.try_get() is None
+    assert q.try_get(-1) == -1
+    assert q.try_put(1) and q.try_put(2) and q.try_put(3)
+    assert not q.try_put(4)
+    assert q.full()
+    assert _contents(q) == [1, 2, 3]
+    assert q.empty()
+    # Interrupts are enabled again afterwards
+    assert pyb.disable_irq()
+    pyb.enable_irq()
+
+
+def test_try_put_overwrites_oldest():
+    q = task_share.Queue('h', 3, overwrite = True)
+    for i in range(5):
+        assert q.try_put(i)
+    assert q.num_in() == 3
+    assert _contents(q) == [2, 3, 4]
+
+
+def test_try_put_wraps_around():
+    q = task_share.Queue('h', 4)
+    for i in range(10):
+        assert q.try_put(i)
+        assert q.try_get() == i
+    for i in range(4):
+        q.try_put(i)
+    assert _contents(q) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("start", range(5))
+def test_put_many_and_get_into_wrap_around(start):
+    q = task_share.Queue('h', 5, thread_protect = True)
+    # Move both indices to start, so the block is split across the end of the buffer
+    for i in range(start):
+        q.try_put(0)
+        q.try_get()
+    assert q.put_many(array.array('h', [10, 11, 12, 13])) == 4
+    out = array.array('h', [0] * 5)
+    assert q.get_into(out) == 4
+    assert list(out[:4]) == [10, 11, 12, 13]
+    assert q.empty()
+
+
+def test_put_many_partial_when_full():
+    q = task_share.Queue('B', 4)
+    assert q.put_many(b"ab") == 2
+    # Only the first two bytes of the block fit
+    assert q.put_many(b"cdef") == 2
+    assert q.put_many(b"g") == 0
+    assert bytes(_contents(q)) == b"abcd"
+
+
+def test_put_many_overwrite():
+    q = task_share.Queue('B', 4, overwrite = True)
+    q.put_many(b"abc")
+    # Room is made by dropping the oldest bytes
+    assert q.put_many(b"de") == 2
+    assert bytes(_contents(q)) == b"bcde"
+    # A block larger than the whole queue leaves only its newest bytes
+    q.put_many(b"xy")
+    assert q.put_many(b"123456") == 4
+    assert bytes(_contents(q)) == b"3456"
+
+
+def test_get_into_partial_when_empty():
+    q = task_share.Queue('B', 8)
+    buf = bytearray(6)
+    assert q.get_into(buf) == 0
+    q.put_many(b"xyz")
+    assert q.get_into(buf) == 3
+    assert buf[:3] == b"xyz"
+    # A slice of the buffer limits how much is taken
+    q.put_many(b"12345")
+    assert q.get_into(memoryview(buf)[:2]) == 2
+    assert bytes(_contents(q)) == b"345"
+
+
+def test_max_full():
+    q = task_share.Queue('B', 4)
+    q.put_many(b"abc")
+    q.get_into(bytearray(3))
+    q.put_many(b"d")
+    assert q._max_full == 3
+    q.put_many(b"efghij")
+    assert q._max_full == 4
+    assert "Max Full 4/4" in repr(q)
+    q.clear()
+    assert q._max_full == 0
+
+
+class _Port:
+
+    def __init__(self, accept):
+        '''!@brief              Constructs a serial port which takes a set number of bytes per write
+            @param              accept Most bytes taken per write
+        '''
+        self.accept = accept
+        self.data = bytearray()
+
+    def write(self, data):
+        '''!@brief              Takes as many bytes as the port accepts
+            @param              data Bytes to write
+            @returns            Number of bytes taken
+        '''
+        taken = bytes(data[:self.accept])
+        self.data += taken
+        return len(taken)
+
+
+def test_output_channel_counts_dropped_blocks():
+    port = _Port(100)
+    ch = Output_Task.OutputChannel(port, size = 8, budget = 4, policy = Output_Task.DROP_BLOCK)
+    assert ch.write("abcdef") == 6
+    assert ch.write("ghi") == 0
+    assert (ch.dropped, ch.drops) == (3, 1)
+    while ch.drain():
+        pass
+    assert port.data == b"abcdef"
+    assert ch.written == 6 and ch.pending() == 0
+
+
+def test_output_channel_drop_tail_and_oldest():
+    ch = Output_Task.OutputChannel(_Port(100), size = 8, budget = 4, policy = Output_Task.DROP_TAIL)
+    ch.write("abcdef")
+    assert ch.write("ghij") == 2
+    assert (ch.dropped, ch.drops) == (2, 1)
+
+    port = _Port(100)
+    ch = Output_Task.OutputChannel(port, size = 8, budget = 8, policy = Output_Task.DROP_OLDEST)
+    ch.write("abcdef")
+    assert ch.write("ghij") == 4
+    assert (ch.dropped, ch.drops) == (2, 1)
+    ch.drain()
+    assert port.data == b"cdefghij"
+
+
+def test_output_channel_keeps_unsent_bytes():
+    port = _Port(3)
+    ch = Output_Task.OutputChannel(port, size = 16, budget = 8)
+    ch.write("0123456789")
+    assert ch.drain() == 3
+    assert ch.pending() == 7
+    while ch.drain():
+        pass
+    assert port.data == b"0123456789"
+
+
+class _Interrupted(array.array):
+
+    def __setitem__(self, index, value):
+        '''!@brief              Copies into the array, running an "interrupt" at the first copy
+            @param              index Index or slice
+            @param              value Values to copy
+        '''
+        super().__setitem__(index, value)
+        isr, self.isr = self.isr, None
+        if isr:
+            isr()
+
+
+def test_record_share_snapshot():
+    rec = task_share.RecordShare('f', 3)
+    dest = array.array('f', [0.0] * 3)
+    rec.put((1.0, 2.0, 3.0))
+    assert rec.get_into(dest)
+    assert list(dest) == [1.0, 2.0, 3.0]
+    rec.put_field(1, 5.0)
+    assert rec.get(1) == 5.0
+    assert rec.sequence() == 4
+    assert rec._collisions == 0
+
+
+def test_record_share_retries_after_write_during_copy():
+    rec = task_share.RecordShare('h', 3)
+    rec.put((1, 2, 3))
+    # A write lands between the reader's two looks at the sequence counter
+    dest = _Interrupted('h', [0] * 3)
+    dest.isr = lambda: rec.put((4, 5, 6))
+    assert rec.get_into(dest)
+    assert list(dest) == [4, 5, 6]
+    assert rec._collisions == 1
+
+    # Without retries the reader reports the torn copy
+    dest.isr = lambda: rec.put((7, 8, 9))
+    assert not rec.get_into(dest, retries = 0)
+    assert rec._collisions == 2
+    assert rec.get_into(dest, retries = 0)
+    assert list(dest) == [7, 8, 9]
+
+
+class _Values:
+
+    def __init__(self, values, isr):
+        '''!@brief              Constructs values for put() which run an "interrupt" partway through the write
+            @param              values Values of the fields
+            @param              isr Function run when the second field is read
+        '''
+        self.values = values
+        self.isr = isr
+
+    def __getitem__(self, index):
+        '''!@brief              Gets a field's value
+            @param              index Field number
+            @returns            The value
+        '''
+        if index == 1:
+            self.isr()
+        return self.values[index]
+
+
+def test_record_share_reader_during_write():
+    rec = task_share.RecordShare('h', 3)
+    rec.put((1, 2, 3))
+    dest = array.array('h', [0] * 3)
+    results = []
+    # An ISR reading in the middle of a write sees the odd counter and gives up
+    rec.put(_Values((4, 5, 6), lambda: results.append(rec.get_into(dest, retries = 2))))
+    assert results == [False]
+    assert rec._collisions == 3
+    assert rec.get_into(dest)
+    assert list(dest) == [4, 5, 6]
+
+
+def test_record_share_counters_wrap():
+    rec = task_share.RecordShare('h', 2)
+    rec._seq = task_share.COUNTER_MASK - 1
+    rec._collisions = task_share.COUNTER_MASK
+    rec.put((1, 2))
+    assert rec.sequence() == 0
+    dest = array.array('h', [0, 0])
+    assert rec.get_into(dest) and list(dest) == [1, 2]
+    dest = _Interrupted('h', [0, 0])
+    dest.isr = lambda: rec.put_field(0, 3)
+    assert rec.get_into(dest)
+    assert rec._collisions == 0
+    assert rec.sequence() == 2
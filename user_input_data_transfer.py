@@ -9,14 +9,13 @@
 from pyb import UART, repl_uart
 import pyb
 from task_share import Queue, Share
-import cotask
 
-'''!@package              Import pyb, shares, queues, and cotask
+'''!@package              Import pyb, shares, and queues
 '''
 
 class user_input_data_transfer: #template developed by instructor
     
-    def __init__(self, let: Share, oc: Share, dc: Share, gn: Share, sp: Share): #idk what we need to write too/UART, this modulae only sends out
+    def __init__(self, let: Share, oc: Share, dc: Share, gn: Share, sp: Share, events: Queue = None, out = None): #idk what we need to write too/UART, this modulae only sends out
         '''!@brief              Constructs a UI object
             @details            Initializes the serial comminication and data inputs
             @param              let Share for the letter command
@@ -24,23 +23,36 @@ class user_input_data_transfer: #template developed by instructor
             @param              dc Share for the duty cycle value
             @param              gn Share for the closed loop gain
             @param              sp Share for the velocity setpoint
+            @param              events Queue which gets each command's letter once the command and
+                                its value, if any, have been entered, or None
+            @param              out Where the menu and echoes are written, such as an Output_Task
+                                channel, or None to write straight to the USB serial port
         '''
         
         ## A UART obejct to write data to
         self._ser = pyb.USB_VCP() # Keep a reference to the UART for data comms
+        self._out = self._ser if out is None else out # Commands are read from _ser and written to _out
         
         self._let = let # for chars
         self._dc = dc #for floats
         self._gn = gn #for floats
         self._sp = sp #for floats
         self._oc = oc #open loop to start
+        self._events = events
         
         self.num = 0
         
         ## The present state of the task
         self._state = 0
         
-            
+    def _send(self, letter):
+        '''!@brief          Passes a completed command on to the tasks waiting for events
+            @details        If the queue is full the command is dropped rather than waited for
+            @param          letter Character code of the command
+        '''
+        if self._events is not None:
+            self._events.try_put(letter)
+        
         
     def run(self):
         '''!@brief          UI Task implementation as a generator function
@@ -59,52 +71,43 @@ class user_input_data_transfer: #template developed by instructor
                 cnt = 0
                 self.num = 0.0
                 
-                self._ser.write("Here is your menu of commands:\n\r")
-                self._ser.write("Lowercase = Motor 1, Uppercase = Motor 2\n\r")
-                self._ser.write("Ex. 'z' will zero out motor 1, 'Z' will zero motor 2\n\n\r")
+                self._out.write("Here is your menu of commands:\n\r")
+                self._out.write("Lowercase = Motor 1, Uppercase = Motor 2\n\r")
+                self._out.write("Ex. 'z' will zero out motor 1, 'Z' will zero motor 2\n\n\r")
                 
-                self._ser.write("For Open-loop mode\n\r")
-                self._ser.write("Z - Zero encoder position\n\r")
-                self._ser.write("P - Print encoder position\n\r")
-                self._ser.write("D - Print encoder delta\n\r")
-                self._ser.write("V - Print encoder velocity\n\r")
-                self._ser.write("M - Change duty cycle\n\r")
-                self._ser.write("G - Plot 30 sec speed and position (OL)\n\r")
-                self._ser.write("C - Switch to close-loop mode\n\r")
+                self._out.write("For Open-loop mode\n\r")
+                self._out.write("Z - Zero encoder position\n\r")
+                self._out.write("P - Print encoder position\n\r")
+                self._out.write("D - Print encoder delta\n\r")
+                self._out.write("V - Print encoder velocity\n\r")
+                self._out.write("M - Change duty cycle\n\r")
+                self._out.write("G - Plot 30 sec speed and position (OL)\n\r")
+                self._out.write("C - Switch to close-loop mode\n\r")
                 
-                self._ser.write("A - Display Euler Angles\n\r")
-                self._ser.write("B - Display Angular Velocity\n\r")
-                self._ser.write("N - Pivot North")
+                self._out.write("A - Display Euler Angles\n\r")
+                self._out.write("B - Display Angular Velocity\n\r")
+                self._out.write("N - Pivot North")
                 
                 
-                self._ser.write("For Close-loop mode\n\r")
-                self._ser.write("K - Change close-loop gain\n\r")
-                self._ser.write("S - Choose velocity setpoint\n\r")
-                self._ser.write("R - Plot step response\n\r")
-                self._ser.write("O - Switch to open-loop mode\n\r")
+                self._out.write("For Close-loop mode\n\r")
+                self._out.write("K - Change close-loop gain\n\r")
+                self._out.write("S - Choose velocity setpoint\n\r")
+                self._out.write("R - Plot step response\n\r")
+                self._out.write("O - Switch to open-loop mode\n\r")
                 
-                self._ser.write("E - Display Euler Angles\n\r")
-                self._ser.write("F - Display Angular Velocity\n\r")
+                self._out.write("E - Display Euler Angles\n\r")
+                self._out.write("F - Display Angular Velocity\n\r")
                 
                 self._state = 1
                              
-                print("letter: ")
-                print(self._let.get())
-                print("\n\r")
-                print("dc: ")
-                print(self._dc.get())
-                print("\n\r")
-                print("gn: ")
-                print(self._gn.get())
-                print("\n\r")
-                print("sp: ")
-                print(self._sp.get())
-                print("\n\r")
-                print("OC_FLG: ")
-                print(self._oc.get())
-                print("\n\r")
+                # Current settings, through the output channel like the rest of the menu
+                self._out.write("letter: {}\n\r".format(self._let.get()))
+                self._out.write("dc: {}\n\r".format(self._dc.get()))
+                self._out.write("gn: {}\n\r".format(self._gn.get()))
+                self._out.write("sp: {}\n\r".format(self._sp.get()))
+                self._out.write("OC_FLG: {}\n\r".format(self._oc.get()))
                
-                self._ser.write("Enter your command here: ")
+                self._out.write("Enter your command here: ")
                 
             elif self._state == 1:
                 # Run state 1 - prompt user for response, if invalid repeat again
@@ -118,14 +121,14 @@ class user_input_data_transfer: #template developed by instructor
                         if (self._oc.get() == 0): #valid open loop cmds
                             if (char.lower() in {"z", "p", "d", "v", "m", "g", "c", "a", "b", "n"}):
                                 str1 = str1 + char
-                                self._ser.write(char) #echo
+                                self._out.write(char) #echo
                                 self._state = 1
                             else:
                                 self._state = 0 # print menu and prompt again 
                         elif (self._oc.get() == 1): #valid close loop cmds
                             if (char.lower() in {"k", "s", "r", "o", "e", "f"}):
                                 str1 = str1 + char
-                                self._ser.write(char) #echo
+                                self._out.write(char) #echo
                                 self._state = 1
                             else:
                                 self._state = 0 # print menu and prompt again 
@@ -138,7 +141,7 @@ class user_input_data_transfer: #template developed by instructor
                             self._state = 0 # print menu and prompt again
                         else: #can fully delete entry only
                             if (cnt > 0): 
-                                self._ser.write(char) #delete
+                                self._out.write(char) #delete
                                 str1 = str1[:-1] # remove last character appended, no echo
                                 cnt = cnt - 2 #account for the backspace and removed char
                                 self._state = 1
@@ -160,29 +163,32 @@ class user_input_data_transfer: #template developed by instructor
                             
                             if((self._let.get() == ord('O')) | (self._let.get() == ord('o'))): # may have to deal with a switch?
                                 self._oc.put(0) #0 means open loop
+                                self._send(self.num)
                                 self._state = 0 # print menu and prompt again
                             elif((self._let.get() == ord('C')) | (self._let.get() == ord('c'))):
                                 self._oc.put(1) #1 means close loop
+                                self._send(self.num)
                                 self._state = 0 # print menu and prompt again                 
                             elif((self._let.get() == ord('M')) | (self._let.get() == ord('m'))): #check for m
-                                self._ser.write("\n\rEnter your value here: ")
+                                self._out.write("\n\rEnter your value here: ")
                                 cnt = 0 #reset for new entry
                                 str1 = ""
                                 str2 = ""
                                 self._state = 2
                             elif((self._let.get() == ord('K')) | (self._let.get() == ord('k'))): #check for k
-                                self._ser.write("\n\rEnter your value here: ")
+                                self._out.write("\n\rEnter your value here: ")
                                 cnt = 0 #reset for new entry
                                 str1 = ""
                                 str2 = ""
                                 self._state = 3
                             elif((self._let.get() == ord('S')) | (self._let.get() == ord('s'))): #check for s
-                                self._ser.write("\n\rEnter your value here: ")
+                                self._out.write("\n\rEnter your value here: ")
                                 cnt = 0 #reset for new entry
                                 str1 = ""
                                 str2 = ""
                                 self._state = 4
                             else:
+                                self._send(self.num) # needs no value, complete now
                                 self._state = 0 # print menu and prompt again
                         
             
@@ -193,16 +199,16 @@ class user_input_data_transfer: #template developed by instructor
                     cnt = cnt + 1
                     if (char.isdigit() == True):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 2 
                     elif (char == '.'):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 2
                     elif (char == '-'):
                          if (cnt == 1):
                              str1 = str1 + char
-                             self._ser.write(char) #echo
+                             self._out.write(char) #echo
                              self._state = 2
                          else: # mistake
                              self._state = 0 # print menu and prompt again
@@ -211,7 +217,7 @@ class user_input_data_transfer: #template developed by instructor
                             self._state = 0 # print menu and prompt again
                         else: #can fully delete entry only
                             if (cnt > 0):
-                                self._ser.write(char) #delete
+                                self._out.write(char) #delete
                                 str1 = str1[:-1] # remove last character appended, no echo
                                 cnt = cnt - 2 #account for the backspace and removed char
                                 self._state = 2
@@ -242,6 +248,7 @@ class user_input_data_transfer: #template developed by instructor
                                 self.num = -100
                                     
                             self._dc.put(self.num) #modify the output
+                            self._send(self._let.get()) # the command is complete with its value
                             self._state = 0
                     else: # no letters allowed
                         self._state = 0
@@ -252,16 +259,16 @@ class user_input_data_transfer: #template developed by instructor
                     cnt = cnt + 1
                     if (char.isdigit() == True):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 3 
                     elif (char == '.'):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 3
                     elif (char == '-'):
                          if (cnt == 1):
                              str1 = str1 + char
-                             self._ser.write(char) #echo
+                             self._out.write(char) #echo
                              self._state = 3
                          else: # mistake
                              self._state = 0 # print menu and prompt again
@@ -270,7 +277,7 @@ class user_input_data_transfer: #template developed by instructor
                             self._state = 0 # print menu and prompt again
                         else: #can fully delete entry only
                             if (cnt > 0):
-                                self._ser.write(char) #delete
+                                self._out.write(char) #delete
                                 str1 = str1[:-1] # remove last character appended, no echo
                                 cnt = cnt - 2 #account for the backspace and removed char
                                 self._state = 3
@@ -296,6 +303,7 @@ class user_input_data_transfer: #template developed by instructor
                         else: #valid digit/float
                             self.num = float(str1) 
                             self._gn.put(self.num) #modify the output
+                            self._send(self._let.get()) # the command is complete with its value
                             self._state = 0
                     else: # no letters allowed
                         self._state = 0
@@ -306,16 +314,16 @@ class user_input_data_transfer: #template developed by instructor
                     cnt = cnt + 1
                     if (char.isdigit() == True):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 4 
                     elif (char == '.'):
                         str1 = str1 + char
-                        self._ser.write(char) #echo
+                        self._out.write(char) #echo
                         self._state = 4
                     elif (char == '-'):
                          if (cnt == 1):
                              str1 = str1 + char
-                             self._ser.write(char) #echo
+                             self._out.write(char) #echo
                              self._state = 4
                          else: # mistake
                              self._state = 0 # print menu and prompt again
@@ -324,7 +332,7 @@ class user_input_data_transfer: #template developed by instructor
                             self._state = 0 # print menu and prompt again
                         else: #can fully delete entry only
                             if (cnt > 0):
-                                self._ser.write(char) #delete
+                                self._out.write(char) #delete
                                 str1 = str1[:-1] # remove last character appended, no echo
                                 cnt = cnt - 2 #account for the backspace and removed char
                                 self._state = 4
@@ -355,6 +363,7 @@ class user_input_data_transfer: #template developed by instructor
                                 self.num = -250
                                     
                             self._sp.put(self.num) #modify the output
+                            self._send(self._let.get()) # the command is complete with its value
                             self._state = 0
                     else: # no letters allowed
                         self._state = 0
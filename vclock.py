@@ -0,0 +1,185 @@
+'''!@file                       vclock.py
+    @brief                      A virtual clock with the MicroPython ticks API
+    @details                    Provides ticks_us(), ticks_ms(), ticks_diff(), ticks_add() and the
+                                sleep functions with the same wrap-around behavior as MicroPython's
+                                time module, but driven by a counter which only moves when it is
+                                told to. This lets the scheduler and the tasks run on a PC, faster
+                                than real time and with repeatable timing.
+
+                                Functions can be scheduled to run at a virtual time with call_at() or
+                                call_after(). They run in time order whenever the clock passes them,
+                                including during the sleep functions, so simulated hardware such as
+                                timer interrupts and echo pulses happens at the right moment
+                                relative to the code which is waiting for it.
+    @author                     Andrew Whitacre
+                                Drake Small
+    @date                       October 18, 2026
+'''
+
+import heapq
+'''!@package              Import heapq
+'''
+
+## Ticks wrap around at this value, as on a 32-bit MicroPython port
+TICKS_PERIOD = 1 << 30
+
+## Mask used to wrap tick values
+TICKS_MAX = TICKS_PERIOD - 1
+
+## Half of the tick period, the largest difference ticks_diff() can express
+TICKS_HALF = TICKS_PERIOD // 2
+
+
+class VirtualClock:
+
+    def __init__(self, start_us = 0):
+        '''!@brief              Constructs a virtual clock
+            @details            The clock holds an absolute time in microseconds which never wraps;
+                                only the values returned by the ticks functions wrap
+            @param              start_us Initial absolute time in microseconds
+        '''
+        self._us = start_us
+        self._events = []       # heap of (time, sequence number, function, argument)
+        self._seq = 0
+        self._cancelled = set()
+
+    def reset(self, start_us = 0):
+        '''!@brief              Sets the time back and forgets every scheduled function
+            @details            Used to start a new simulation with the same clock object, which
+                                code that has already imported the ticks functions keeps using
+            @param              start_us New absolute time in microseconds
+        '''
+        self._us = start_us
+        self._events = []
+        self._cancelled = set()
+
+    def call_at(self, when_us, fun, arg = None):
+        '''!@brief              Schedules a function to run when the clock reaches a time
+            @details            Functions due at the same time run in the order they were scheduled.
+                                A function may schedule more functions, including itself again.
+            @param              when_us Absolute time in microseconds; times already past run on
+                                the next advance
+            @param              fun Function taking one argument
+            @param              arg Argument passed to fun
+            @returns            Handle which can be given to cancel()
+        '''
+        self._seq += 1
+        heapq.heappush(self._events, (when_us, self._seq, fun, arg))
+        return self._seq
+
+    def call_after(self, delay_us, fun, arg = None):
+        '''!@brief              Schedules a function to run after a delay, see call_at()
+            @param              delay_us Microseconds from now
+            @param              fun Function taking one argument
+            @param              arg Argument passed to fun
+            @returns            Handle which can be given to cancel()
+        '''
+        return self.call_at(self._us + delay_us, fun, arg)
+
+    def cancel(self, handle):
+        '''!@brief              Stops a scheduled function from running
+            @param              handle Handle returned by call_at() or call_after()
+        '''
+        for event in self._events:
+            if event[1] == handle:
+                self._cancelled.add(handle)
+                return
+
+    def next_event_us(self):
+        '''!@brief              Gets the time of the next scheduled function
+            @returns            Absolute time in microseconds, or None if nothing is scheduled
+        '''
+        events = self._events
+        while events and events[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(events)[1])
+        return events[0][0] if events else None
+
+    def now_us(self):
+        '''!@brief              Gets the absolute time, which does not wrap
+            @returns            Microseconds since the clock started
+        '''
+        return self._us
+
+    def advance(self, us):
+        '''!@brief              Moves the clock forward
+            @param              us Number of microseconds to advance, must not be negative
+        '''
+        if us < 0:
+            raise ValueError("Virtual time cannot run backward")
+        self._run_to(self._us + us)
+
+    def _run_to(self, end_us):
+        '''!@brief              Moves the clock to a time, running scheduled functions on the way
+            @details            While each function runs, the clock reads the time it was due
+            @param              end_us Absolute time in microseconds to stop at
+        '''
+        events = self._events
+        while events and events[0][0] <= end_us:
+            when, seq, fun, arg = heapq.heappop(events)
+            if seq in self._cancelled:
+                self._cancelled.discard(seq)
+                continue
+            if when > self._us:
+                self._us = when
+            fun(arg)
+        if end_us > self._us:
+            self._us = end_us
+
+    def ticks_us(self):
+        '''!@brief              Gets the wrapped microsecond tick count
+            @returns            Microsecond ticks, as time.ticks_us()
+        '''
+        return self._us & TICKS_MAX
+
+    def ticks_ms(self):
+        '''!@brief              Gets the wrapped millisecond tick count
+            @returns            Millisecond ticks, as time.ticks_ms()
+        '''
+        return (self._us // 1000) & TICKS_MAX
+
+    def ticks_cpu(self):
+        '''!@brief              Gets the highest resolution tick count available
+            @returns            Microsecond ticks, as there is nothing finer
+        '''
+        return self._us & TICKS_MAX
+
+    def ticks_diff(self, end, start):
+        '''!@brief              Finds the signed difference between two tick values
+            @param              end The later tick value
+            @param              start The earlier tick value
+            @returns            end - start, corrected for wrap-around
+        '''
+        return ((end - start + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+    def ticks_add(self, ticks, delta):
+        '''!@brief              Offsets a tick value
+            @param              ticks A tick value
+            @param              delta The signed number of ticks to add
+            @returns            The wrapped sum
+        '''
+        return (ticks + delta) & TICKS_MAX
+
+    def sleep_us(self, us):
+        '''!@brief              Passes time without doing anything else
+            @param              us Number of microseconds to sleep
+        '''
+        if us > 0:
+            self._run_to(self._us + us)
+
+    def sleep_ms(self, ms):
+        '''!@brief              Passes time without doing anything else
+            @param              ms Number of milliseconds to sleep
+        '''
+        if ms > 0:
+            self._run_to(self._us + ms * 1000)
+
+    def sleep(self, s):
+        '''!@brief              Passes time without doing anything else
+            @param              s Number of seconds to sleep
+        '''
+        if s > 0:
+            self._run_to(self._us + int(s * 1_000_000))
+
+
+## The clock shared by everything that runs on a PC without its own clock
+clock = VirtualClock()